@@ -3,52 +3,76 @@ TennisQ Pré-Live - Sistema para Railway
 Sistema automatizado que roda em background e envia notificações via Telegram
 """
 
+import functools
 import json
 import logging
 import sys
 import os
-import time
 import signal
 import threading
 from datetime import datetime
-from flask import Flask
+from flask import Flask, Response, request
 
 # Adiciona o path do backend
 sys.path.append(os.path.dirname(__file__))
 
-from services.monitoring_service import PreLiveManager
-from core.database import PreLiveDatabase
+# Imports leves: scanner, requests e monitoramento só são carregados em start_background,
+# para que o health check responda logo após o processo subir
+from services.scan_jobs import ScanJobManager
+from core.data_service import get_data_service
+from core.metrics import metrics
+from core.log_events import setup_logging, stop_logging
+from core.profiler import DEFAULT_INTERVAL, profile_call, profile_for
+from core.process_lock import ProcessLock
+from core.config import load_config
+from core.export import (EXPORT_COLUMNS, FORMATS, MIMETYPES, ExportFilters, export_filename, parse_statuses, prime,
+                         stream_export)
 
-# Configuração de logging mais robusta para Railway
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    force=True  # Força reconfiguração do logging
-)
+# Logging para stdout (Railway) via fila: o I/O não bloqueia as threads de scan/monitoramento
+setup_logging()
 
-# Configura logging para stdout (Railway)
-root_logger = logging.getLogger()
-root_logger.setLevel(logging.INFO)
+logger = logging.getLogger(__name__)
 
-# Handler para stdout
-if not root_logger.handlers:
-    handler = logging.StreamHandler(sys.stdout)
-    handler.setLevel(logging.INFO)
-    formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
-    handler.setFormatter(formatter)
-    root_logger.addHandler(handler)
+# Chave do snapshot do dashboard publicado pelo processo do scheduler
+DASHBOARD_SNAPSHOT_KEY = "dashboard"
 
-logger = logging.getLogger(__name__)
+# Estado das métricas de cada worker, somado por /metrics em qualquer worker
+METRICS_SNAPSHOT_PREFIX = "metrics:"
+
+# Porta local em que o worker do scheduler atende as rotas de debug repassadas pelos demais workers
+SCHEDULER_INTERNAL_PORT = int(os.getenv('SCHEDULER_INTERNAL_PORT', 8079))
+
+# Profiling abaixo do timeout do gunicorn (o worker não pode ser morto no meio da amostragem)
+PROFILE_MAX_SECONDS = max(1, min(300, int(os.getenv('GUNICORN_TIMEOUT', 120)) - 10))
+
+# Tamanho máximo de página de /api/matches
+MATCHES_MAX_LIMIT = 100
+
+CONFIG_PATH = os.path.join(os.path.dirname(__file__), "config", "config.json")
 
 class TennisQRailwayApp:
     """Aplicação principal para Railway"""
     
     def __init__(self):
         self.manager = None
-        self.db = PreLiveDatabase()
+        # Camada de dados única do processo (também usada pelo manager e pelo monitoramento)
+        self.db = get_data_service()
+        self.scan_jobs = ScanJobManager(self.db)
         self.flask_app = Flask(__name__)
         self.running = False
         
+        # Em modo WSGI (vários workers) só o processo com esta trava roda scan/monitoramento
+        self.scheduler_lock = ProcessLock()
+        self.snapshot_interval = int(os.getenv('SNAPSHOT_INTERVAL', 30))
+        # No processo do scheduler o dashboard ao vivo é reaproveitado por alguns segundos entre requests
+        self.dashboard_cache_ttl = float(os.getenv('DASHBOARD_CACHE_TTL', 5))
+        self._shutdown = threading.Event()
+        
+        # Modo WSGI: rotas que dependem do scheduler são repassadas ao worker que o roda
+        self.wsgi_mode = False
+        self._internal_server = None
+        self._metrics_key = f"{METRICS_SNAPSHOT_PREFIX}{os.getpid()}"
+        
         # Silencia logs do Werkzeug (servidor Flask)
         import logging
         werkzeug_logger = logging.getLogger('werkzeug')
@@ -56,6 +80,10 @@ class TennisQRailwayApp:
         
         self.setup_flask_routes()
         
+        # Profiling só é exposto quando habilitado explicitamente
+        if os.getenv('PROFILING_ENABLED', '').lower() in ('1', 'true', 'yes'):
+            self.setup_profiling_routes()
+        
     def setup_flask_routes(self):
         """Configura rotas Flask"""
         
@@ -71,8 +99,8 @@ class TennisQRailwayApp:
         def dashboard():
             """Dashboard simples"""
             try:
-                if self.manager:
-                    data = self.manager.get_dashboard_data()
+                data = self._dashboard_data()
+                if data is not None:
                     return {
                         "status": "ok",
                         "data": data,
@@ -87,8 +115,9 @@ class TennisQRailwayApp:
         def api_stats():
             """API de estatísticas"""
             try:
-                if self.manager:
-                    stats = self.manager.get_dashboard_data().get("statistics", {})
+                data = self._dashboard_data()
+                if data is not None:
+                    stats = data.get("statistics", {})
                     return {"status": "ok", "stats": stats}
                 else:
                     return {"status": "initializing"}
@@ -97,15 +126,44 @@ class TennisQRailwayApp:
         
         @self.flask_app.route('/api/matches')
         def api_matches():
-            """API de partidas ativas"""
+            """
+            API de partidas ativas, paginada por cursor
+            Parâmetros: limit (1-100), cursor, sort (start|ev|odd|created; padrão start), order (asc|desc),
+            league, side (HOME|AWAY), odd_min, odd_max
+            """
+            args = request.args
             try:
-                if self.manager:
-                    matches = self.manager.get_dashboard_data().get("active_opportunities", [])
-                    return {"status": "ok", "matches": matches[:20]}  # Limita a 20
-                else:
-                    return {"status": "initializing", "matches": []}
+                limit = min(max(int(args.get('limit', 20)), 1), MATCHES_MAX_LIMIT)
+                odd_min = float(args['odd_min']) if args.get('odd_min') else None
+                odd_max = float(args['odd_max']) if args.get('odd_max') else None
+                matches, next_cursor = self.db.query_opportunities(
+                    limit=limit,
+                    cursor=args.get('cursor') or None,
+                    sort=args.get('sort', 'start'),
+                    order=args.get('order'),
+                    league=args.get('league') or None,
+                    side=args.get('side') or None,
+                    odd_min=odd_min,
+                    odd_max=odd_max
+                )
+            except ValueError as e:
+                return {"status": "error", "error": str(e)}, 400
             except Exception as e:
                 return {"status": "error", "error": str(e)}
+            
+            return {"status": "ok", "matches": matches, "count": len(matches), "next_cursor": next_cursor}
+        
+        @self.flask_app.route('/metrics')
+        def prometheus_metrics():
+            """Métricas por etapa no formato texto do Prometheus (soma de todos os workers)"""
+            peers = []
+            if self.wsgi_mode:
+                try:
+                    snapshots = self.db.get_snapshots(METRICS_SNAPSHOT_PREFIX, max_age=3 * self.snapshot_interval)
+                    peers = [state for key, state in snapshots.items() if key != self._metrics_key]
+                except Exception as e:
+                    logger.warning(f"⚠️ Erro ao ler métricas dos outros workers: {e}")
+            return Response(metrics.render(peers), mimetype='text/plain; version=0.0.4; charset=utf-8')
         
         @self.flask_app.route('/favicon.ico')
         def favicon():
@@ -113,6 +171,7 @@ class TennisQRailwayApp:
             return '', 204  # No Content
         
         @self.flask_app.route('/debug')
+        @self._scheduler_route
         def debug_status():
             """Endpoint de debug para ver status detalhado"""
             try:
@@ -190,49 +249,216 @@ class TennisQRailwayApp:
             except Exception as e:
                 return {"error": str(e)}
         
-        @self.flask_app.route('/manual-scan')
+        @self.flask_app.route('/manual-scan', methods=['POST'])
         def manual_scan():
-            """Executa um scan manual para teste"""
+            """Inicia um scan manual em background (ou junta-se ao que está em andamento)"""
             try:
-                timestamp = datetime.utcnow().strftime('%H:%M:%S')
-                print(f"🔴 [MANUAL-SCAN {timestamp}] Iniciando scan manual...")
-                
-                if not self.manager:
-                    return {"error": "Manager não inicializado"}
-                
-                # Executa scan manual
-                opportunities = self.manager.manual_scan()
-                
-                result = {
-                    "status": "scan_completed",
-                    "timestamp": timestamp,
-                    "opportunities_found": len(opportunities) if opportunities else 0
-                }
+                job, created = self.scan_jobs.submit()
+                return {
+                    "status": job.status,
+                    "job_id": job.job_id,
+                    "coalesced": not created,
+                    "status_url": f"/manual-scan/{job.job_id}"
+                }, 202
                 
-                if opportunities:
-                    result["opportunities"] = [
-                        {
-                            "match": opp.match,
-                            "side": opp.side,
-                            "odd": opp.odd,
-                            "ev": opp.ev,
-                            "league": opp.league
-                        } for opp in opportunities[:5]  # Primeiras 5
-                    ]
-                
-                print(f"🔴 [MANUAL-SCAN {timestamp}] Concluído: {result['opportunities_found']} oportunidades")
+            except Exception as e:
+                logger.error(f"Erro ao iniciar scan manual: {e}")
+                return {"error": f"Erro no scan manual: {e}"}, 500
+        
+        @self.flask_app.route('/manual-scan', methods=['GET'])
+        @self.flask_app.route('/manual-scan/<job_id>', methods=['GET'])
+        def manual_scan_status(job_id=None):
+            """Progresso e resultado de um job de scan (sem id: o mais recente)"""
+            job = self.scan_jobs.get(job_id) if job_id else self.scan_jobs.latest()
+            if not job:
+                return {"error": "Job não encontrado"}, 404
+            return job.to_dict()
+        
+        @self.flask_app.route('/export/<table>')
+        def export_history(table):
+            """Exportação em streaming (NDJSON/CSV, gzip opcional) de oportunidades ou movimento de linha"""
+            fmt = request.args.get('format', 'ndjson')
+            compress = request.args.get('gzip', '0').lower() in ('1', 'true', 'yes')
+            if table not in EXPORT_COLUMNS or fmt not in FORMATS:
+                return {"error": f"Use /export/<{'|'.join(sorted(EXPORT_COLUMNS))}>?format=<{'|'.join(FORMATS)}>"}, 400
+            
+            filters = ExportFilters(
+                since=request.args.get('since'),
+                until=request.args.get('until'),
+                league=request.args.get('league'),
+                statuses=parse_statuses(request.args.get('status'))
+            )
+            try:
+                chunks = prime(stream_export(self.db.db_path, table, fmt, compress, filters,
+                                             include_archives=request.args.get('archives', '1') != '0'))
+            except ValueError as e:
+                return {"error": str(e)}, 400
+            except Exception as e:
+                logger.error(f"❌ Erro na exportação de {table}: {e}")
+                return {"error": f"Falha ao ler o histórico: {e}"}, 500
+            filename = export_filename(table, fmt, compress)
+            return Response(chunks, mimetype='application/gzip' if compress else MIMETYPES[fmt],
+                            headers={'Content-Disposition': f'attachment; filename={filename}'})
+        
+    def setup_profiling_routes(self):
+        """Rotas de profiling por amostragem (opt-in via PROFILING_ENABLED)"""
+        
+        def render_profile(profiler, label: str):
+            if request.args.get('format', 'collapsed') == 'speedscope':
+                return Response(json.dumps(profiler.speedscope(name=label)), mimetype='application/json',
+                                headers={'Content-Disposition': 'attachment; filename=tennisq.speedscope.json'})
+            summary = json.dumps(profiler.summary())
+            return Response(profiler.collapsed(), mimetype='text/plain; charset=utf-8',
+                            headers={'X-Profile-Summary': summary})
+        
+        def interval_arg() -> float:
+            return max(1.0, float(request.args.get('interval_ms', DEFAULT_INTERVAL * 1000))) / 1000
+        
+        @self.flask_app.route('/debug/profile')
+        @self._scheduler_route
+        def profile_threads():
+            """Amostra as threads de scan e monitoramento (ou todas) por N segundos"""
+            try:
+                seconds = min(float(request.args.get('seconds', 10)), PROFILE_MAX_SECONDS)
+                targets = None
+                if request.args.get('threads', 'service') != 'all':
+                    if not self.manager:
+                        return {"error": "Manager não inicializado"}, 503
+                    service = self.manager.monitoring_service
+                    targets = {
+                        thread.ident: name
+                        for name, thread in (("scan", service.scan_thread), ("monitor", service.monitor_thread))
+                        if thread and thread.is_alive()
+                    }
+                    if not targets:
+                        return {"error": "Threads de scan/monitoramento não estão ativas"}, 409
                 
-                return result
+                logger.info(f"🔬 Profiling de {seconds}s iniciado")
+                profiler = profile_for(seconds, targets, interval_arg())
+                if profiler is None:
+                    return {"error": "Já existe um profiling em andamento"}, 409
+                return render_profile(profiler, f"threads {seconds}s")
+            except Exception as e:
+                return {"error": f"Erro no profiling: {e}"}, 500
+        
+        @self.flask_app.route('/debug/profile/manual-scan')
+        @self._scheduler_route
+        def profile_manual_scan():
+            """Executa exatamente um manual_scan (sem reaproveitar scan em andamento ou recente) sob o profiler"""
+            try:
+                if not self.manager:
+                    return {"error": "Manager não inicializado"}, 503
                 
+                logger.info("🔬 Profiling de um scan manual iniciado")
+                outcome = profile_call(lambda: self.manager.manual_scan(force=True), interval_arg(),
+                                       thread_name="manual_scan")
+                if outcome is None:
+                    return {"error": "Já existe um profiling em andamento"}, 409
+                return render_profile(outcome[0], "manual_scan")
             except Exception as e:
-                error_msg = f"Erro no scan manual: {e}"
-                print(f"🔴 [MANUAL-SCAN] {error_msg}")
-                import traceback
-                traceback.print_exc()
-                return {"error": error_msg}
+                return {"error": f"Erro no profiling: {e}"}, 500
+        
+    def _scheduler_route(self, view):
+        """Rota que só faz sentido no processo do scheduler: nos demais workers é repassada a ele"""
+        @functools.wraps(view)
+        def wrapper(*args, **kwargs):
+            if self.wsgi_mode and self.manager is None and not self.scheduler_lock.held:
+                return self._forward_to_scheduler()
+            return view(*args, **kwargs)
+        return wrapper
+    
+    def _forward_to_scheduler(self):
+        """Repassa a requisição atual ao servidor interno do worker do scheduler"""
+        import requests
+        
+        try:
+            response = requests.get(f"http://127.0.0.1:{SCHEDULER_INTERNAL_PORT}{request.path}",
+                                    params=request.args, timeout=(5, PROFILE_MAX_SECONDS + 5))
+        except requests.RequestException as e:
+            return {"error": f"Worker do scheduler indisponível: {e}"}, 503
+        
+        headers = {name: value for name, value in response.headers.items()
+                   if name in ('Content-Disposition', 'X-Profile-Summary')}
+        return Response(response.content, status=response.status_code,
+                        mimetype=response.headers.get('Content-Type'), headers=headers)
+    
+    def _start_internal_server(self):
+        """Servidor HTTP local (só 127.0.0.1) do worker do scheduler, para as rotas repassadas"""
+        from werkzeug.serving import make_server
+        
+        try:
+            self._internal_server = make_server('127.0.0.1', SCHEDULER_INTERNAL_PORT, self.flask_app, threaded=True)
+        except OSError as e:
+            logger.warning(f"⚠️ Servidor interno do scheduler não iniciado (porta {SCHEDULER_INTERNAL_PORT}): {e}")
+            return
+        threading.Thread(target=self._internal_server.serve_forever, name="scheduler-internal-http",
+                         daemon=True).start()
+    
+    def _metrics_loop(self):
+        """Publica as métricas deste worker no SQLite para a soma em /metrics"""
+        while not self._shutdown.is_set():
+            try:
+                self.db.save_snapshot(self._metrics_key, metrics.snapshot())
+            except Exception as e:
+                logger.warning(f"⚠️ Erro ao publicar métricas do worker: {e}")
+            self._shutdown.wait(self.snapshot_interval)
+    
+    def _dashboard_data(self):
+        """Dados do dashboard: ao vivo no processo do scheduler, senão o snapshot do SQLite"""
+        if self.manager:
+            data = self.db.get_cached_snapshot(DASHBOARD_SNAPSHOT_KEY, max_age=self.dashboard_cache_ttl)
+            if data is None:
+                data = self.manager.get_dashboard_data()
+                self.db.cache_snapshot(DASHBOARD_SNAPSHOT_KEY, data)
+            return data
         
+        snapshot = self.db.get_snapshot(DASHBOARD_SNAPSHOT_KEY)
+        if not snapshot:
+            return None
+        return dict(snapshot["data"], snapshot_at=snapshot["updated_at"])
+    
+    def _snapshot_loop(self):
+        """Publica periodicamente o dashboard no SQLite para os workers HTTP"""
+        while self.running and not self._shutdown.is_set():
+            try:
+                self.db.save_snapshot(DASHBOARD_SNAPSHOT_KEY, self.manager.get_dashboard_data())
+            except Exception as e:
+                logger.warning(f"⚠️ Erro ao publicar snapshot do dashboard: {e}")
+            self._shutdown.wait(self.snapshot_interval)
+    
     def start(self):
-        """Inicia o sistema"""
+        """Inicia o sistema (processo único, servidor Flask embutido)"""
+        # Inicialização pesada em background: o servidor (e o health check) sobe imediatamente
+        threading.Thread(target=self.start_background, name="startup", daemon=True).start()
+        
+        # Inicia Flask server
+        port = int(os.getenv('PORT', 8080))
+        print(f"🌐 [PRINT] Iniciando servidor Flask na porta {port}")
+        logger.info(f"🌐 Iniciando servidor Flask na porta {port}")
+        sys.stdout.flush()
+        
+        # Roda Flask em modo não-debug (para produção use o modo WSGI: backend/wsgi.py)
+        self.flask_app.run(host='0.0.0.0', port=port, debug=False, use_reloader=False)
+    
+    def start_scheduler_election(self, retry_interval: int = 30):
+        """
+        Modo WSGI: tenta virar o processo do scheduler (trava em arquivo)
+        Quem não consegue só serve HTTP e tenta de novo periodicamente, assumindo se o dono morrer
+        """
+        def elect():
+            while not self.scheduler_lock.acquire():
+                if self._shutdown.wait(retry_interval):
+                    return
+            logger.info(f"👑 Processo {os.getpid()} assumiu scan e monitoramento")
+            self._start_internal_server()
+            self.start_background(daemon=True)
+        
+        self.wsgi_mode = True
+        threading.Thread(target=elect, name="scheduler-election", daemon=True).start()
+        threading.Thread(target=self._metrics_loop, name="metrics-snapshot", daemon=True).start()
+    
+    def start_background(self, daemon: bool = False):
+        """Inicia manager, threads de scan/monitoramento, fila de scans manuais e snapshots"""
         print("🎾 [PRINT] Iniciando TennisQ Pré-Live no Railway...")
         logger.info("🎾 Iniciando TennisQ Pré-Live no Railway...")
         sys.stdout.flush()
@@ -245,18 +471,23 @@ class TennisQRailwayApp:
             
             # Inicializa o manager
             print("🏗️ [PRINT] Inicializando manager...")
-            config_file_path = os.path.join(os.path.dirname(__file__), "config", "config.json")
-            self.manager = PreLiveManager(config_path=config_file_path)
+            from services.monitoring_service import PreLiveManager
+            self.manager = PreLiveManager(config_path=CONFIG_PATH, db=self.db)
             print("✅ [PRINT] Manager inicializado!")
             
+            # Marca como rodando antes de iniciar a thread, que depende da flag
+            self.running = True
+            
             # Inicia o serviço de monitoramento em thread separada (não daemon para debug)
             print("🚀 [PRINT] Iniciando thread de monitoramento...")
             logger.info("🚀 Iniciando thread de monitoramento...")
-            monitor_thread = threading.Thread(target=self._start_monitoring_with_debug, daemon=False)
+            monitor_thread = threading.Thread(target=self._start_monitoring_with_debug, daemon=daemon)
             monitor_thread.start()
             print("✅ [PRINT] Thread de monitoramento iniciada!")
             
-            self.running = True
+            # Scans manuais enfileirados (por este ou por outros workers) rodam neste processo
+            self.scan_jobs.start_executor(lambda progress: self.manager.manual_scan(progress=progress))
+            threading.Thread(target=self._snapshot_loop, name="dashboard-snapshot", daemon=True).start()
             
             # Envia notificação de início
             print("📱 [PRINT] Enviando notificação de início...")
@@ -265,16 +496,8 @@ class TennisQRailwayApp:
             
             logger.info("✅ Sistema iniciado com sucesso!")
             print("🎉 [PRINT] Sistema iniciado com sucesso!")
-            
-            # Inicia Flask server
-            port = int(os.getenv('PORT', 8080))
-            print(f"🌐 [PRINT] Iniciando servidor Flask na porta {port}")
-            logger.info(f"🌐 Iniciando servidor Flask na porta {port}")
             sys.stdout.flush()
             
-            # Roda Flask em modo não-debug para produção
-            self.flask_app.run(host='0.0.0.0', port=port, debug=False, use_reloader=False)
-            
         except Exception as e:
             error_msg = f"❌ Erro ao iniciar sistema: {e}"
             print(f"❌ [PRINT] {error_msg}")
@@ -298,9 +521,6 @@ class TennisQRailwayApp:
             print("🔍 DEBUG: Iniciando serviço de monitoramento...")
             logger.info("🔍 DEBUG: Iniciando serviço de monitoramento...")
             
-            # Aguarda um pouco para garantir que tudo está inicializado
-            time.sleep(2)
-            
             # Inicia o manager
             print("🔍 DEBUG: Chamando manager.start()...")
             logger.info("🔍 DEBUG: Chamando manager.start()...")
@@ -309,43 +529,38 @@ class TennisQRailwayApp:
             print("✅ DEBUG: Monitoramento iniciado com sucesso!")
             logger.info("✅ DEBUG: Monitoramento iniciado com sucesso!")
             
-            # Loop de debug simplificado
+            # Loop de debug simplificado: acorda a cada 2 minutos ou imediatamente na parada
             debug_count = 0
-            while self.running:
+            while self.running and not self._shutdown.wait(120):
                 try:
                     debug_count += 1
                     
                     # Log de debug a cada 2 minutos para ver atividade
-                    if debug_count % 2 == 0:
-                        msg = f"🔍 DEBUG #{debug_count}: Sistema ativo há {debug_count * 2} minutos"
-                        print(msg)
-                        logger.info(msg)
-                        sys.stdout.flush()  # Força flush do stdout
-                        
-                        # Verifica status básico
-                        try:
-                            if hasattr(self.manager, 'monitoring_service'):
-                                service = self.manager.monitoring_service
-                                running_status = service.running
-                                msg2 = f"🔍 DEBUG: Serviço running = {running_status}"
-                                print(msg2)
-                                logger.info(msg2)
-                                sys.stdout.flush()
-                        except Exception as e:
-                            error_msg = f"🔍 DEBUG: Erro ao verificar status: {e}"
-                            print(error_msg)
-                            logger.error(error_msg)
-                            sys.stdout.flush()
+                    msg = f"🔍 DEBUG #{debug_count}: Sistema ativo há {debug_count * 2} minutos"
+                    print(msg)
+                    logger.info(msg)
+                    sys.stdout.flush()  # Força flush do stdout
                     
-                    # Aguarda 1 minuto
-                    time.sleep(60)
+                    # Verifica status básico
+                    try:
+                        if hasattr(self.manager, 'monitoring_service'):
+                            service = self.manager.monitoring_service
+                            running_status = service.running
+                            msg2 = f"🔍 DEBUG: Serviço running = {running_status}"
+                            print(msg2)
+                            logger.info(msg2)
+                            sys.stdout.flush()
+                    except Exception as e:
+                        error_msg = f"🔍 DEBUG: Erro ao verificar status: {e}"
+                        print(error_msg)
+                        logger.error(error_msg)
+                        sys.stdout.flush()
                     
                 except Exception as e:
                     error_msg = f"🔍 DEBUG: Erro no loop de debug: {e}"
                     print(error_msg)
                     logger.error(error_msg)
                     sys.stdout.flush()
-                    time.sleep(60)
                     
         except Exception as e:
             critical_msg = f"❌ DEBUG: Erro crítico no monitoramento: {e}"
@@ -362,21 +577,29 @@ class TennisQRailwayApp:
         logger.info("⏹️ Parando TennisQ Pré-Live...")
         
         self.running = False
+        self._shutdown.set()
+        self.scan_jobs.stop_executor()
         
         if self.manager:
             self.manager.stop()
         
+        if self._internal_server is not None:
+            self._internal_server.shutdown()
+        if self.wsgi_mode:
+            try:
+                self.db.delete_snapshot(self._metrics_key)
+            except Exception as e:
+                logger.warning(f"⚠️ Erro ao remover métricas do worker: {e}")
+        
+        self.scheduler_lock.release()
         logger.info("✅ Sistema parado com sucesso!")
     
     def _verify_config(self):
         """Verifica se a configuração está correta"""
-        config_path = os.path.join(os.path.dirname(__file__), "config", "config.json")
+        if not os.path.exists(CONFIG_PATH):
+            raise FileNotFoundError(f"Arquivo de configuração não encontrado: {CONFIG_PATH}")
         
-        if not os.path.exists(config_path):
-            raise FileNotFoundError(f"Arquivo de configuração não encontrado: {config_path}")
-        
-        with open(config_path, 'r') as f:
-            config = json.load(f)
+        config = load_config(CONFIG_PATH)
         
         required_keys = ["api_key", "telegram_token", "chat_id", "api_base_url"]
         missing_keys = [key for key in required_keys if not config.get(key)]
@@ -391,9 +614,7 @@ class TennisQRailwayApp:
         try:
             import requests
             
-            config_path = os.path.join(os.path.dirname(__file__), "config", "config.json")
-            with open(config_path, 'r') as f:
-                config = json.load(f)
+            config = load_config(CONFIG_PATH)
             
             message = (
                 "🚀 **TennisQ Pré-Live INICIADO**\\n\\n"
@@ -424,9 +645,7 @@ class TennisQRailwayApp:
         try:
             import requests
             
-            config_path = os.path.join(os.path.dirname(__file__), "config", "config.json")
-            with open(config_path, 'r') as f:
-                config = json.load(f)
+            config = load_config(CONFIG_PATH)
             
             message = (
                 "❌ **ERRO NO TENNISQ PRÉ-LIVE**\\n\\n"
@@ -451,37 +670,22 @@ class TennisQRailwayApp:
         """Loop principal que mantém o processo vivo"""
         logger.info("🔄 Entrando no loop principal...")
         
-        last_health_check = datetime.utcnow()
         health_check_interval = 3600  # 1 hora
-        
         loop_count = 0
         
-        while self.running:
+        # Acorda só no próximo health check ou imediatamente na parada
+        while self.running and not self._shutdown.wait(health_check_interval):
             try:
                 loop_count += 1
+                logger.info(f"💓 Loop principal ativo - ciclo {loop_count}")
+                self._health_check()
                 
-                # Log de heartbeat a cada 10 loops (10 minutos)
-                if loop_count % 10 == 0:
-                    logger.info(f"💓 Loop principal ativo - ciclo {loop_count}")
-                
-                # Health check periódico
-                now = datetime.utcnow()
-                if (now - last_health_check).total_seconds() >= health_check_interval:
-                    self._health_check()
-                    last_health_check = now
-                
-                # Dorme por 60 segundos
-                time.sleep(60)
-                
-            except KeyboardInterrupt:
-                logger.info("🛑 Interrompido pelo usuário")
-                break
             except Exception as e:
                 logger.error(f"❌ Erro no loop principal: {e}")
                 import traceback
                 logger.error(f"Stack trace: {traceback.format_exc()}")
                 self._send_error_notification(f"Erro no loop principal: {e}")
-                time.sleep(300)  # 5 minutos antes de tentar novamente
+                self._shutdown.wait(300)  # 5 minutos antes de tentar novamente
     
     def _health_check(self):
         """Verifica se o sistema está funcionando corretamente"""
@@ -532,11 +736,18 @@ class TennisQRailwayApp:
 # Variável global para a aplicação
 app_instance = None
 
+def shutdown():
+    """Encerramento gracioso (usado pelo signal_handler e pelos hooks do gunicorn)"""
+    global app_instance
+    if app_instance:
+        app_instance.stop()
+        app_instance = None
+    stop_logging()
+
 def signal_handler(signum, frame):
     """Handler para sinais do sistema"""
     logger.info(f"📡 Sinal recebido: {signum}")
-    if app_instance:
-        app_instance.stop()
+    shutdown()
     sys.exit(0)
 
 def main():
@@ -0,0 +1,177 @@
+"""
+Arquivo mensal do histórico: eventos encerrados saem do prelive.db para storage/database/archive/prelive_AAAA_MM.db
+O banco vivo fica só com a janela ativa; backtest e análises leem os arquivos via ATTACH, em streaming
+"""
+
+import logging
+import re
+import sqlite3
+import time
+from contextlib import closing, contextmanager
+from pathlib import Path
+from typing import Dict, Iterator, List, Tuple
+
+from .database import PreLiveDatabase
+
+logger = logging.getLogger(__name__)
+
+ARCHIVE_DIRNAME = "archive"
+ARCHIVE_ALIAS = "arc"
+ARCHIVED_TABLES = ("opportunities", "line_movements")
+ARCHIVE_INDEXES = (
+    "CREATE INDEX IF NOT EXISTS {alias}.idx_opportunities_event_id ON opportunities(event_id)",
+    "CREATE INDEX IF NOT EXISTS {alias}.idx_opportunities_created_at ON opportunities(created_at)",
+    "CREATE INDEX IF NOT EXISTS {alias}.idx_line_movements_event_id ON line_movements(event_id)",
+)
+_ARCHIVE_NAME = re.compile(r"^prelive_(\d{4})_(\d{2})\.db$")
+
+def archive_dir_for(db_path) -> Path:
+    """Diretório dos arquivos mensais de um banco vivo (ao lado dele)"""
+    return Path(db_path).parent / ARCHIVE_DIRNAME
+
+def archive_path(db_path, month: str) -> Path:
+    """'2025-03' -> .../archive/prelive_2025_03.db"""
+    return archive_dir_for(db_path) / f"prelive_{month.replace('-', '_')}.db"
+
+def list_archives(db_path) -> List[Tuple[str, Path]]:
+    """Arquivos mensais existentes, do mais antigo ao mais novo: [(AAAA-MM, caminho)]"""
+    directory = archive_dir_for(db_path)
+    if not directory.is_dir():
+        return []
+    archives = []
+    for path in directory.iterdir():
+        match = _ARCHIVE_NAME.match(path.name)
+        if match:
+            archives.append((f"{match.group(1)}-{match.group(2)}", path))
+    return sorted(archives)
+
+def iter_history_rows(db_path, query: str, params: Tuple = (), batch_size: int = 5000,
+                      include_archives: bool = True) -> Iterator[Tuple]:
+    """
+    Executa `query` em cada arquivo mensal (mais antigo primeiro) e depois no banco vivo, em lotes (fetchmany)
+    A query usa {schema}.opportunities / {schema}.line_movements; as demais tabelas (ex: match_results)
+    vêm sempre do banco vivo (main)
+    """
+    conn = sqlite3.connect(f"file:{Path(db_path).as_posix()}?mode=ro", uri=True)
+    try:
+        sources = list_archives(db_path) if include_archives else []
+        for month, path in sources:
+            conn.execute(f"ATTACH DATABASE ? AS {ARCHIVE_ALIAS}", (f"file:{path.as_posix()}?mode=ro",))
+            try:
+                yield from _fetch(conn, query.format(schema=ARCHIVE_ALIAS), params, batch_size)
+            finally:
+                conn.execute(f"DETACH DATABASE {ARCHIVE_ALIAS}")
+        yield from _fetch(conn, query.format(schema="main"), params, batch_size)
+    finally:
+        conn.close()
+
+def _fetch(conn: sqlite3.Connection, query: str, params: Tuple, batch_size: int) -> Iterator[Tuple]:
+    cursor = conn.execute(query, params)
+    try:
+        while True:
+            rows = cursor.fetchmany(batch_size)
+            if not rows:
+                return
+            yield from rows
+    finally:
+        cursor.close()
+
+class HistoryArchive:
+    """Move eventos encerrados (oportunidades + movimento de linha) para o arquivo do mês de início"""
+
+    def __init__(self, db: PreLiveDatabase, batch_size: int = 500, pause: float = 0.05):
+        self.db = db
+        self.batch_size = batch_size  # Oportunidades aproximadas por transação
+        self.pause = pause
+
+    def archive_before(self, cutoff: str) -> Dict[str, int]:
+        """Arquiva os eventos sem oportunidade ativa que começaram antes de `cutoff` (ISO)"""
+        with self.db._connect() as conn:
+            rows = conn.execute("""
+                SELECT REPLACE(event_id, '_away', '') AS base_id, substr(MIN(start_utc), 1, 7), COUNT(*)
+                FROM opportunities
+                GROUP BY base_id
+                HAVING datetime(MAX(start_utc)) < datetime(?) AND SUM(status = 'ACTIVE') = 0
+            """, (cutoff,)).fetchall()
+
+        by_month: Dict[str, List[Tuple[str, int]]] = {}
+        for base_id, month, count in rows:
+            by_month.setdefault(month, []).append((base_id, count))
+
+        totals = {"months": len(by_month), "events": len(rows), "opportunities": 0, "line_movements": 0}
+        for month, events in sorted(by_month.items()):
+            moved = self._archive_month(month, events)
+            totals["opportunities"] += moved["opportunities"]
+            totals["line_movements"] += moved["line_movements"]
+
+        if rows:
+            logger.info(f"📦 Arquivo: {totals['events']} eventos em {totals['months']} meses "
+                        f"({totals['opportunities']} oportunidades, {totals['line_movements']} linhas)")
+        return totals
+
+    def _archive_month(self, month: str, events: List[Tuple[str, int]]) -> Dict[str, int]:
+        path = archive_path(self.db.db_path, month)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        moved = {"opportunities": 0, "line_movements": 0}
+
+        with self._attached(path) as conn:
+            for chunk in self._chunks(events):
+                # HOME e AWAY ("_away") do mesmo evento andam juntos; INSERT OR IGNORE pelo id torna a
+                # cópia idempotente se o processo cair entre o commit do arquivo e o do banco vivo
+                event_ids = chunk + [f"{base_id}_away" for base_id in chunk]
+                placeholders = ",".join("?" * len(event_ids))
+                for table in ARCHIVED_TABLES:
+                    conn.execute(f"""
+                        INSERT OR IGNORE INTO {ARCHIVE_ALIAS}.{table}
+                        SELECT * FROM main.{table} WHERE event_id IN ({placeholders})
+                    """, event_ids)
+                    cursor = conn.execute(f"DELETE FROM main.{table} WHERE event_id IN ({placeholders})", event_ids)
+                    moved[table] += cursor.rowcount
+                conn.commit()
+                if self.pause:
+                    time.sleep(self.pause)
+        return moved
+
+    def _chunks(self, events: List[Tuple[str, int]]) -> Iterator[List[str]]:
+        chunk, size = [], 0
+        for base_id, count in events:
+            chunk.append(base_id)
+            size += count
+            if size >= self.batch_size or len(chunk) >= 400:  # 2 parâmetros por evento (limite do SQLite)
+                yield chunk
+                chunk, size = [], 0
+        if chunk:
+            yield chunk
+
+    @contextmanager
+    def _attached(self, path: Path) -> Iterator[sqlite3.Connection]:
+        """Conexão própria com o arquivo em ATTACH (não altera a conexão compartilhada da thread)"""
+        conn = sqlite3.connect(self.db.db_path, timeout=30)
+        try:
+            conn.execute(f"ATTACH DATABASE ? AS {ARCHIVE_ALIAS}", (str(path),))
+            self._ensure_schema(conn)
+            yield conn
+        finally:
+            conn.close()
+
+    @staticmethod
+    def _ensure_schema(conn: sqlite3.Connection):
+        """Cria no arquivo as tabelas com o mesmo DDL do banco vivo"""
+        for table in ARCHIVED_TABLES:
+            sql = conn.execute("SELECT sql FROM main.sqlite_master WHERE type = 'table' AND name = ?",
+                               (table,)).fetchone()[0]
+            conn.execute(re.sub(rf"^CREATE TABLE\s+{table}\b",
+                                f"CREATE TABLE IF NOT EXISTS {ARCHIVE_ALIAS}.{table}", sql, count=1))
+        for statement in ARCHIVE_INDEXES:
+            conn.execute(statement.format(alias=ARCHIVE_ALIAS))
+        conn.commit()
+
+    def stats(self) -> List[Dict]:
+        """Arquivos existentes com tamanho e contagem de oportunidades"""
+        result = []
+        for month, path in list_archives(self.db.db_path):
+            with closing(sqlite3.connect(f"file:{path.as_posix()}?mode=ro", uri=True)) as conn:
+                count = conn.execute("SELECT COUNT(*) FROM opportunities").fetchone()[0]
+            result.append({"month": month, "path": str(path), "opportunities": count,
+                           "bytes": path.stat().st_size})
+        return result
@@ -0,0 +1,309 @@
+"""
+Backtest das oportunidades armazenadas no prelive.db
+Reaplica os filtros do scanner com parâmetros alternativos e calcula ROI, CLV e acerto
+"""
+
+import argparse
+import itertools
+import json
+import logging
+import math
+import os
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, asdict
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from .archive import iter_history_rows
+from .prelive_scanner import is_female_league
+
+logger = logging.getLogger(__name__)
+
+# Linha histórica já resolvida: (chave, liga, odd, ev, horas_até_início, vencedor, odd_fechamento)
+HistoryRow = Tuple[str, str, float, float, Optional[float], Optional[bool], Optional[float]]
+
+# Uma oportunidade é reescrita a cada scan; a última odd monitorada antes do início é o fechamento
+# {schema}: banco vivo (main) ou arquivo mensal em ATTACH (core/archive.py); resultados sempre do vivo
+HISTORY_QUERY = """
+    SELECT o.event_id, o.side, o.league, o.odd, o.ev, o.start_utc, o.created_at,
+           r.winner,
+           (SELECT CASE WHEN o.side = 'HOME' THEN lm.home_od ELSE lm.away_od END
+              FROM {schema}.line_movements lm
+             WHERE lm.event_id IN (o.event_id, REPLACE(o.event_id, '_away', ''))
+               AND datetime(lm.created_at) <= datetime(o.start_utc)
+             ORDER BY lm.created_at DESC
+             LIMIT 1) AS closing_odd
+    FROM {schema}.opportunities o
+    LEFT JOIN main.match_results r ON r.event_id = REPLACE(o.event_id, '_away', '')
+    WHERE o.created_at >= ? AND o.created_at < ?
+    ORDER BY o.created_at ASC
+"""
+
+@dataclass(frozen=True)
+class BacktestConfig:
+    """Conjunto de parâmetros a ser avaliado (espelha os filtros do scanner)"""
+    odd_min: float = 4.00
+    odd_max: float = 6.00
+    ev_min: Optional[float] = None
+    ev_max: Optional[float] = None
+    hours_min: float = 0.0
+    hours_max: float = 72.0
+    leagues: Optional[Tuple[str, ...]] = None  # None = filtro feminino do scanner
+
+    def accepts(self, league: str, odd: float, ev: float, hours_to_start: Optional[float],
+                female: bool) -> bool:
+        """Aplica os mesmos cortes de scan_opportunities/_should_bet_simple_aggressive"""
+        if self.leagues is None:
+            if not female:
+                return False
+        else:
+            league_lower = league.lower()
+            if not any(term in league_lower for term in self.leagues):
+                return False
+
+        if odd < self.odd_min or odd > self.odd_max:
+            return False
+
+        if self.ev_min is not None and ev < self.ev_min:
+            return False
+        if self.ev_max is not None and ev > self.ev_max:
+            return False
+
+        if hours_to_start is None:
+            return False
+        return self.hours_min <= hours_to_start <= self.hours_max
+
+@dataclass
+class BacktestResult:
+    """Métricas agregadas de uma configuração"""
+    config: BacktestConfig
+    bets: int = 0
+    settled: int = 0
+    wins: int = 0
+    profit: float = 0.0
+    clv_sum: float = 0.0
+    clv_count: int = 0
+    clv_positive: int = 0
+
+    def add(self, odd: float, won: Optional[bool], closing_odd: Optional[float]):
+        """Registra uma aposta de 1 unidade"""
+        self.bets += 1
+
+        if won is not None:
+            self.settled += 1
+            if won:
+                self.wins += 1
+                self.profit += odd - 1.0
+            else:
+                self.profit -= 1.0
+
+        if closing_odd:
+            # Mesma definição de PreLiveDatabase.calculate_clv
+            clv = (closing_odd / odd) - 1
+            self.clv_sum += clv
+            self.clv_count += 1
+            if clv > 0:
+                self.clv_positive += 1
+
+    def to_dict(self) -> Dict:
+        """Serializa resultado com métricas derivadas"""
+        return {
+            "config": asdict(self.config),
+            "bets": self.bets,
+            "settled": self.settled,
+            "wins": self.wins,
+            "hit_rate": round(self.wins / self.settled, 4) if self.settled else None,
+            "profit": round(self.profit, 4),
+            "roi": round(self.profit / self.settled, 4) if self.settled else None,
+            "avg_clv": round(self.clv_sum / self.clv_count, 4) if self.clv_count else None,
+            "clv_positive_rate": round(self.clv_positive / self.clv_count, 4) if self.clv_count else None,
+        }
+
+def _parse_utc(value: str) -> Optional[datetime]:
+    """Converte start_utc/created_at (formatos variados) para datetime naive UTC"""
+    if not value:
+        return None
+    try:
+        return datetime.fromisoformat(value.replace('Z', '')).replace(tzinfo=None)
+    except ValueError:
+        return None
+
+def _winner_to_outcome(side: str, winner: Optional[str]) -> Optional[bool]:
+    """Converte o vencedor de match_results no resultado da aposta"""
+    if not winner:
+        return None
+    return winner.upper() == side.upper()
+
+def iter_history(db_path: str, since: str, until: str, batch_size: int = 5000,
+                 include_archives: bool = True) -> Iterator[HistoryRow]:
+    """
+    Percorre as oportunidades históricas em lotes (fetchmany), sem carregar tudo em memória
+    Arquivos mensais primeiro (um evento inteiro fica num único arquivo), depois o banco vivo
+    """
+    rows = iter_history_rows(db_path, HISTORY_QUERY, (since, until), batch_size, include_archives)
+    for event_id, side, league, odd, ev, start_utc, created_at, winner, closing_odd in rows:
+        start_dt = _parse_utc(start_utc)
+        created_dt = _parse_utc(created_at)
+        hours_to_start = None
+        if start_dt and created_dt:
+            hours_to_start = (start_dt - created_dt).total_seconds() / 3600
+
+        yield (
+            f"{event_id}:{side}",
+            league or "",
+            odd,
+            ev or 0.0,
+            hours_to_start,
+            _winner_to_outcome(side, winner),
+            closing_odd
+        )
+
+def _evaluate_chunk(db_path: str, configs: List[BacktestConfig], since: str, until: str,
+                    batch_size: int, include_archives: bool = True) -> List[Dict]:
+    """Avalia um bloco de configurações numa única passada sobre o histórico (roda no worker)"""
+    results = [BacktestResult(config=config) for config in configs]
+    placed = [set() for _ in configs]
+    female_cache: Dict[str, bool] = {}
+
+    history = iter_history(db_path, since, until, batch_size, include_archives)
+    for key, league, odd, ev, hours_to_start, won, closing_odd in history:
+        female = female_cache.get(league)
+        if female is None:
+            female = female_cache[league] = is_female_league(league)
+
+        for i, config in enumerate(configs):
+            # Cada aposta (evento + lado) entra uma única vez: o primeiro scan que passa nos filtros
+            if key in placed[i]:
+                continue
+            if config.accepts(league, odd, ev, hours_to_start, female):
+                placed[i].add(key)
+                results[i].add(odd, won, closing_odd)
+
+    return [result.to_dict() for result in results]
+
+def build_grid(odd_mins: List[float], odd_maxs: List[float],
+               ev_mins: List[Optional[float]], ev_maxs: List[Optional[float]],
+               hours_mins: List[float], hours_maxs: List[float],
+               league_sets: List[Optional[Tuple[str, ...]]]) -> List[BacktestConfig]:
+    """Produto cartesiano dos parâmetros, descartando faixas inválidas"""
+    grid = []
+    for odd_min, odd_max, ev_min, ev_max, hours_min, hours_max, leagues in itertools.product(
+            odd_mins, odd_maxs, ev_mins, ev_maxs, hours_mins, hours_maxs, league_sets):
+        if odd_min > odd_max or hours_min > hours_max:
+            continue
+        if ev_min is not None and ev_max is not None and ev_min > ev_max:
+            continue
+        grid.append(BacktestConfig(
+            odd_min=odd_min, odd_max=odd_max,
+            ev_min=ev_min, ev_max=ev_max,
+            hours_min=hours_min, hours_max=hours_max,
+            leagues=leagues
+        ))
+    return grid
+
+class BacktestEngine:
+    """Executa uma grade de configurações em paralelo sobre o histórico do banco"""
+
+    def __init__(self, db_path: str = "storage/database/prelive.db",
+                 workers: Optional[int] = None, batch_size: int = 5000, include_archives: bool = True):
+        self.db_path = db_path
+        self.workers = workers or os.cpu_count() or 1
+        self.batch_size = batch_size
+        self.include_archives = include_archives  # Lê também storage/database/archive/*.db
+
+    def run(self, configs: List[BacktestConfig], since: str = "0000",
+            until: str = "9999") -> List[Dict]:
+        """Avalia todas as configurações e retorna os resultados ordenados por ROI"""
+        if not configs:
+            return []
+
+        # Cada worker recebe um bloco de configurações e faz uma única passada pelo histórico
+        workers = min(self.workers, len(configs))
+        chunk_size = math.ceil(len(configs) / workers)
+        chunks = [configs[i:i + chunk_size] for i in range(0, len(configs), chunk_size)]
+
+        logger.info(f"Backtest: {len(configs)} configurações em {len(chunks)} workers")
+
+        results = []
+        if len(chunks) == 1:
+            results.extend(_evaluate_chunk(self.db_path, chunks[0], since, until, self.batch_size,
+                                           self.include_archives))
+        else:
+            with ProcessPoolExecutor(max_workers=len(chunks)) as executor:
+                futures = [
+                    executor.submit(_evaluate_chunk, self.db_path, chunk, since, until, self.batch_size,
+                                    self.include_archives)
+                    for chunk in chunks
+                ]
+                for future in futures:
+                    results.extend(future.result())
+
+        results.sort(key=lambda r: (r["roi"] is not None, r["roi"] or 0, r["bets"]), reverse=True)
+        logger.info(f"Backtest concluído: {len(results)} configurações avaliadas")
+        return results
+
+def _optional_floats(values: List[str]) -> List[Optional[float]]:
+    """Converte valores da CLI, aceitando 'none' para desativar o filtro"""
+    return [None if v.lower() == "none" else float(v) for v in values]
+
+def main():
+    """Linha de comando do backtest"""
+    parser = argparse.ArgumentParser(description="Backtest de oportunidades do TennisQ")
+    parser.add_argument("--db", default="storage/database/prelive.db")
+    parser.add_argument("--since", default="0000", help="created_at inicial (ISO)")
+    parser.add_argument("--until", default="9999", help="created_at final (ISO, exclusivo)")
+    parser.add_argument("--odd-min", nargs="+", type=float, default=[4.00])
+    parser.add_argument("--odd-max", nargs="+", type=float, default=[6.00])
+    parser.add_argument("--ev-min", nargs="+", default=["none"])
+    parser.add_argument("--ev-max", nargs="+", default=["none"])
+    parser.add_argument("--hours-min", nargs="+", type=float, default=[0.0])
+    parser.add_argument("--hours-max", nargs="+", type=float, default=[72.0])
+    parser.add_argument("--league-set", action="append", default=None,
+                        help="Lista de termos de liga separados por vírgula (repetível)")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--live-only", action="store_true", help="Ignora os arquivos mensais do histórico")
+    parser.add_argument("--top", type=int, default=20)
+    parser.add_argument("--output", default=None, help="Arquivo JSON com todos os resultados")
+    args = parser.parse_args()
+
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+    )
+
+    league_sets: List[Optional[Tuple[str, ...]]] = [None]
+    if args.league_set:
+        league_sets = [
+            tuple(term.strip().lower() for term in league_set.split(",") if term.strip())
+            for league_set in args.league_set
+        ]
+
+    grid = build_grid(
+        args.odd_min, args.odd_max,
+        _optional_floats(args.ev_min), _optional_floats(args.ev_max),
+        args.hours_min, args.hours_max,
+        league_sets
+    )
+
+    engine = BacktestEngine(db_path=args.db, workers=args.workers, include_archives=not args.live_only)
+    results = engine.run(grid, since=args.since, until=args.until)
+
+    if args.output:
+        Path(args.output).parent.mkdir(parents=True, exist_ok=True)
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2, ensure_ascii=False)
+        logger.info(f"Resultados salvos em {args.output}")
+
+    print(f"\n=== TOP {args.top} CONFIGURAÇÕES ===")
+    for i, result in enumerate(results[:args.top], 1):
+        config = result["config"]
+        print(f"{i}. Odds {config['odd_min']}-{config['odd_max']} | "
+              f"EV {config['ev_min']}-{config['ev_max']} | "
+              f"Horas {config['hours_min']}-{config['hours_max']} | "
+              f"Ligas {config['leagues'] or 'feminino'}")
+        print(f"   Apostas: {result['bets']} | Liquidadas: {result['settled']} | "
+              f"Acerto: {result['hit_rate']} | ROI: {result['roi']} | CLV médio: {result['avg_clv']}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+"""
+Carregamento da configuração (config.json ou variáveis de ambiente)
+Lida uma única vez por processo e por caminho; as chamadas seguintes usam o cache
+"""
+
+import json
+import logging
+import os
+import threading
+from typing import Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+# config.json dentro de backend/, independente do diretório atual
+BACKEND_CONFIG_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "config", "config.json")
+
+# Localizações alternativas (relativas ao diretório atual), na ordem de tentativa
+CONFIG_CANDIDATES = [
+    "../config/config.json",
+    "config/config.json",
+    "backend/config/config.json",
+    BACKEND_CONFIG_PATH
+]
+
+_cache: Dict[Optional[str], Dict] = {}
+_lock = threading.Lock()
+
+def _from_environment() -> Dict:
+    """Configuração mínima a partir das variáveis de ambiente"""
+    return {
+        "api_key": os.environ.get("API_KEY", "226997-BVn3XP4cGLAUfL"),
+        "api_base_url": os.environ.get("API_BASE_URL", "https://api.b365api.com"),
+        "telegram_token": os.environ.get("TELEGRAM_TOKEN", ""),
+        "chat_id": os.environ.get("CHAT_ID", ""),
+        "channel_id": os.environ.get("CHANNEL_ID", "")
+    }
+
+def load_config(config_path: str = None) -> Dict:
+    """Retorna a configuração (cópia), tentando config_path e depois as localizações padrão"""
+    with _lock:
+        if config_path not in _cache:
+            _cache[config_path] = _load(config_path)
+        return dict(_cache[config_path])
+
+def _load(config_path: Optional[str]) -> Dict:
+    for path in ([config_path] if config_path else []) + CONFIG_CANDIDATES:
+        try:
+            with open(path, 'r') as f:
+                config = json.load(f)
+            logger.info(f"✅ Config carregada de: {path}")
+            return config
+        except FileNotFoundError:
+            continue
+
+    logger.warning("⚠️ Config file não encontrado, usando variáveis de ambiente")
+    return _from_environment()
+
+def clear_config_cache():
+    """Descarta o cache (ex: após editar o config.json em execução)"""
+    with _lock:
+        _cache.clear()
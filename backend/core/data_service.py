@@ -0,0 +1,167 @@
+"""
+Camada de dados compartilhada pelo processo
+Um único PreLiveDatabase (conexões por thread) com os caches em memória usados por
+TennisQRailwayApp, PreLiveManager e LineMonitoringService: anti-duplicatas, últimas odds e snapshots
+"""
+
+import logging
+import threading
+import time
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import TYPE_CHECKING, Dict, List, Optional, Tuple
+
+from .database import PreLiveDatabase
+from .metrics import metrics
+
+if TYPE_CHECKING:
+    from .prelive_scanner import Opportunity
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_DB_PATH = "storage/database/prelive.db"
+SENT_CACHE_TTL = 300  # Segundos até recarregar o anti-duplicatas do banco (resets/limpezas externos)
+
+@dataclass
+class LatestOdds:
+    """Últimas odds conhecidas de um evento (mesmos campos usados do OddsData do scanner)"""
+    event_id: str
+    home_od: float
+    away_od: float
+    timestamp: str
+    fetched_at: float  # time.monotonic() da leitura
+
+class DataService(PreLiveDatabase):
+    """
+    PreLiveDatabase com caches coerentes entre todos os componentes do processo
+    O cache anti-duplicatas vale para o processo do scheduler, o único que envia notificações
+    """
+
+    def __init__(self, db_path: str = DEFAULT_DB_PATH):
+        super().__init__(db_path)
+        self._lock = threading.RLock()
+        self._sent: Optional[Dict[str, str]] = None  # hash -> expires_at (carregado sob demanda)
+        self._sent_loaded_at = 0.0
+        self._latest_odds: Dict[str, LatestOdds] = {}
+        self._snapshots: Dict[str, Tuple[float, Dict]] = {}  # key -> (monotonic, dados)
+
+    # Anti-duplicatas
+
+    def _sent_hashes(self) -> Dict[str, str]:
+        if self._sent is None or time.monotonic() - self._sent_loaded_at > SENT_CACHE_TTL:
+            with self._connect() as conn:
+                rows = conn.execute("SELECT opportunity_hash, expires_at FROM sent_opportunities WHERE expires_at > ?",
+                                    (datetime.utcnow().isoformat(),)).fetchall()
+            self._sent = dict(rows)
+            self._sent_loaded_at = time.monotonic()
+            logger.debug("Cache anti-duplicatas carregado: %d oportunidades", len(self._sent))
+        return self._sent
+
+    def is_opportunity_already_sent(self, opportunity: 'Opportunity') -> bool:
+        """Verifica se uma oportunidade já foi enviada (memória; na ausência, confere o banco)"""
+        opportunity_hash = self._generate_opportunity_hash(opportunity)
+        now = datetime.utcnow().isoformat()
+        with self._lock:
+            expires_at = self._sent_hashes().get(opportunity_hash)
+        if expires_at is not None and expires_at > now:
+            return True
+
+        # Outro processo (ex: scheduler anterior) pode ter enviado depois da última carga
+        with self._connect() as conn:
+            row = conn.execute("SELECT expires_at FROM sent_opportunities WHERE opportunity_hash = ? AND expires_at > ?",
+                               (opportunity_hash, now)).fetchone()
+        if row is None:
+            return False
+        with self._lock:
+            self._sent_hashes()[opportunity_hash] = row[0]
+        return True
+
+    def mark_opportunity_as_sent(self, opportunity: 'Opportunity', expires_hours: int = 24):
+        """Marca uma oportunidade como enviada (memória e banco)"""
+        with self._lock:
+            super().mark_opportunity_as_sent(opportunity, expires_hours)
+            expires_at = (datetime.utcnow() + timedelta(hours=expires_hours)).isoformat()
+            self._sent_hashes()[self._generate_opportunity_hash(opportunity)] = expires_at
+
+    def cleanup_expired_sent_opportunities(self):
+        with self._lock:
+            super().cleanup_expired_sent_opportunities()
+            if self._sent is not None:
+                now = datetime.utcnow().isoformat()
+                self._sent = {h: exp for h, exp in self._sent.items() if exp > now}
+
+    def reset_sent_opportunities(self):
+        with self._lock:
+            deleted_count = super().reset_sent_opportunities()
+            self._sent = {}
+            return deleted_count
+
+    # Últimas odds
+
+    def save_line_movement(self, event_id: str, home_od: float, away_od: float,
+                           timestamp: str = None) -> bool:
+        saved = super().save_line_movement(event_id, home_od, away_od, timestamp)
+        self.remember_odds(event_id, home_od, away_od, timestamp)
+        return saved
+
+    def remember_odds(self, event_id: str, home_od: float, away_od: float, timestamp: str = None):
+        """Atualiza o cache de últimas odds sem gravar movimento de linha"""
+        with self._lock:
+            self._latest_odds[event_id] = LatestOdds(event_id, home_od, away_od,
+                                                     timestamp or datetime.utcnow().isoformat(),
+                                                     time.monotonic())
+
+    def get_latest_odds(self, event_id: str, max_age: float) -> Optional[LatestOdds]:
+        """Últimas odds do evento se lidas há no máximo max_age segundos"""
+        with self._lock:
+            odds = self._latest_odds.get(event_id)
+        hit = odds is not None and time.monotonic() - odds.fetched_at <= max_age
+        metrics.record_cache("latest_odds", hit)
+        return odds if hit else None
+
+    def forget_odds(self, event_id: str):
+        with self._lock:
+            self._latest_odds.pop(event_id, None)
+
+    def mark_opportunity_expired(self, event_id: str):
+        super().mark_opportunity_expired(event_id)
+        self.forget_odds(event_id)
+
+    def expire_started_opportunities(self, now: str = None) -> List[str]:
+        event_ids = super().expire_started_opportunities(now)
+        for event_id in event_ids:
+            self.forget_odds(event_id)
+        return event_ids
+
+    # Snapshots
+
+    def save_snapshot(self, key: str, data: Dict):
+        """Publica o snapshot no banco (outros workers) e o mantém em memória (este processo)"""
+        super().save_snapshot(key, data)
+        with self._lock:
+            self._snapshots[key] = (time.monotonic(), data)
+
+    def cache_snapshot(self, key: str, data: Dict):
+        """Guarda o snapshot só em memória"""
+        with self._lock:
+            self._snapshots[key] = (time.monotonic(), data)
+
+    def get_cached_snapshot(self, key: str, max_age: float) -> Optional[Dict]:
+        """Snapshot em memória se gerado há no máximo max_age segundos"""
+        with self._lock:
+            entry = self._snapshots.get(key)
+        hit = entry is not None and time.monotonic() - entry[0] <= max_age
+        metrics.record_cache(f"snapshot_{key}", hit)
+        return entry[1] if hit else None
+
+_services: Dict[str, DataService] = {}
+_services_lock = threading.Lock()
+
+def get_data_service(db_path: str = DEFAULT_DB_PATH) -> DataService:
+    """DataService do processo para o banco indicado (criado na primeira chamada)"""
+    key = str(Path(db_path).resolve())
+    with _services_lock:
+        if key not in _services:
+            _services[key] = DataService(db_path)
+        return _services[key]
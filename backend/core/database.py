@@ -3,102 +3,239 @@ Sistema de banco de dados para armazenar oportunidades e movimento de linha
 """
 
 import sqlite3
+import base64
 import json
-from datetime import datetime
-from typing import List, Dict, Optional
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import TYPE_CHECKING, List, Dict, Optional, Tuple
 from dataclasses import asdict
 import logging
 from pathlib import Path
 
-from .prelive_scanner import Opportunity
+from .metrics import metrics
+
+if TYPE_CHECKING:
+    # Só para anotações: importar o scanner puxaria requests no startup
+    from .prelive_scanner import Opportunity
 
 logger = logging.getLogger(__name__)
 
+# Versão do schema gravada em PRAGMA user_version; incrementar ao mudar tabelas/índices
+SCHEMA_VERSION = 4
+
+# Formato de opportunities.start_utc (gerado pelo scanner); comparações de texto exigem o mesmo formato
+START_UTC_FORMAT = "%Y-%m-%d %H:%M"
+
+# Ordenações de query_opportunities: nome -> (coluna, direção padrão); o id desempata
+OPPORTUNITY_SORTS = {
+    "ev": ("ev", "DESC"),
+    "odd": ("odd", "DESC"),
+    "start": ("start_utc", "ASC"),
+    "created": ("created_at", "DESC"),
+}
+OPPORTUNITY_COLUMNS = ("id", "event_id", "match_name", "start_utc", "league", "side", "odd",
+                       "p_model", "ev", "p_market", "confidence", "created_at")
+
+# Bancos já verificados neste processo (o schema é conferido uma vez por processo)
+_schema_ready = set()
+_schema_lock = threading.Lock()
+
 class PreLiveDatabase:
     def __init__(self, db_path: str = "storage/database/prelive.db"):
         self.db_path = Path(db_path)
         self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self._local = threading.local()
         self.init_database()
     
+    def _connect(self) -> sqlite3.Connection:
+        """
+        Conexão da thread atual, reaproveitada entre chamadas
+        Usada como `with self._connect() as conn`: o bloco faz commit/rollback mas não fecha a conexão
+        """
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=30)
+            self._local.conn = conn
+        return conn
+    
     def init_database(self):
-        """Inicializa as tabelas do banco de dados"""
-        with sqlite3.connect(self.db_path) as conn:
-            cursor = conn.cursor()
-            
-            # Tabela de oportunidades
-            cursor.execute("""
-                CREATE TABLE IF NOT EXISTS opportunities (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    event_id TEXT NOT NULL,
-                    match_name TEXT NOT NULL,
-                    start_utc TEXT NOT NULL,
-                    league TEXT,
-                    side TEXT NOT NULL,
-                    odd REAL NOT NULL,
-                    p_model REAL NOT NULL,
-                    ev REAL NOT NULL,
-                    p_market REAL NOT NULL,
-                    confidence TEXT,
-                    created_at TEXT NOT NULL,
-                    status TEXT DEFAULT 'ACTIVE'
-                )
-            """)
-            
-            # Tabela de movimento de linha
-            cursor.execute("""
-                CREATE TABLE IF NOT EXISTS line_movements (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    event_id TEXT NOT NULL,
-                    home_od REAL NOT NULL,
-                    away_od REAL NOT NULL,
-                    timestamp TEXT NOT NULL,
-                    created_at TEXT NOT NULL
-                )
-            """)
+        """Inicializa as tabelas do banco de dados (uma vez por processo, se a versão mudou)"""
+        key = str(self.db_path.resolve())
+        if key in _schema_ready:
+            return
+        
+        with _schema_lock:
+            if key in _schema_ready:
+                return
             
-            # Tabela para controlar oportunidades já enviadas
-            cursor.execute("""
-                CREATE TABLE IF NOT EXISTS sent_opportunities (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    opportunity_hash TEXT UNIQUE NOT NULL,
-                    event_id TEXT NOT NULL,
-                    match_name TEXT NOT NULL,
-                    side TEXT NOT NULL,
-                    odd REAL NOT NULL,
-                    ev REAL NOT NULL,
-                    sent_at TEXT NOT NULL,
-                    expires_at TEXT NOT NULL
-                )
-            """)
+            with sqlite3.connect(self.db_path) as conn:
+                version = conn.execute("PRAGMA user_version").fetchone()[0]
+                if version < SCHEMA_VERSION:
+                    self._create_schema(conn)
+                    conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+                    conn.commit()
+                    logger.info(f"Banco de dados inicializado (schema v{version} → v{SCHEMA_VERSION})")
             
-            # Tabela de resultados (para calcular CLV posteriormente)
-            cursor.execute("""
-                CREATE TABLE IF NOT EXISTS match_results (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    event_id TEXT UNIQUE NOT NULL,
-                    winner TEXT,
-                    home_score TEXT,
-                    away_score TEXT,
-                    completed_at TEXT,
-                    created_at TEXT NOT NULL
-                )
+            _schema_ready.add(key)
+    
+    def _create_schema(self, conn: sqlite3.Connection):
+        """Cria tabelas e índices (idempotente)"""
+        cursor = conn.cursor()
+        
+        # Vacuum incremental (só tem efeito antes da primeira tabela; bancos antigos são
+        # convertidos pela manutenção, core/maintenance.py)
+        cursor.execute("PRAGMA auto_vacuum = INCREMENTAL")
+        
+        # WAL: leitores (workers HTTP) não bloqueiam o processo que escreve (scheduler)
+        cursor.execute("PRAGMA journal_mode=WAL")
+        
+        # Tabela de oportunidades
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS opportunities (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                event_id TEXT NOT NULL,
+                match_name TEXT NOT NULL,
+                start_utc TEXT NOT NULL,
+                league TEXT,
+                side TEXT NOT NULL,
+                odd REAL NOT NULL,
+                p_model REAL NOT NULL,
+                ev REAL NOT NULL,
+                p_market REAL NOT NULL,
+                confidence TEXT,
+                created_at TEXT NOT NULL,
+                status TEXT DEFAULT 'ACTIVE'
+            )
+        """)
+        
+        # Tabela de movimento de linha
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS line_movements (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                event_id TEXT NOT NULL,
+                home_od REAL NOT NULL,
+                away_od REAL NOT NULL,
+                timestamp TEXT NOT NULL,
+                created_at TEXT NOT NULL
+            )
+        """)
+        
+        # Tabela para controlar oportunidades já enviadas
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS sent_opportunities (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                opportunity_hash TEXT UNIQUE NOT NULL,
+                event_id TEXT NOT NULL,
+                match_name TEXT NOT NULL,
+                side TEXT NOT NULL,
+                odd REAL NOT NULL,
+                ev REAL NOT NULL,
+                sent_at TEXT NOT NULL,
+                expires_at TEXT NOT NULL
+            )
+        """)
+        
+        # Tabela de resultados (para calcular CLV posteriormente)
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS match_results (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                event_id TEXT UNIQUE NOT NULL,
+                winner TEXT,
+                home_score TEXT,
+                away_score TEXT,
+                completed_at TEXT,
+                created_at TEXT NOT NULL
+            )
+        """)
+        
+        # Estado de processos incrementais (ex: última ingestão de resultados)
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS ingestion_state (
+                key TEXT PRIMARY KEY,
+                value TEXT NOT NULL,
+                updated_at TEXT NOT NULL
+            )
+        """)
+        
+        # Snapshots publicados pelo processo do scheduler para os demais workers
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS snapshots (
+                key TEXT PRIMARY KEY,
+                data TEXT NOT NULL,
+                updated_at TEXT NOT NULL
+            )
+        """)
+        
+        # Jobs de scan manual (compartilhados entre processos)
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS scan_jobs (
+                job_id TEXT PRIMARY KEY,
+                status TEXT NOT NULL,
+                data TEXT NOT NULL,
+                created_at TEXT NOT NULL,
+                updated_at TEXT NOT NULL
+            )
+        """)
+        
+        # Ratings incrementais (core/ratings.py): Elo por superfície, forma e eventos já aplicados
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS player_ratings (
+                player_key TEXT NOT NULL,
+                surface TEXT NOT NULL,
+                elo REAL NOT NULL,
+                matches INTEGER NOT NULL,
+                updated_at TEXT NOT NULL,
+                PRIMARY KEY (player_key, surface)
+            )
+        """)
+        
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS player_form (
+                player_key TEXT PRIMARY KEY,
+                name TEXT NOT NULL,
+                form REAL NOT NULL,
+                matches INTEGER NOT NULL,
+                last_match_at TEXT
+            )
+        """)
+        
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS rated_events (
+                event_id TEXT PRIMARY KEY,
+                rated_at TEXT NOT NULL
+            )
+        """)
+        
+        # update_ids do Telegram já recebidos (dedup de reentregas entre os workers do webhook)
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS telegram_updates (
+                update_id INTEGER PRIMARY KEY,
+                received_at TEXT NOT NULL
+            )
+        """)
+        
+        # Índices para performance
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_opportunities_event_id ON opportunities(event_id)")
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_opportunities_created_at ON opportunities(created_at)")
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_line_movements_event_id ON line_movements(event_id)")
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_line_movements_timestamp ON line_movements(timestamp)")
+        
+        # Paginação por keyset das oportunidades ativas (query_opportunities): um índice parcial por ordenação
+        for sort, (column, _) in OPPORTUNITY_SORTS.items():
+            cursor.execute(f"""
+                CREATE INDEX IF NOT EXISTS idx_opportunities_active_{sort}
+                ON opportunities({column}, id) WHERE status = 'ACTIVE'
             """)
-            
-            # Índices para performance
-            cursor.execute("CREATE INDEX IF NOT EXISTS idx_opportunities_event_id ON opportunities(event_id)")
-            cursor.execute("CREATE INDEX IF NOT EXISTS idx_opportunities_created_at ON opportunities(created_at)")
-            cursor.execute("CREATE INDEX IF NOT EXISTS idx_line_movements_event_id ON line_movements(event_id)")
-            cursor.execute("CREATE INDEX IF NOT EXISTS idx_line_movements_timestamp ON line_movements(timestamp)")
-            
-            conn.commit()
-            logger.info("Banco de dados inicializado com sucesso")
+        
+        conn.commit()
     
-    def save_opportunities(self, opportunities: List[Opportunity]) -> int:
+    def save_opportunities(self, opportunities: List['Opportunity']) -> int:
         """Salva uma lista de oportunidades no banco"""
         if not opportunities:
             return 0
             
-        with sqlite3.connect(self.db_path) as conn:
+        with metrics.timer("db_write"), self._connect() as conn:
             cursor = conn.cursor()
             created_at = datetime.utcnow().isoformat()
             
@@ -130,7 +267,7 @@ class PreLiveDatabase:
             timestamp = datetime.utcnow().isoformat()
             
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            with metrics.timer("db_write"), self._connect() as conn:
                 cursor = conn.cursor()
                 cursor.execute("""
                     INSERT INTO line_movements (event_id, home_od, away_od, timestamp, created_at)
@@ -144,10 +281,9 @@ class PreLiveDatabase:
     
     def get_active_opportunities(self, min_hours_ahead: int = 1) -> List[Dict]:
         """Busca oportunidades ativas (jogos que ainda não começaram)"""
-        cutoff_time = (datetime.utcnow().replace(microsecond=0) + 
-                      timedelta(hours=min_hours_ahead)).isoformat()
+        cutoff_time = start_cutoff(min_hours_ahead)
         
-        with sqlite3.connect(self.db_path) as conn:
+        with self._connect() as conn:
             cursor = conn.cursor()
             cursor.execute("""
                 SELECT DISTINCT event_id, match_name, start_utc, league,
@@ -160,6 +296,58 @@ class PreLiveDatabase:
             columns = [desc[0] for desc in cursor.description]
             return [dict(zip(columns, row)) for row in cursor.fetchall()]
     
+    def query_opportunities(self, limit: int = 20, cursor: str = None, sort: str = "start", order: str = None,
+                            league: str = None, side: str = None, odd_min: float = None, odd_max: float = None,
+                            min_hours_ahead: float = 1) -> Tuple[List[Dict], Optional[str]]:
+        """
+        Página de oportunidades ativas com filtros e paginação por keyset
+        Percorre o índice parcial da ordenação a partir do cursor (sem OFFSET nem ordenação completa);
+        retorna (oportunidades, próximo cursor ou None na última página)
+        """
+        if sort not in OPPORTUNITY_SORTS:
+            raise ValueError(f"Ordenação inválida: {sort} (use {', '.join(OPPORTUNITY_SORTS)})")
+        column, default_order = OPPORTUNITY_SORTS[sort]
+        order = (order or default_order).upper()
+        if order not in ("ASC", "DESC"):
+            raise ValueError(f"Direção inválida: {order}")
+        
+        where = ["status = 'ACTIVE'", "start_utc > ?"]
+        params: List = [start_cutoff(min_hours_ahead)]
+        if league:
+            where.append("league LIKE ?")
+            params.append(f"%{league}%")
+        if side:
+            where.append("side = ?")
+            params.append(side.upper())
+        if odd_min is not None:
+            where.append("odd >= ?")
+            params.append(odd_min)
+        if odd_max is not None:
+            where.append("odd <= ?")
+            params.append(odd_max)
+        if cursor:
+            cursor_sort, cursor_order, value, last_id = decode_cursor(cursor)
+            if (cursor_sort, cursor_order) != (sort, order):
+                raise ValueError("Cursor de outra ordenação")
+            where.append(f"({column}, id) {'<' if order == 'DESC' else '>'} (?, ?)")
+            params.extend([value, last_id])
+        
+        with self._connect() as conn:
+            rows = conn.execute(f"""
+                SELECT {', '.join(OPPORTUNITY_COLUMNS)}
+                FROM opportunities
+                WHERE {' AND '.join(where)}
+                ORDER BY {column} {order}, id {order}
+                LIMIT ?
+            """, (*params, limit + 1)).fetchall()
+        
+        opportunities = [dict(zip(OPPORTUNITY_COLUMNS, row)) for row in rows[:limit]]
+        next_cursor = None
+        if len(rows) > limit:
+            last = opportunities[-1]
+            next_cursor = encode_cursor(sort, order, last[column], last["id"])
+        return opportunities, next_cursor
+    
     # MÉTODO DESABILITADO: get_opportunities_for_notification()
     # Removido filtro de 24h - agora envia qualquer horário
     # def get_opportunities_for_notification(self, min_hours_ahead: int = 24) -> List[Dict]:
@@ -189,7 +377,7 @@ class PreLiveDatabase:
     
     def get_line_movements(self, event_id: str) -> List[Dict]:
         """Busca histórico de movimento de linha de um evento"""
-        with sqlite3.connect(self.db_path) as conn:
+        with self._connect() as conn:
             cursor = conn.cursor()
             cursor.execute("""
                 SELECT home_od, away_od, timestamp, created_at
@@ -217,7 +405,8 @@ class PreLiveDatabase:
     
     def get_statistics(self) -> Dict:
         """Retorna estatísticas gerais do sistema"""
-        with sqlite3.connect(self.db_path) as conn:
+        now = start_cutoff(0)
+        with self._connect() as conn:
             cursor = conn.cursor()
             
             # Total de oportunidades
@@ -228,14 +417,14 @@ class PreLiveDatabase:
             cursor.execute("""
                 SELECT COUNT(*) FROM opportunities 
                 WHERE status = 'ACTIVE' AND start_utc > ?
-            """, (datetime.utcnow().isoformat(),))
+            """, (now,))
             active_opportunities = cursor.fetchone()[0]
             
             # EV médio das oportunidades ativas
             cursor.execute("""
                 SELECT AVG(ev) FROM opportunities 
                 WHERE status = 'ACTIVE' AND start_utc > ?
-            """, (datetime.utcnow().isoformat(),))
+            """, (now,))
             avg_ev = cursor.fetchone()[0] or 0
             
             # Distribuição por confiança
@@ -243,7 +432,7 @@ class PreLiveDatabase:
                 SELECT confidence, COUNT(*) FROM opportunities 
                 WHERE status = 'ACTIVE' AND start_utc > ?
                 GROUP BY confidence
-            """, (datetime.utcnow().isoformat(),))
+            """, (now,))
             confidence_dist = dict(cursor.fetchall())
             
             return {
@@ -253,9 +442,47 @@ class PreLiveDatabase:
                 "confidence_distribution": confidence_dist
             }
     
+    def expire_started_opportunities(self, now: str = None) -> List[str]:
+        """Marca como expiradas, num único UPDATE, as oportunidades ativas de jogos já iniciados"""
+        now = now or datetime.utcnow().isoformat()
+        with self._connect() as conn:
+            event_ids = [row[0] for row in conn.execute("""
+                SELECT DISTINCT event_id FROM opportunities
+                WHERE status = 'ACTIVE' AND datetime(start_utc) <= datetime(?)
+            """, (now,))]
+            if event_ids:
+                conn.execute("""
+                    UPDATE opportunities 
+                    SET status = 'EXPIRED' 
+                    WHERE status = 'ACTIVE' AND datetime(start_utc) <= datetime(?)
+                """, (now,))
+                conn.commit()
+        return event_ids
+    
+    def delete_in_batches(self, table: str, where: str, params: Tuple = (),
+                          batch_size: int = 500, pause: float = 0.0) -> int:
+        """
+        DELETE em lotes de batch_size linhas, cada lote na sua transação
+        A pausa entre lotes deixa os escritores (monitoramento/scan) entrarem
+        """
+        deleted = 0
+        while True:
+            with self._connect() as conn:
+                cursor = conn.execute(f"""
+                    DELETE FROM {table} WHERE rowid IN (
+                        SELECT rowid FROM {table} WHERE {where} LIMIT ?
+                    )
+                """, (*params, batch_size))
+                conn.commit()
+            deleted += cursor.rowcount
+            if cursor.rowcount < batch_size:
+                return deleted
+            if pause:
+                time.sleep(pause)
+    
     def mark_opportunity_expired(self, event_id: str):
         """Marca oportunidades como expiradas"""
-        with sqlite3.connect(self.db_path) as conn:
+        with self._connect() as conn:
             cursor = conn.cursor()
             cursor.execute("""
                 UPDATE opportunities 
@@ -264,33 +491,26 @@ class PreLiveDatabase:
             """, (event_id,))
             conn.commit()
     
-    def cleanup_old_data(self, days_old: int = 30):
-        """Remove dados antigos do banco"""
+    def cleanup_old_data(self, days_old: int = 30, batch_size: int = 500, pause: float = 0.0) -> Dict[str, int]:
+        """Remove dados antigos do banco (em lotes)"""
         cutoff_date = (datetime.utcnow() - timedelta(days=days_old)).isoformat()
         
-        with sqlite3.connect(self.db_path) as conn:
-            cursor = conn.cursor()
-            
-            # Remove oportunidades antigas
-            cursor.execute("""
-                DELETE FROM opportunities 
-                WHERE created_at < ? AND status != 'ACTIVE'
-            """, (cutoff_date,))
-            
-            # Remove movimentos de linha antigos
-            cursor.execute("""
-                DELETE FROM line_movements 
-                WHERE created_at < ?
-            """, (cutoff_date,))
-            
-            conn.commit()
-            logger.info(f"Limpeza de dados antigos concluída (> {days_old} dias)")
+        deleted = {
+            # Oportunidades antigas que já saíram de ACTIVE
+            "opportunities": self.delete_in_batches(
+                "opportunities", "created_at < ? AND status != 'ACTIVE'", (cutoff_date,), batch_size, pause),
+            # Movimentos de linha antigos
+            "line_movements": self.delete_in_batches(
+                "line_movements", "created_at < ?", (cutoff_date,), batch_size, pause)
+        }
+        logger.info(f"Limpeza de dados antigos concluída (> {days_old} dias): {deleted}")
+        return deleted
 
     def is_opportunity_already_sent(self, opportunity: 'Opportunity') -> bool:
         """Verifica se uma oportunidade já foi enviada"""
         opportunity_hash = self._generate_opportunity_hash(opportunity)
         
-        with sqlite3.connect(self.db_path) as conn:
+        with self._connect() as conn:
             cursor = conn.cursor()
             cursor.execute("""
                 SELECT COUNT(*) FROM sent_opportunities 
@@ -304,7 +524,7 @@ class PreLiveDatabase:
         opportunity_hash = self._generate_opportunity_hash(opportunity)
         expires_at = datetime.utcnow() + timedelta(hours=expires_hours)
         
-        with sqlite3.connect(self.db_path) as conn:
+        with self._connect() as conn:
             cursor = conn.cursor()
             cursor.execute("""
                 INSERT OR REPLACE INTO sent_opportunities
@@ -331,7 +551,7 @@ class PreLiveDatabase:
 
     def cleanup_expired_sent_opportunities(self):
         """Remove oportunidades enviadas que já expiraram"""
-        with sqlite3.connect(self.db_path) as conn:
+        with self._connect() as conn:
             cursor = conn.cursor()
             cursor.execute("""
                 DELETE FROM sent_opportunities 
@@ -344,7 +564,7 @@ class PreLiveDatabase:
     
     def reset_sent_opportunities(self):
         """RESET: Remove todas as oportunidades enviadas para permitir reenvio"""
-        with sqlite3.connect(self.db_path) as conn:
+        with self._connect() as conn:
             cursor = conn.cursor()
             cursor.execute("DELETE FROM sent_opportunities")
             
@@ -352,22 +572,258 @@ class PreLiveDatabase:
             logger.info(f"RESET: Removidas {deleted_count} oportunidades da tabela anti-duplicatas")
             return deleted_count
 
-# Funções utilitárias
-from datetime import timedelta
-
-def export_opportunities_to_json(db: PreLiveDatabase, 
-                                filename: str = None) -> str:
-    """Exporta oportunidades ativas para JSON"""
-    if not filename:
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        filename = f"storage/exports/opportunities_{timestamp}.json"
+    def get_state(self, key: str) -> Optional[str]:
+        """Lê um valor da tabela de estado incremental"""
+        with self._connect() as conn:
+            cursor = conn.cursor()
+            cursor.execute("SELECT value FROM ingestion_state WHERE key = ?", (key,))
+            row = cursor.fetchone()
+            return row[0] if row else None
+    
+    def set_state(self, key: str, value: str):
+        """Grava um valor na tabela de estado incremental"""
+        with self._connect() as conn:
+            cursor = conn.cursor()
+            cursor.execute("""
+                INSERT INTO ingestion_state (key, value, updated_at) VALUES (?, ?, ?)
+                ON CONFLICT(key) DO UPDATE SET value = excluded.value, updated_at = excluded.updated_at
+            """, (key, value, datetime.utcnow().isoformat()))
+            conn.commit()
+    
+    def claim_telegram_update(self, update_id: int) -> bool:
+        """Registra o update_id; False se algum processo já o recebeu (INSERT OR IGNORE atômico)"""
+        with self._connect() as conn:
+            cursor = conn.execute("INSERT OR IGNORE INTO telegram_updates (update_id, received_at) VALUES (?, ?)",
+                                  (update_id, datetime.utcnow().isoformat()))
+            return cursor.rowcount == 1
+    
+    def release_telegram_update(self, update_id: int):
+        """Desfaz o registro (update recusado: o Telegram vai reenviar)"""
+        with self._connect() as conn:
+            conn.execute("DELETE FROM telegram_updates WHERE update_id = ?", (update_id,))
+    
+    def cleanup_telegram_updates(self, max_age_hours: float = 48) -> int:
+        """Remove update_ids antigos (o Telegram não reentrega depois de 24h)"""
+        cutoff = (datetime.utcnow() - timedelta(hours=max_age_hours)).isoformat()
+        with self._connect() as conn:
+            return conn.execute("DELETE FROM telegram_updates WHERE received_at < ?", (cutoff,)).rowcount
+    
+    def get_unsettled_events(self, since: str, until: str) -> Dict[str, str]:
+        """
+        Retorna {event_id: start_utc} dos jogos já iniciados e ainda não liquidados
+        O sufixo "_away" das oportunidades é removido para obter o ID real do evento
+        """
+        with self._connect() as conn:
+            cursor = conn.cursor()
+            cursor.execute("""
+                SELECT REPLACE(event_id, '_away', '') AS base_id, MIN(start_utc)
+                FROM opportunities
+                WHERE status != 'SETTLED'
+                  AND datetime(start_utc) > datetime(?)
+                  AND datetime(start_utc) <= datetime(?)
+                GROUP BY base_id
+            """, (since, until))
+            return dict(cursor.fetchall())
+    
+    def get_events_info(self, event_ids: List[str]) -> Dict[str, Dict]:
+        """Partida e liga de cada evento (ID real, sem o sufixo "_away") a partir das oportunidades"""
+        if not event_ids:
+            return {}
+        
+        info = {}
+        with self._connect() as conn:
+            for start in range(0, len(event_ids), 400):  # 2 parâmetros por evento (limite do SQLite)
+                chunk = [str(event_id) for event_id in event_ids[start:start + 400]]
+                # IDs exatos (HOME e "_away"): usa idx_opportunities_event_id em vez de varrer a tabela
+                params = chunk + [f"{event_id}_away" for event_id in chunk]
+                rows = conn.execute(f"""
+                    SELECT event_id, match_name, league, start_utc
+                    FROM opportunities WHERE event_id IN ({",".join("?" * len(params))})
+                """, params).fetchall()
+                for event_id, match_name, league, start_utc in rows:
+                    base_id = event_id[:-len("_away")] if event_id.endswith("_away") else event_id
+                    info.setdefault(base_id, {"match_name": match_name, "league": league, "start_utc": start_utc})
+        return info
+    
+    def upsert_match_results(self, results: List[Dict]) -> int:
+        """Insere ou atualiza resultados de partidas em lote"""
+        if not results:
+            return 0
+        
+        created_at = datetime.utcnow().isoformat()
+        with self._connect() as conn:
+            cursor = conn.cursor()
+            cursor.executemany("""
+                INSERT INTO match_results (event_id, winner, home_score, away_score, completed_at, created_at)
+                VALUES (?, ?, ?, ?, ?, ?)
+                ON CONFLICT(event_id) DO UPDATE SET
+                    winner = excluded.winner,
+                    home_score = excluded.home_score,
+                    away_score = excluded.away_score,
+                    completed_at = excluded.completed_at
+            """, [
+                (r["event_id"], r["winner"], r["home_score"], r["away_score"],
+                 r["completed_at"], created_at)
+                for r in results
+            ])
+            conn.commit()
+            return len(results)
+    
+    def mark_events_settled(self, event_ids: List[str]) -> int:
+        """Marca como liquidadas as oportunidades (HOME e AWAY) dos eventos informados"""
+        if not event_ids:
+            return 0
+        
+        with self._connect() as conn:
+            cursor = conn.cursor()
+            cursor.executemany("""
+                UPDATE opportunities 
+                SET status = 'SETTLED' 
+                WHERE event_id IN (?, ?) AND status != 'SETTLED'
+            """, [(event_id, f"{event_id}_away") for event_id in event_ids])
+            conn.commit()
+            return cursor.rowcount
+    
+    def save_snapshot(self, key: str, data: Dict):
+        """Publica um snapshot (JSON) para leitura pelos workers HTTP"""
+        with self._connect() as conn:
+            conn.execute("""
+                INSERT INTO snapshots (key, data, updated_at) VALUES (?, ?, ?)
+                ON CONFLICT(key) DO UPDATE SET data = excluded.data, updated_at = excluded.updated_at
+            """, (key, json.dumps(data, default=str), datetime.utcnow().isoformat()))
+            conn.commit()
+    
+    def get_snapshot(self, key: str) -> Optional[Dict]:
+        """Lê um snapshot publicado, com o horário da publicação"""
+        with self._connect() as conn:
+            row = conn.execute("SELECT data, updated_at FROM snapshots WHERE key = ?", (key,)).fetchone()
+        if not row:
+            return None
+        return {"data": json.loads(row[0]), "updated_at": row[1]}
+    
+    def get_snapshots(self, prefix: str, max_age: float) -> Dict[str, Dict]:
+        """Snapshots cuja chave começa com prefix, publicados há no máximo max_age segundos"""
+        since = (datetime.utcnow() - timedelta(seconds=max_age)).isoformat()
+        with self._connect() as conn:
+            rows = conn.execute("""
+                SELECT key, data FROM snapshots WHERE key >= ? AND key < ? AND updated_at >= ?
+            """, (prefix, prefix + "\uffff", since)).fetchall()
+        return {key: json.loads(data) for key, data in rows}
+    
+    def delete_snapshot(self, key: str):
+        with self._connect() as conn:
+            conn.execute("DELETE FROM snapshots WHERE key = ?", (key,))
+            conn.commit()
     
-    opportunities = db.get_active_opportunities()
+    def enqueue_scan_job(self, job: Dict, keep_finished: int = 20) -> Tuple[Dict, bool]:
+        """
+        Enfileira um job de scan ou, se já houver um ativo (queued/running), soma o pedido a ele
+        Atômico entre processos (BEGIN IMMEDIATE); retorna (job, criado)
+        """
+        now = datetime.utcnow().isoformat()
+        conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            row = conn.execute("""
+                SELECT data FROM scan_jobs WHERE status IN ('queued', 'running')
+                ORDER BY created_at LIMIT 1
+            """).fetchone()
+            
+            if row:
+                active = json.loads(row[0])
+                active["requests"] = active.get("requests", 1) + 1
+                conn.execute("UPDATE scan_jobs SET data = ?, updated_at = ? WHERE job_id = ?",
+                             (json.dumps(active), now, active["job_id"]))
+                conn.execute("COMMIT")
+                return active, False
+            
+            conn.execute("""
+                INSERT INTO scan_jobs (job_id, status, data, created_at, updated_at) VALUES (?, ?, ?, ?, ?)
+            """, (job["job_id"], job["status"], json.dumps(job), now, now))
+            conn.execute("""
+                DELETE FROM scan_jobs WHERE status NOT IN ('queued', 'running') AND job_id NOT IN (
+                    SELECT job_id FROM scan_jobs WHERE status NOT IN ('queued', 'running')
+                    ORDER BY created_at DESC LIMIT ?
+                )
+            """, (keep_finished,))
+            conn.execute("COMMIT")
+            return job, True
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        finally:
+            conn.close()
     
-    Path(filename).parent.mkdir(parents=True, exist_ok=True)
+    def claim_scan_job(self) -> Optional[Dict]:
+        """Pega o job enfileirado mais antigo e o marca como running (atômico entre processos)"""
+        conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            row = conn.execute("""
+                SELECT data FROM scan_jobs WHERE status = 'queued' ORDER BY created_at LIMIT 1
+            """).fetchone()
+            if not row:
+                conn.execute("COMMIT")
+                return None
+            
+            job = json.loads(row[0])
+            job["status"] = "running"
+            job["started_at"] = datetime.utcnow().isoformat()
+            conn.execute("UPDATE scan_jobs SET status = ?, data = ?, updated_at = ? WHERE job_id = ?",
+                         (job["status"], json.dumps(job), job["started_at"], job["job_id"]))
+            conn.execute("COMMIT")
+            return job
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        finally:
+            conn.close()
     
-    with open(filename, 'w', encoding='utf-8') as f:
-        json.dump(opportunities, f, indent=2, ensure_ascii=False)
+    def save_scan_job(self, job: Dict):
+        """Atualiza o estado/progresso de um job (preserva pedidos agrupados entretanto)"""
+        with self._connect() as conn:
+            row = conn.execute("SELECT data FROM scan_jobs WHERE job_id = ?", (job["job_id"],)).fetchone()
+            if row:
+                job["requests"] = max(job.get("requests", 1), json.loads(row[0]).get("requests", 1))
+            conn.execute("UPDATE scan_jobs SET status = ?, data = ?, updated_at = ? WHERE job_id = ?",
+                         (job["status"], json.dumps(job), datetime.utcnow().isoformat(), job["job_id"]))
+            conn.commit()
+    
+    def get_scan_job(self, job_id: str = None) -> Optional[Dict]:
+        """Busca um job pelo id (sem id: o mais recente)"""
+        with self._connect() as conn:
+            if job_id:
+                row = conn.execute("SELECT data FROM scan_jobs WHERE job_id = ?", (job_id,)).fetchone()
+            else:
+                row = conn.execute("SELECT data FROM scan_jobs ORDER BY created_at DESC LIMIT 1").fetchone()
+        return json.loads(row[0]) if row else None
     
-    logger.info(f"Oportunidades exportadas para {filename}")
-    return filename
+    def fail_running_scan_jobs(self, reason: str) -> int:
+        """Marca como falhos os jobs que ficaram em running (processo anterior encerrado no meio)"""
+        with self._connect() as conn:
+            rows = conn.execute("SELECT data FROM scan_jobs WHERE status = 'running'").fetchall()
+            now = datetime.utcnow().isoformat()
+            for (data,) in rows:
+                job = json.loads(data)
+                job.update(status="failed", error=reason, finished_at=now)
+                conn.execute("UPDATE scan_jobs SET status = ?, data = ?, updated_at = ? WHERE job_id = ?",
+                             (job["status"], json.dumps(job), now, job["job_id"]))
+            conn.commit()
+            return len(rows)
+
+def start_cutoff(hours_ahead: float = 0) -> str:
+    """Agora + hours_ahead no formato de start_utc (para comparar como texto e usar os índices)"""
+    return (datetime.utcnow() + timedelta(hours=hours_ahead)).strftime(START_UTC_FORMAT)
+
+def encode_cursor(sort: str, order: str, value, last_id: int) -> str:
+    """Cursor opaco (base64 url-safe) com a posição da última linha da página"""
+    raw = json.dumps([sort, order, value, last_id], separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+def decode_cursor(cursor: str) -> Tuple[str, str, object, int]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        sort, order, value, last_id = json.loads(raw)
+        return sort, order, value, int(last_id)
+    except (ValueError, TypeError) as e:
+        raise ValueError(f"Cursor inválido: {cursor}") from e
@@ -0,0 +1,126 @@
+"""
+Enriquecimento das oportunidades candidatas com estatísticas, partidas recentes e H2H dos jogadores
+Roda depois do scan_opportunities: cada jogador (e cada par) é buscado uma única vez, em paralelo,
+dentro de um orçamento de tempo; o que não terminar a tempo fica de fora
+"""
+
+import logging
+import time
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+from typing import Callable, Dict, List, Optional, Tuple
+
+from .metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+class OpportunityEnricher:
+    """Preenche Opportunity.enrichment a partir do RealDataProvider"""
+
+    def __init__(self, provider, max_workers: int = 8, budget: float = 60.0):
+        self.provider = provider
+        self.max_workers = max_workers
+        self.budget = budget  # Segundos máximos por scan
+
+    @classmethod
+    def create(cls, api_token: str, api_base: str, max_workers: int = 8,
+               budget: float = 60.0) -> Optional["OpportunityEnricher"]:
+        """Enriquecedor com o RealDataProvider, ou None se o provider não puder ser carregado"""
+        try:
+            from .real_data_provider import RealDataProvider
+        except ImportError as e:
+            logger.warning(f"⚠️ Enriquecimento desativado: RealDataProvider indisponível ({e})")
+            return None
+        return cls(RealDataProvider(api_token, api_base), max_workers, budget)
+
+    def enrich(self, opportunities: List, progress: Callable[[str, int, int], None] = None) -> int:
+        """Anexa o enriquecimento às oportunidades; retorna quantas ficaram completas"""
+        if not opportunities:
+            return 0
+
+        with metrics.timer("enrichment"):
+            started = time.monotonic()
+            self.provider.refresh_player_index()
+
+            # Jogadores e pares únicos (vários eventos/lados compartilham jogadores)
+            pairs: Dict[str, Tuple[str, str]] = {}
+            for opp in opportunities:
+                if " vs " in opp.match:
+                    home, away = opp.match.split(" vs ", 1)
+                    pairs[opp.match] = (home, away)
+            players = {name for pair in pairs.values() for name in pair}
+            ids = {name: self.provider.search_player_id(name) for name in players}
+
+            executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="enrichment")
+            try:
+                player_futures: Dict[str, Tuple[Future, Future]] = {
+                    name: (executor.submit(self.provider.get_player_stats, player_id),
+                           executor.submit(self.provider.get_player_matches, player_id, 90))
+                    for name, player_id in ids.items() if player_id
+                }
+                h2h_futures: Dict[Tuple[str, str], Future] = {}
+                for home, away in pairs.values():
+                    key = tuple(sorted((ids.get(home) or "", ids.get(away) or "")))
+                    if all(key) and key not in h2h_futures:
+                        h2h_futures[key] = executor.submit(self.provider.get_head_to_head, *key)
+
+                pending = [f for pair in player_futures.values() for f in pair] + list(h2h_futures.values())
+                total = len(pending)
+                remaining_budget = self.budget - (time.monotonic() - started)
+                done, not_done = wait(pending, timeout=max(0.0, remaining_budget))
+                if progress:
+                    progress("enrichment", len(done), total)
+            finally:
+                # Não espera o que estourou o orçamento
+                executor.shutdown(wait=False, cancel_futures=True)
+
+            players_data = {name: self._player_summary(name, ids[name], futures)
+                            for name, futures in player_futures.items()}
+
+            complete = 0
+            for opp in opportunities:
+                if opp.match not in pairs:
+                    continue
+                home, away = pairs[opp.match]
+                key = tuple(sorted((ids.get(home) or "", ids.get(away) or "")))
+                h2h = self._result(h2h_futures.get(key))
+                if h2h and key[0] != ids.get(home):
+                    # H2H buscado na ordem inversa: vitórias do ponto de vista do mandante
+                    h2h = dict(h2h, player1_wins=h2h.get("player2_wins", 0), player2_wins=h2h.get("player1_wins", 0))
+
+                opp.enrichment = {
+                    "home": players_data.get(home),
+                    "away": players_data.get(away),
+                    "h2h": h2h
+                }
+                opp.enrichment["complete"] = all(opp.enrichment.values())
+                complete += opp.enrichment["complete"]
+
+        logger.info(f"🧬 Enriquecimento: {complete}/{len(opportunities)} oportunidades completas, "
+                    f"{len(players)} jogadores, {len(h2h_futures)} H2H, {len(not_done)} buscas fora do orçamento "
+                    f"({time.monotonic() - started:.1f}s)")
+        return complete
+
+    def _player_summary(self, name: str, player_id: str, futures: Tuple[Future, Future]) -> Optional[Dict]:
+        stats = self._result(futures[0])
+        matches = self._result(futures[1])
+        if stats is None and matches is None:
+            return None
+
+        matches = matches or []
+        return {
+            "id": player_id,
+            "stats": (stats or {}).get("results"),
+            "matches_90d": len(matches),
+            "recent_form": self.provider.calculate_recent_form(matches),
+            "rating": self.provider.ratings.get_player(name)
+        }
+
+    @staticmethod
+    def _result(future: Optional[Future]):
+        if future is None or not future.done() or future.cancelled():
+            return None
+        try:
+            return future.result()
+        except Exception as e:
+            logger.debug("Busca de enriquecimento falhou: %s", e)
+            return None
@@ -0,0 +1,186 @@
+"""
+Exportação em streaming do histórico (oportunidades e movimento de linha) em NDJSON ou CSV, com gzip opcional
+O cursor é lido em lotes (fetchmany) e a saída é gerada em blocos: memória constante para qualquer volume,
+tanto para arquivo/stdout (run_export.py) quanto para a resposta HTTP (/export/<tabela>)
+"""
+
+import argparse
+import csv
+import io
+import itertools
+import json
+import logging
+import sys
+import zlib
+from dataclasses import dataclass
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from .archive import iter_history_rows
+
+logger = logging.getLogger(__name__)
+
+FORMATS = ("ndjson", "csv")
+CHUNK_BYTES = 64 * 1024  # Tamanho aproximado de cada bloco entregue ao destino
+
+# Tabela -> colunas exportadas
+EXPORT_COLUMNS: Dict[str, Tuple[str, ...]] = {
+    "opportunities": ("id", "event_id", "match_name", "start_utc", "league", "side", "odd", "p_model",
+                      "ev", "p_market", "confidence", "created_at", "status"),
+    "line_movements": ("id", "event_id", "home_od", "away_od", "timestamp", "created_at"),
+}
+
+MIMETYPES = {"ndjson": "application/x-ndjson", "csv": "text/csv"}
+
+@dataclass(frozen=True)
+class ExportFilters:
+    """Filtros comuns às exportações (liga e status valem para o evento no caso do movimento de linha)"""
+    since: Optional[str] = None  # created_at inicial (ISO)
+    until: Optional[str] = None  # created_at final (ISO, exclusivo)
+    league: Optional[str] = None  # Trecho do nome da liga, sem diferenciar maiúsculas
+    statuses: Tuple[str, ...] = ()  # ACTIVE, EXPIRED, SETTLED (vazio = todos)
+
+def build_query(table: str, filters: ExportFilters) -> Tuple[str, Tuple]:
+    """Query (com {schema}, ver core/archive.py) e parâmetros para a tabela e os filtros"""
+    if table not in EXPORT_COLUMNS:
+        raise ValueError(f"Tabela de exportação inválida: {table}")
+
+    where, params = [], []
+    if filters.since:
+        where.append("created_at >= ?")
+        params.append(filters.since)
+    if filters.until:
+        where.append("created_at < ?")
+        params.append(filters.until)
+
+    event_where, event_params = [], []
+    if filters.league:
+        event_where.append("league LIKE ?")
+        event_params.append(f"%{filters.league}%")
+    if filters.statuses:
+        event_where.append(f"status IN ({','.join('?' * len(filters.statuses))})")
+        event_params.extend(filters.statuses)
+
+    if event_where:
+        if table == "opportunities":
+            where.extend(event_where)
+        else:
+            where.append(f"event_id IN (SELECT event_id FROM {{schema}}.opportunities WHERE {' AND '.join(event_where)})")
+        params.extend(event_params)
+
+    # Ordem de inserção (rowid): percorre a tabela sem ordenação em memória
+    query = f"SELECT {', '.join(EXPORT_COLUMNS[table])} FROM {{schema}}.{table}"
+    if where:
+        query += " WHERE " + " AND ".join(where)
+    return query + " ORDER BY id", tuple(params)
+
+def iter_export_rows(db_path, table: str, filters: ExportFilters = ExportFilters(),
+                     batch_size: int = 5000, include_archives: bool = True) -> Iterator[Tuple]:
+    """Linhas da tabela, dos arquivos mensais ao banco vivo"""
+    query, params = build_query(table, filters)
+    return iter_history_rows(db_path, query, params, batch_size, include_archives)
+
+def iter_ndjson(columns: Tuple[str, ...], rows: Iterable[Tuple]) -> Iterator[str]:
+    for row in rows:
+        yield json.dumps(dict(zip(columns, row)), ensure_ascii=False) + "\n"
+
+def iter_csv(columns: Tuple[str, ...], rows: Iterable[Tuple]) -> Iterator[str]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(columns)
+    for row in rows:
+        writer.writerow(row)
+        if buffer.tell() >= CHUNK_BYTES:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue()
+
+def _chunked(lines: Iterable[str]) -> Iterator[bytes]:
+    """Agrupa as linhas em blocos de ~CHUNK_BYTES"""
+    parts, size = [], 0
+    for line in lines:
+        data = line.encode("utf-8")
+        parts.append(data)
+        size += len(data)
+        if size >= CHUNK_BYTES:
+            yield b"".join(parts)
+            parts, size = [], 0
+    if parts:
+        yield b"".join(parts)
+
+def gzip_stream(chunks: Iterable[bytes], level: int = 6) -> Iterator[bytes]:
+    """Comprime os blocos incrementalmente no formato gzip"""
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+def stream_export(db_path, table: str, fmt: str = "ndjson", compress: bool = False,
+                  filters: ExportFilters = ExportFilters(), batch_size: int = 5000,
+                  include_archives: bool = True) -> Iterator[bytes]:
+    """Blocos de bytes da exportação, prontos para arquivo, stdout ou resposta HTTP"""
+    if fmt not in FORMATS:
+        raise ValueError(f"Formato de exportação inválido: {fmt}")
+
+    # Valida a tabela/filtros antes do primeiro bloco (erro ainda pode virar resposta 400)
+    build_query(table, filters)
+    rows = iter_export_rows(db_path, table, filters, batch_size, include_archives)
+    columns = EXPORT_COLUMNS[table]
+    lines = iter_ndjson(columns, rows) if fmt == "ndjson" else iter_csv(columns, rows)
+    chunks = _chunked(lines)
+    return gzip_stream(chunks) if compress else chunks
+
+def prime(chunks: Iterator[bytes]) -> Iterator[bytes]:
+    """
+    Gera o primeiro bloco já (abre o banco, anexa os arquivos e executa a query): falhas aparecem aqui,
+    antes de a resposta HTTP começar com 200, e podem virar 4xx/5xx
+    """
+    try:
+        first = next(chunks)
+    except StopIteration:
+        return iter(())
+    return itertools.chain((first,), chunks)
+
+def export_filename(table: str, fmt: str, compress: bool) -> str:
+    return f"{table}.{fmt}" + (".gz" if compress else "")
+
+def parse_statuses(value: Optional[str]) -> Tuple[str, ...]:
+    """'expired,settled' -> ('EXPIRED', 'SETTLED')"""
+    return tuple(status.strip().upper() for status in (value or "").split(",") if status.strip())
+
+def main(argv: List[str] = None):
+    """Linha de comando da exportação"""
+    parser = argparse.ArgumentParser(description="Exportação do histórico do TennisQ")
+    parser.add_argument("table", choices=sorted(EXPORT_COLUMNS))
+    parser.add_argument("--db", default="storage/database/prelive.db")
+    parser.add_argument("--format", choices=FORMATS, default="ndjson")
+    parser.add_argument("--gzip", action="store_true")
+    parser.add_argument("--since", default=None, help="created_at inicial (ISO)")
+    parser.add_argument("--until", default=None, help="created_at final (ISO, exclusivo)")
+    parser.add_argument("--league", default=None, help="Trecho do nome da liga")
+    parser.add_argument("--status", default=None, help="Status separados por vírgula (ex: expired,settled)")
+    parser.add_argument("--live-only", action="store_true", help="Ignora os arquivos mensais do histórico")
+    parser.add_argument("--output", default="-", help="Arquivo de saída ('-' = stdout)")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, stream=sys.stderr)
+
+    filters = ExportFilters(args.since, args.until, args.league, parse_statuses(args.status))
+    chunks = stream_export(args.db, args.table, args.format, args.gzip, filters,
+                           include_archives=not args.live_only)
+
+    output = sys.stdout.buffer if args.output == "-" else open(args.output, "wb")
+    written = 0
+    try:
+        for chunk in chunks:
+            output.write(chunk)
+            written += len(chunk)
+    finally:
+        if output is not sys.stdout.buffer:
+            output.close()
+    logger.info(f"Exportação de {args.table} concluída ({written / 1024 / 1024:.1f} MB em {args.output})")
+
+if __name__ == "__main__":
+    main()
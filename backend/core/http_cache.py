@@ -0,0 +1,161 @@
+"""
+Cache persistente (SQLite) das respostas da B365API usadas pelo RealDataProvider
+Chave = endpoint + parâmetros (sem o token); TTL por endpoint, revalidação por ETag/Last-Modified
+e despejo LRU quando o arquivo passa de max_bytes. Sobrevive a reinícios do processo
+"""
+
+import hashlib
+import json
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CACHE_PATH = "storage/database/http_cache.db"
+DEFAULT_MAX_BYTES = int(float(os.getenv("HTTP_CACHE_MAX_MB", 64)) * 1024 * 1024)
+
+# (padrão do endpoint, TTL em segundos); o primeiro que casar vale, sem casar = não cacheia
+ENDPOINT_TTLS: List[Tuple[str, int]] = [
+    (r"^/v2/tennis/player/[^/]+/stats$", 24 * 3600),
+    (r"^/v2/tennis/player/[^/]+/matches$", 12 * 3600),
+    (r"^/v2/tennis/player/[^/]+/h2h/[^/]+$", 24 * 3600),
+]
+
+# Parâmetros que não fazem parte da chave
+IGNORED_PARAMS = {"token"}
+
+@dataclass
+class CachedResponse:
+    key: str
+    data: Dict
+    etag: Optional[str]
+    last_modified: Optional[str]
+    expires_at: float  # epoch
+
+    @property
+    def fresh(self) -> bool:
+        return time.time() < self.expires_at
+
+    def conditional_headers(self) -> Dict[str, str]:
+        """Cabeçalhos para revalidar a resposta (vazio se o provedor não mandou validadores)"""
+        headers = {}
+        if self.etag:
+            headers["If-None-Match"] = self.etag
+        if self.last_modified:
+            headers["If-Modified-Since"] = self.last_modified
+        return headers
+
+class HttpCache:
+    """Respostas JSON por chave, com TTL e despejo LRU por tamanho"""
+
+    def __init__(self, path: str = DEFAULT_CACHE_PATH, max_bytes: int = DEFAULT_MAX_BYTES,
+                 ttls: List[Tuple[str, int]] = None):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self.ttls = [(re.compile(pattern), ttl) for pattern, ttl in (ttls or ENDPOINT_TTLS)]
+        self._local = threading.local()
+        self._evict_lock = threading.Lock()
+        self._init_schema()
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            self._local.conn = conn
+        return conn
+
+    def _init_schema(self):
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS responses (
+                    key TEXT PRIMARY KEY,
+                    endpoint TEXT NOT NULL,
+                    body TEXT NOT NULL,
+                    etag TEXT,
+                    last_modified TEXT,
+                    size INTEGER NOT NULL,
+                    fetched_at REAL NOT NULL,
+                    expires_at REAL NOT NULL,
+                    accessed_at REAL NOT NULL
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_responses_accessed ON responses(accessed_at)")
+
+    def ttl_for(self, endpoint: str) -> int:
+        for pattern, ttl in self.ttls:
+            if pattern.match(endpoint):
+                return ttl
+        return 0
+
+    @staticmethod
+    def make_key(endpoint: str, params: Dict = None) -> str:
+        relevant = sorted((k, str(v)) for k, v in (params or {}).items() if k not in IGNORED_PARAMS)
+        raw = endpoint + "?" + json.dumps(relevant)
+        return hashlib.sha1(raw.encode()).hexdigest()
+
+    def get(self, key: str) -> Optional[CachedResponse]:
+        """Resposta guardada (fresca ou não); marca o acesso para o LRU"""
+        with self._connect() as conn:
+            row = conn.execute("""
+                SELECT body, etag, last_modified, expires_at FROM responses WHERE key = ?
+            """, (key,)).fetchone()
+            if not row:
+                return None
+            conn.execute("UPDATE responses SET accessed_at = ? WHERE key = ?", (time.time(), key))
+        return CachedResponse(key, json.loads(row[0]), row[1], row[2], row[3])
+
+    def put(self, key: str, endpoint: str, data: Dict, ttl: int,
+            etag: str = None, last_modified: str = None):
+        body = json.dumps(data)
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute("""
+                INSERT OR REPLACE INTO responses
+                (key, endpoint, body, etag, last_modified, size, fetched_at, expires_at, accessed_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+            """, (key, endpoint, body, etag, last_modified, len(body), now, now + ttl, now))
+        self._evict()
+
+    def refresh(self, key: str, ttl: int):
+        """304: a resposta guardada continua válida por mais um TTL"""
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute("UPDATE responses SET expires_at = ?, accessed_at = ? WHERE key = ?",
+                         (now + ttl, now, key))
+
+    def _evict(self):
+        """Remove as entradas menos usadas até o cache voltar a 90% de max_bytes"""
+        with self._evict_lock, self._connect() as conn:
+            total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+            if total <= self.max_bytes:
+                return
+
+            target = self.max_bytes * 0.9
+            removed = 0
+            for key, size in conn.execute("SELECT key, size FROM responses ORDER BY accessed_at").fetchall():
+                if total <= target:
+                    break
+                conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                total -= size
+                removed += 1
+            logger.info(f"🧹 Cache HTTP: {removed} respostas antigas removidas ({total / 1024 / 1024:.1f} MB)")
+
+    def stats(self) -> Dict:
+        with self._connect() as conn:
+            count, total, fresh = conn.execute("""
+                SELECT COUNT(*), COALESCE(SUM(size), 0), COALESCE(SUM(expires_at > ?), 0) FROM responses
+            """, (time.time(),)).fetchone()
+        return {"entries": count, "fresh": fresh, "bytes": total, "max_bytes": self.max_bytes}
+
+    def clear(self):
+        with self._connect() as conn:
+            conn.execute("DELETE FROM responses")
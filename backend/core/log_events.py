@@ -0,0 +1,128 @@
+"""
+Logging estruturado para os caminhos críticos (scan, classificação, modelo)
+Formatação preguiçosa, um resumo por etapa e detalhe por evento só em DEBUG ou por amostragem
+A saída passa por QueueHandler/QueueListener para o I/O do stdout nunca travar a thread de scan
+"""
+
+import atexit
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import random
+import sys
+import threading
+from datetime import datetime
+from typing import Dict, Optional
+
+DEFAULT_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+
+# Fração de eventos cujo detalhe sai em INFO mesmo sem DEBUG (0 = nenhum)
+DEFAULT_SAMPLE_RATE = 0.0
+
+_listener: Optional[logging.handlers.QueueListener] = None
+_setup_lock = threading.Lock()
+
+class JsonFormatter(logging.Formatter):
+    """Uma linha JSON por registro, incluindo o evento e os campos estruturados"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        payload = {
+            "ts": datetime.utcfromtimestamp(record.created).isoformat(),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage()
+        }
+        event = getattr(record, "event", None)
+        if event:
+            payload["event"] = event
+        payload.update(getattr(record, "fields", None) or {})
+        if record.exc_info:
+            payload["exc"] = self.formatException(record.exc_info)
+        return json.dumps(payload, ensure_ascii=False, default=str)
+
+def setup_logging(level: str = None, fmt: str = None, stream=None) -> logging.handlers.QueueListener:
+    """
+    Configura o logger raiz com QueueHandler (não bloqueante) e um listener em thread própria
+    Idempotente: chamadas seguintes apenas ajustam o nível
+    Variáveis: LOG_LEVEL (INFO), LOG_FORMAT (text|json), LOG_EVENT_SAMPLE_RATE (0.0)
+    """
+    global _listener
+
+    level = (level or os.getenv("LOG_LEVEL", "INFO")).upper()
+    root = logging.getLogger()
+
+    with _setup_lock:
+        root.setLevel(level)
+        if _listener is not None:
+            return _listener
+
+        handler = logging.StreamHandler(stream or sys.stdout)
+        if (fmt or os.getenv("LOG_FORMAT", "text")).lower() == "json":
+            handler.setFormatter(JsonFormatter())
+        else:
+            handler.setFormatter(logging.Formatter(DEFAULT_FORMAT))
+
+        log_queue: queue.Queue = queue.Queue(-1)
+        for existing in list(root.handlers):
+            root.removeHandler(existing)
+        root.addHandler(logging.handlers.QueueHandler(log_queue))
+
+        _listener = logging.handlers.QueueListener(log_queue, handler, respect_handler_level=True)
+        _listener.start()
+        atexit.register(stop_logging)
+
+    return _listener
+
+def stop_logging():
+    """Esvazia a fila e para o listener (chamado no encerramento)"""
+    global _listener
+    with _setup_lock:
+        if _listener is not None:
+            _listener.stop()
+            _listener = None
+
+class EventSampler:
+    """Decide se o detalhe de um evento sai em INFO quando DEBUG está desligado"""
+
+    def __init__(self, rate: float = None, seed: int = None):
+        if rate is None:
+            try:
+                rate = float(os.getenv("LOG_EVENT_SAMPLE_RATE", DEFAULT_SAMPLE_RATE))
+            except ValueError:
+                rate = DEFAULT_SAMPLE_RATE
+        self.rate = max(0.0, min(1.0, rate))
+        self._rng = random.Random(seed)
+
+    def sample(self) -> bool:
+        return self.rate > 0 and (self.rate >= 1 or self._rng.random() < self.rate)
+
+def log_event(logger: logging.Logger, sampler: EventSampler, msg: str, *args):
+    """
+    Detalhe por evento: DEBUG se habilitado, senão INFO apenas para a fração amostrada
+    Os argumentos só são formatados se o registro for emitido
+    """
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug(msg, *args)
+    elif sampler.rate and logger.isEnabledFor(logging.INFO) and sampler.sample():
+        logger.info("[amostra] " + msg, *args)
+
+class StageSummary:
+    """Acumula contadores de uma etapa e emite um único registro ao final"""
+
+    def __init__(self, stage: str):
+        self.stage = stage
+        self.counts: Dict[str, int] = {}
+
+    def add(self, outcome: str, amount: int = 1):
+        self.counts[outcome] = self.counts.get(outcome, 0) + amount
+
+    def emit(self, logger: logging.Logger, title: str, level: int = logging.INFO, **fields):
+        """Registro de resumo com os contadores no texto e em campos estruturados"""
+        if not logger.isEnabledFor(level):
+            return
+        data = dict(self.counts, **fields)
+        summary = " | ".join(f"{key}={value}" for key, value in data.items())
+        logger.log(level, "%s: %s", title, summary,
+                   extra={"event": self.stage, "fields": data})
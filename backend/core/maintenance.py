@@ -0,0 +1,162 @@
+"""
+Manutenção do prelive.db: expiração, compactação do movimento de linha, arquivo mensal, retenção e vacuum
+Tudo em operações por conjunto ou em lotes curtos para não travar o scan/monitoramento
+"""
+
+import json
+import logging
+import os
+import time
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+
+from .archive import HistoryArchive
+from .database import PreLiveDatabase
+from .metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+AUTO_VACUUM_INCREMENTAL = 2  # Valor de PRAGMA auto_vacuum
+REPORT_STATE_KEY = "maintenance_report"
+
+class DataMaintenance:
+    """Rotina de retenção/compactação; run() executa todas as etapas e devolve o relatório"""
+
+    def __init__(self, db: PreLiveDatabase, retention_days: int = 7, downsample_after_hours: float = 24,
+                 batch_size: int = 500, batch_pause: float = 0.05, vacuum_pages: int = 2000,
+                 archive_after_days: Optional[float] = 7, allow_full_vacuum: bool = False):
+        self.db = db
+        self.retention_days = retention_days
+        # VACUUM completo (conversão única para auto_vacuum incremental) bloqueia o banco inteiro:
+        # só na execução manual (run_maintenance.py), nunca no loop do scan
+        self.allow_full_vacuum = allow_full_vacuum
+        self.downsample_after_hours = downsample_after_hours  # Evento sem linha nova há tanto tempo = encerrado
+        # Eventos iniciados há mais que isso vão para o arquivo mensal (None = sem arquivo, só retenção)
+        self.archive_after_days = archive_after_days
+        self.batch_size = batch_size
+        self.batch_pause = batch_pause
+        self.vacuum_pages = vacuum_pages  # Páginas liberadas por passo do incremental_vacuum
+        self.archive = HistoryArchive(db, batch_size, batch_pause) if archive_after_days is not None else None
+
+    def run(self) -> Dict:
+        started = time.monotonic()
+        with metrics.timer("maintenance"):
+            size_before = self._file_size()
+            report = {
+                "expired": self.expire_opportunities(),
+                "downsampled": self.downsample_line_movements(),
+                "archived": self.archive_history(),
+                "deleted": self.db.cleanup_old_data(self.retention_days, self.batch_size, self.batch_pause),
+                "vacuum": self.reclaim_space()
+            }
+            size_after = self._file_size()
+
+        report.update(
+            size_before=size_before,
+            size_after=size_after,
+            reclaimed_bytes=max(0, size_before - size_after),
+            duration=round(time.monotonic() - started, 2),
+            finished_at=datetime.utcnow().isoformat()
+        )
+        self.db.set_state(REPORT_STATE_KEY, json.dumps(report))
+        logger.info(f"🧹 Manutenção: {report['expired']} expiradas, "
+                    f"{report['downsampled']['deleted']} linhas compactadas em {report['downsampled']['events']} eventos, "
+                    f"{report['archived'].get('events', 0)} eventos arquivados, "
+                    f"{sum(report['deleted'].values())} linhas antigas removidas, "
+                    f"{report['reclaimed_bytes'] / 1024 / 1024:.1f} MB recuperados ({report['duration']}s)")
+        return report
+
+    def last_report(self) -> Dict:
+        value = self.db.get_state(REPORT_STATE_KEY)
+        return json.loads(value) if value else {}
+
+    def expire_opportunities(self) -> int:
+        """Oportunidades de jogos já iniciados -> EXPIRED (um único UPDATE)"""
+        return len(self.db.expire_started_opportunities())
+
+    def archive_history(self) -> Dict[str, int]:
+        """Move eventos encerrados para os arquivos mensais (antes da retenção, que apagaria o histórico)"""
+        if not self.archive:
+            return {}
+        cutoff = (datetime.utcnow() - timedelta(days=self.archive_after_days)).isoformat()
+        return self.archive.archive_before(cutoff)
+
+    def downsample_line_movements(self) -> Dict[str, int]:
+        """
+        Reduz o movimento de linha dos eventos encerrados aos pontos-chave:
+        abertura, última leitura de cada hora e fechamento (última leitura da última hora)
+        """
+        cutoff = (datetime.utcnow() - timedelta(hours=self.downsample_after_hours)).isoformat()
+        with self.db._connect() as conn:
+            # Só eventos com linhas além dos pontos-chave (os já compactados não voltam)
+            event_ids = [row[0] for row in conn.execute("""
+                SELECT event_id FROM line_movements
+                WHERE event_id NOT IN (SELECT event_id FROM opportunities WHERE status = 'ACTIVE')
+                GROUP BY event_id
+                HAVING MAX(created_at) < ? AND COUNT(*) > COUNT(DISTINCT substr(created_at, 1, 13)) + 1
+            """, (cutoff,))]
+
+        deleted = 0
+        chunk_size = max(1, self.batch_size // 10)  # ~10 linhas por evento entre os pontos-chave
+        for start in range(0, len(event_ids), chunk_size):
+            deleted += self._downsample_events(event_ids[start:start + chunk_size])
+            if self.batch_pause:
+                time.sleep(self.batch_pause)
+        return {"events": len(event_ids), "deleted": deleted}
+
+    def _downsample_events(self, event_ids: List[str]) -> int:
+        placeholders = ",".join("?" * len(event_ids))
+        # Em agregações MIN/MAX o SQLite devolve as demais colunas da linha escolhida
+        with self.db._connect() as conn:
+            cursor = conn.execute(f"""
+                DELETE FROM line_movements
+                WHERE event_id IN ({placeholders}) AND id NOT IN (
+                    SELECT id FROM (
+                        SELECT id, MIN(created_at) FROM line_movements
+                        WHERE event_id IN ({placeholders}) GROUP BY event_id
+                    )
+                    UNION
+                    SELECT id FROM (
+                        SELECT id, MAX(created_at) FROM line_movements
+                        WHERE event_id IN ({placeholders}) GROUP BY event_id, substr(created_at, 1, 13)
+                    )
+                )
+            """, event_ids * 3)
+            conn.commit()
+        return cursor.rowcount
+
+    def reclaim_space(self) -> Dict:
+        """Devolve ao sistema de arquivos as páginas livres (incremental_vacuum em passos curtos)"""
+        conn = self.db._connect()
+        page_size = conn.execute("PRAGMA page_size").fetchone()[0]
+
+        if conn.execute("PRAGMA auto_vacuum").fetchone()[0] != AUTO_VACUUM_INCREMENTAL:
+            # Banco criado antes do auto_vacuum: a conversão exige um VACUUM completo (uma única vez)
+            if not self.allow_full_vacuum:
+                logger.warning("⚠️ prelive.db ainda sem auto_vacuum incremental: espaço livre não é devolvido "
+                               "até rodar `python run_maintenance.py` (VACUUM completo, uma única vez)")
+                return {"pages_freed": 0, "bytes_freed": 0, "conversion_pending": True}
+            logger.info("🧹 Convertendo prelive.db para auto_vacuum incremental (VACUUM completo)...")
+            conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
+            conn.execute("VACUUM")
+
+        free_before = conn.execute("PRAGMA freelist_count").fetchone()[0]
+        while True:
+            free = conn.execute("PRAGMA freelist_count").fetchone()[0]
+            if not free:
+                break
+            conn.execute(f"PRAGMA incremental_vacuum({self.vacuum_pages})").fetchall()
+            conn.commit()
+            if conn.execute("PRAGMA freelist_count").fetchone()[0] >= free:
+                break
+            if self.batch_pause:
+                time.sleep(self.batch_pause)
+
+        # Com WAL o arquivo principal só encolhe no checkpoint
+        conn.execute("PRAGMA wal_checkpoint(TRUNCATE)").fetchall()
+        free_after = conn.execute("PRAGMA freelist_count").fetchone()[0]
+        return {"pages_freed": free_before - free_after, "bytes_freed": (free_before - free_after) * page_size}
+
+    def _file_size(self) -> int:
+        path = str(self.db.db_path)
+        return sum(os.path.getsize(p) for p in (path, path + "-wal") if os.path.exists(p))
@@ -0,0 +1,251 @@
+"""
+Instrumentação leve por etapa (histogramas, contadores e gauges)
+Exposta em formato texto do Prometheus pela rota /metrics; com vários workers cada processo publica
+seu estado (snapshot) e a rota soma os de todos os processos
+"""
+
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+# Buckets (segundos) cobrindo de uma consulta SQLite até um scan completo
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 300.0, 900.0)
+
+LabelKey = Tuple[str, ...]
+
+def _escape(value: str) -> str:
+    """Escapa valores de label conforme o formato de exposição"""
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    """Monta {a="x",b="y"} (com label extra opcional, ex: le)"""
+    parts = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+class _Metric:
+    """Base com nome, descrição, labels e trava própria"""
+    kind = ""
+
+    def __init__(self, name: str, help_text: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, str]) -> LabelKey:
+        return tuple(str(labels.get(name, "")) for name in self.labelnames)
+
+    def header(self) -> List[str]:
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+
+    def empty_copy(self) -> "_Metric":
+        return type(self)(self.name, self.help, self.labelnames)
+
+    def snapshot(self) -> List:
+        """Estado serializável em JSON: [[labels, valor], ...]"""
+        with self._lock:
+            return [[list(key), value] for key, value in self._values.items()]
+
+    def merge(self, items: Iterable) -> None:
+        """Soma um snapshot (deste ou de outro processo) a esta métrica"""
+        with self._lock:
+            for key, value in items:
+                key = tuple(key)
+                self._values[key] = self._values.get(key, 0.0) + value
+
+class Counter(_Metric):
+    """Contador monotônico por combinação de labels"""
+    kind = "counter"
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._values: Dict[LabelKey, float] = {}
+
+    def inc(self, amount: float = 1.0, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels) -> float:
+        return self._values.get(self._key(labels), 0.0)
+
+    def render(self) -> List[str]:
+        with self._lock:
+            items = sorted(self._values.items())
+        return self.header() + [
+            f"{self.name}{_format_labels(self.labelnames, key)} {value}" for key, value in items
+        ]
+
+class Gauge(_Metric):
+    """Valor instantâneo (ex: profundidade de fila)"""
+    kind = "gauge"
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._values: Dict[LabelKey, float] = {}
+
+    def set(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def inc(self, amount: float = 1.0, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def dec(self, amount: float = 1.0, **labels):
+        self.inc(-amount, **labels)
+
+    def value(self, **labels) -> float:
+        return self._values.get(self._key(labels), 0.0)
+
+    def render(self) -> List[str]:
+        with self._lock:
+            items = sorted(self._values.items())
+        return self.header() + [
+            f"{self.name}{_format_labels(self.labelnames, key)} {value}" for key, value in items
+        ]
+
+class Histogram(_Metric):
+    """Histograma de buckets fixos (observe é O(log buckets))"""
+    kind = "histogram"
+
+    def __init__(self, name: str, help_text: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, help_text, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._series: Dict[LabelKey, List] = {}  # key -> [contagens por bucket, soma, total]
+
+    def empty_copy(self) -> "Histogram":
+        return Histogram(self.name, self.help, self.labelnames, self.buckets)
+
+    def snapshot(self) -> List:
+        with self._lock:
+            return [[list(key), [list(s[0]), s[1], s[2]]] for key, s in self._series.items()]
+
+    def merge(self, items: Iterable) -> None:
+        with self._lock:
+            for key, (counts, total_sum, total_count) in items:
+                if len(counts) != len(self.buckets) + 1:
+                    continue  # Buckets diferentes (outra versão do código): não soma
+                series = self._series.setdefault(tuple(key), [[0] * (len(self.buckets) + 1), 0.0, 0])
+                series[0] = [a + b for a, b in zip(series[0], counts)]
+                series[1] += total_sum
+                series[2] += total_count
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def count(self, **labels) -> int:
+        series = self._series.get(self._key(labels))
+        return series[2] if series else 0
+
+    def render(self) -> List[str]:
+        with self._lock:
+            items = sorted((key, (list(s[0]), s[1], s[2])) for key, s in self._series.items())
+
+        lines = self.header()
+        for key, (counts, total_sum, total_count) in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets, counts):
+                cumulative += count
+                labels = _format_labels(self.labelnames, key, 'le="%s"' % bound)
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            labels = _format_labels(self.labelnames, key, 'le="+Inf"')
+            lines.append(f"{self.name}_bucket{labels} {total_count}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labelnames, key)} {total_sum}")
+            lines.append(f"{self.name}_count{_format_labels(self.labelnames, key)} {total_count}")
+        return lines
+
+class MetricsRegistry:
+    """Registro das métricas do processo"""
+
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+
+        self.stage_duration = self.histogram(
+            "tennisq_stage_duration_seconds", "Duração de cada etapa do ciclo", ["stage"])
+        self.api_requests = self.counter(
+            "tennisq_api_requests_total", "Chamadas HTTP externas por endpoint e status", ["endpoint", "status"])
+        self.cache_requests = self.counter(
+            "tennisq_cache_requests_total", "Consultas a caches por resultado (hit/miss)", ["cache", "result"])
+        self.queue_depth = self.gauge(
+            "tennisq_queue_depth", "Itens aguardando processamento por fila", ["queue"])
+
+    def _register(self, metric: _Metric) -> _Metric:
+        with self._lock:
+            existing = self._metrics.get(metric.name)
+            if existing is not None:
+                return existing
+            self._metrics[metric.name] = metric
+            return metric
+
+    def counter(self, name: str, help_text: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._register(Counter(name, help_text, labelnames))
+
+    def gauge(self, name: str, help_text: str, labelnames: Sequence[str] = ()) -> Gauge:
+        return self._register(Gauge(name, help_text, labelnames))
+
+    def histogram(self, name: str, help_text: str, labelnames: Sequence[str] = (),
+                  buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        return self._register(Histogram(name, help_text, labelnames, buckets))
+
+    @contextmanager
+    def timer(self, stage: str) -> Iterator[None]:
+        """Mede a duração de um bloco no histograma de etapas"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.stage_duration.observe(time.perf_counter() - start, stage=stage)
+
+    def record_api_call(self, endpoint: str, status: Optional[int]):
+        """Conta uma chamada externa (status None = erro de conexão/timeout)"""
+        self.api_requests.inc(endpoint=endpoint, status=str(status) if status is not None else "error")
+
+    def record_cache(self, cache: str, hit: bool):
+        """Conta um acerto ou falha de cache"""
+        self.cache_requests.inc(cache=cache, result="hit" if hit else "miss")
+
+    def set_queue_depth(self, queue: str, depth: int):
+        """Atualiza a profundidade de uma fila"""
+        self.queue_depth.set(depth, queue=queue)
+
+    def snapshot(self) -> Dict[str, List]:
+        """Estado de todas as métricas do processo (publicado para os demais workers)"""
+        with self._lock:
+            metrics = list(self._metrics.values())
+        return {metric.name: metric.snapshot() for metric in metrics}
+
+    def render(self, peers: Iterable[Dict[str, List]] = ()) -> str:
+        """Exporta todas as métricas no formato texto do Prometheus, somando os snapshots de outros processos"""
+        with self._lock:
+            metrics = list(self._metrics.values())
+        peers = list(peers)
+        lines: List[str] = []
+        for metric in metrics:
+            if peers:
+                merged = metric.empty_copy()
+                merged.merge(metric.snapshot())
+                for peer in peers:
+                    merged.merge(peer.get(metric.name, []))
+                metric = merged
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+# Registro único do processo
+metrics = MetricsRegistry()
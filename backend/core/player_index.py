@@ -0,0 +1,70 @@
+"""
+Índice de jogadores (nome normalizado -> ID) alimentado pelos eventos que o scanner já baixa
+Busca O(1) sem chamadas à API; nomes comparados sem acento, caixa ou pontuação
+"""
+
+import re
+import threading
+import time
+import unicodedata
+from typing import Dict, Iterable, List, Optional
+
+_NON_ALNUM = re.compile(r"[^0-9a-z]+")
+
+def normalize_name(name: str) -> str:
+    """'Iga Świątek' / 'IGA SWIATEK' / 'iga  swiatek' -> 'iga swiatek'"""
+    decomposed = unicodedata.normalize("NFKD", name or "")
+    stripped = "".join(ch for ch in decomposed if not unicodedata.combining(ch))
+    return _NON_ALNUM.sub(" ", stripped.casefold()).strip()
+
+class PlayerIndex:
+    """Jogadores vistos nos payloads de eventos (home/away), por nome normalizado"""
+
+    def __init__(self):
+        self._players: Dict[str, Dict] = {}  # nome normalizado -> {"id", "name", "league"}
+        self._lock = threading.Lock()
+        self.updated_at = 0.0  # time.monotonic() da última alimentação (0 = vazio)
+
+    def __len__(self) -> int:
+        return len(self._players)
+
+    def add_events(self, events: Iterable[Dict]) -> int:
+        """Indexa os jogadores de uma lista de eventos brutos da API; retorna quantos foram vistos"""
+        entries = {}
+        for event in events or []:
+            if not isinstance(event, dict):
+                continue
+            league = event.get("league")
+            league_name = league.get("name", "") if isinstance(league, dict) else ""
+            for side in ("home", "away"):
+                team = event.get(side)
+                if isinstance(team, dict) and team.get("name") and team.get("id"):
+                    entries[normalize_name(team["name"])] = {
+                        "id": str(team["id"]),
+                        "name": team["name"],
+                        "league": league_name
+                    }
+
+        with self._lock:
+            self._players.update(entries)
+            self.updated_at = time.monotonic()
+        return len(entries)
+
+    def lookup(self, player_name: str) -> Optional[str]:
+        """ID do jogador pelo nome (None se nunca visto)"""
+        player = self._players.get(normalize_name(player_name))
+        return player["id"] if player else None
+
+    def get(self, player_name: str) -> Optional[Dict]:
+        player = self._players.get(normalize_name(player_name))
+        return dict(player) if player else None
+
+    def players(self) -> List[Dict]:
+        with self._lock:
+            return [dict(player) for player in self._players.values()]
+
+    def is_stale(self, max_age: float) -> bool:
+        return not self.updated_at or time.monotonic() - self.updated_at > max_age
+
+# Índice global do processo
+player_index = PlayerIndex()
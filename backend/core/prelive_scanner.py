@@ -8,15 +8,17 @@ import json
 import time
 import math
 from datetime import datetime, timedelta
-from typing import Dict, List, Optional, Tuple
+from typing import Callable, Dict, List, Optional, Tuple
 import logging
 from dataclasses import dataclass
 
 # Importa o modelo simplificado
 from .tennis_model_simple import SophisticatedTennisModel, PlayerDatabase
+from .metrics import metrics
+from .player_index import player_index
+from .rate_limiter import rate_limiter
+from .log_events import EventSampler, StageSummary, log_event, setup_logging
 
-# Configuração de logging
-logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 @dataclass
@@ -48,12 +50,85 @@ class Opportunity:
     p_model: float
     ev: float
     p_market: float
+    enrichment: Optional[Dict] = None  # Stats/partidas/H2H dos jogadores (core/enrichment.py), se disponível
+
+# Indicadores de liga usados pelo filtro de jogos femininos
+MALE_LEAGUE_INDICATORS = [
+    "atp", " men ", "male", "masculino", "boys", "juniors men", 
+    " men's ", "mens ", "challenger", "futures",
+    # Indicadores ITF masculinos
+    "m25", "m15", "itf m25", "itf m15", "m25 ", "m15 ",
+    " m25", " m15", "m25 md", "m15 md",
+    # Outros formatos masculinos (cuidado com "men's doubles" vs "women's doubles")
+    "men's singles", "md", "ms"
+]
+
+FEMALE_LEAGUE_INDICATORS = [
+    "wta", "women", "ladies", "female", "feminino", "fem",
+    "girls", "juniors women", "itf women", "qualifying women",
+    # Indicadores ITF femininos
+    "w100", "w75", "w50", "w35", "w25", "w15",
+    "itf w100", "itf w75", "itf w50", "itf w35", "itf w25", "itf w15",
+    # Indicadores específicos de duplas femininas
+    " wd", "wd ", "women doubles", "women's doubles",
+    # Torneios específicos femininos
+    "(w)", " women", "pro circuit"
+]
+
+def classify_league(league_name: str) -> Tuple[bool, str]:
+    """
+    Classifica a liga como feminina ou não, sem efeitos colaterais
+    Retorna (é_feminina, motivo) - usado pelo scanner e pelo backtest
+    """
+    league_lower = league_name.lower()
+    
+    # PRIMEIRO: Verificar indicadores masculinos na LIGA
+    for indicator in MALE_LEAGUE_INDICATORS:
+        if indicator in league_lower:
+            return False, f"❌ Liga masculina detectada por indicador: {indicator}"
+    
+    # Regra especial para UTR: só aceita se tiver women, w ou feminino
+    if "utr pro" in league_lower:
+        if ("women" in league_lower or
+            league_lower.strip().endswith(" w") or
+            league_lower.strip().endswith(" women") or
+            "feminino" in league_lower or
+            league_lower.strip().endswith(" feminino") or
+            league_lower.strip().endswith(" fem")):
+            return True, f"✅ Liga feminina detectada por UTR + women/w/feminino: {league_name}"
+        return False, f"❌ UTR Pro detectado sem indicador feminino: {league_name}"
+    
+    # SEGUNDO: Verificar se liga indica claramente tênis feminino
+    for indicator in FEMALE_LEAGUE_INDICATORS:
+        if indicator in league_lower:
+            return True, f"✅ Liga feminina detectada por indicador: {indicator}"
+    
+    # TERCEIRO: Se não encontrou indicadores claros na LIGA, rejeita por segurança
+    return False, f"❓ Liga indefinida - rejeitando por segurança: {league_name}"
+
+def detect_surface(league_name: str) -> str:
+    """Detecta o tipo de superfície baseado no nome do torneio"""
+    league_lower = (league_name or "").lower()
+    
+    if any(term in league_lower for term in ["clay", "terre", "roland", "french"]):
+        return "clay"
+    elif any(term in league_lower for term in ["grass", "wimbledon"]):
+        return "grass"
+    elif any(term in league_lower for term in ["indoor", "masters", "atp finals"]):
+        return "indoor"
+    else:
+        return "hard"  # padrão
+
+def is_female_league(league_name: str) -> bool:
+    """Atalho para classify_league retornando apenas o booleano"""
+    return classify_league(league_name)[0]
 
 class PreLiveScanner:
     def __init__(self, api_token: str, api_base: str):
         self.api_token = api_token
         self.api_base = api_base
         self.sport_id_tennis = 13  # ID do tênis na b365api (confirmado pelo teste)
+        self.log_sampler = EventSampler()  # Detalhe por evento em INFO (LOG_EVENT_SAMPLE_RATE)
         
         # Inicializa modelo sofisticado
         self.tennis_model = SophisticatedTennisModel(
@@ -63,22 +138,35 @@ class PreLiveScanner:
         )
         
         logger.info("PreLiveScanner inicializado com modelo sofisticado")
+    
+    def _api_get(self, endpoint: str, params: Dict, timeout: int = 20) -> requests.Response:
+        """GET na B365API (com limite de taxa) registrando endpoint e status nas métricas"""
+        rate_limiter.acquire(endpoint)
+        try:
+            response = requests.get(f"{self.api_base}{endpoint}", params=params, timeout=timeout)
+        except Exception:
+            metrics.record_api_call(endpoint, None)
+            raise
+        
+        metrics.record_api_call(endpoint, response.status_code)
+        rate_limiter.observe(endpoint, response)
+        return response
         
     def get_upcoming_events_original(self, hours_ahead: int = 48) -> List[MatchEvent]:
         """Busca jogos de tênis nas próximas X horas - MÉTODO ORIGINAL (backup)"""
         try:
-            url = f"{self.api_base}/v3/events/upcoming"
             params = {
                 "sport_id": self.sport_id_tennis,
                 "token": self.api_token
             }
             
             logger.info(f"Buscando jogos futuros nas próximas {hours_ahead}h...")
-            response = requests.get(url, params=params, timeout=20)
+            response = self._api_get("/v3/events/upcoming", params)
             response.raise_for_status()
             
             data = response.json()
             events = data.get("results", [])
+            player_index.add_events(events)
             
             cutoff = datetime.utcnow() + timedelta(hours=hours_ahead)
             now = datetime.utcnow()
@@ -147,7 +235,7 @@ class PreLiveScanner:
         """
         try:
             all_matches = []
-            url = f"{self.api_base}/v3/events/upcoming"
+            endpoint = "/v3/events/upcoming"
             
             logger.info(f"🔍 Buscando jogos com paginação (até {max_pages} páginas, {hours_ahead}h ahead)")
             
@@ -159,7 +247,7 @@ class PreLiveScanner:
                 "limit": 500
             }
             
-            response = requests.get(url, params=params_limit, timeout=20)
+            response = self._api_get(endpoint, params_limit)
             if response.status_code == 200:
                 data = response.json()
                 events = data.get("results", [])
@@ -181,7 +269,7 @@ class PreLiveScanner:
                 }
                 
                 logger.info(f"📄 Buscando página {page}...")
-                response = requests.get(url, params=params_page, timeout=20)
+                response = self._api_get(endpoint, params_page)
                 
                 if response.status_code != 200:
                     logger.warning(f"⚠️ Erro na página {page}: {response.status_code}")
@@ -225,7 +313,7 @@ class PreLiveScanner:
                     }
                     
                     logger.info(f"📅 Buscando dia {day_str}...")
-                    response = requests.get(url, params=params_day, timeout=20)
+                    response = self._api_get(endpoint, params_day)
                     
                     if response.status_code == 200:
                         data = response.json()
@@ -258,6 +346,9 @@ class PreLiveScanner:
     
     def _process_events_with_time_filter(self, events, hours_ahead):
         """Processa eventos aplicando filtro de tempo"""
+        # Todo payload baixado alimenta o índice de jogadores (nome -> ID) do RealDataProvider
+        player_index.add_events(events)
+        
         cutoff = datetime.utcnow() + timedelta(hours=hours_ahead)
         now = datetime.utcnow()
         matches = []
@@ -300,13 +391,13 @@ class PreLiveScanner:
     def get_event_odds(self, event_id: str) -> Optional[OddsData]:
         """Busca as odds pré-jogo de um evento específico"""
         try:
-            url = f"{self.api_base}/v2/event/odds"
             params = {
                 "token": self.api_token,
                 "event_id": event_id
             }
             
-            response = requests.get(url, params=params, timeout=20)
+            with metrics.timer("odds_fetch"):
+                response = self._api_get("/v2/event/odds", params)
             response.raise_for_status()
             
             data = response.json()
@@ -383,7 +474,8 @@ class PreLiveScanner:
                 )
                 probability = prob_home
             
-            logger.debug(f"Modelo calculou {probability:.1%} para {match.home} vs {match.away} ({match.surface})")
+            logger.debug("Modelo calculou %.1f%% para %s vs %s (%s)",
+                         probability * 100, match.home, match.away, match.surface)
             return probability
             
         except Exception as e:
@@ -489,59 +581,77 @@ class PreLiveScanner:
         """
         # Filtro 1: Range de odds
         if odds < 4.00 or odds > 6.00:
-            logger.info(f"Odds {odds:.2f} fora do range 4.00-6.00 - rejeitando")
+            log_event(logger, self.log_sampler, "Odds %.2f fora do range 4.00-6.00 - rejeitando", odds)
             return False
         
         # Filtro 2: Range de EV RESTRITO para 10%-15%
         if ev < 0.10 or ev > 0.15:
-            logger.info(f"EV {ev:.3f} fora do range 10%-15% - rejeitando")
+            log_event(logger, self.log_sampler, "EV %.3f fora do range 10%%-15%% - rejeitando", ev)
             return False
         
-        logger.info(f"✅ Aposta APROVADA (versão agressiva): EV {ev:.3f}, Odds {odds:.2f}")
+        log_event(logger, self.log_sampler, "✅ Aposta APROVADA (versão agressiva): EV %.3f, Odds %.2f", ev, odds)
         return True
     
     def scan_opportunities(self, 
                           hours_ahead: int = 48,
                           odd_min: float = 4.00,
-                          odd_max: float = 6.00) -> List[Opportunity]:
+                          odd_max: float = 6.00,
+                          progress: Callable[[str, int, int], None] = None) -> List[Opportunity]:
         """
         Escaneia oportunidades SIMPLES - apenas jogos femininos com odds 4.00-6.00
         SEM cálculos de EV ou probabilidades complexas
+        progress(etapa, feitos, total) é chamado na descoberta e a cada jogo analisado
         """
-        logger.info("🎾 Iniciando escaneamento SIMPLIFICADO...")
-        logger.info(f"📋 Filtros: Feminino + Odds {odd_min}-{odd_max}")
+        logger.info("🎾 Iniciando escaneamento SIMPLIFICADO - filtros: Feminino + Odds %s-%s", odd_min, odd_max)
         
-        events = self.get_upcoming_events(hours_ahead)
-        opportunities = []
+        discovery = StageSummary("scan.discovery")
+        classification = StageSummary("scan.classification")
+        odds_stage = StageSummary("scan.odds")
+        result = StageSummary("scan.result")
         
-        logger.info(f"🔍 Analisando {len(events)} jogos...")
+        discovery_start = time.perf_counter()
+        if progress:
+            progress("discovery", 0, 0)
+        with metrics.timer("discovery"):
+            events = self.get_upcoming_events(hours_ahead)
+        discovery.add("jogos", len(events))
+        discovery.emit(logger, "🔍 Descoberta", hours_ahead=hours_ahead,
+                       ms=round((time.perf_counter() - discovery_start) * 1000))
+        opportunities = []
         
         for i, match in enumerate(events, 1):
+            metrics.set_queue_depth("scan_events", len(events) - i)
+            if progress:
+                progress("analysis", i, len(events))
             try:
-                logger.info(f"📊 [{i}/{len(events)}] {match.home} vs {match.away}")
+                log_event(logger, self.log_sampler, "📊 [%d/%d] %s vs %s", i, len(events), match.home, match.away)
                 
                 # FILTRO 1: Apenas jogos femininos (individuais e duplas)
-                if not self._is_female_match(match):
-                    logger.info(f"  ❌ Jogo masculino - IGNORADO")
+                with metrics.timer("classification"):
+                    is_female = self._is_female_match(match)
+                if not is_female:
+                    classification.add("masculinos")
                     continue
-                
-                logger.info(f"  ✅ Jogo feminino detectado: {match.league}")
+                classification.add("femininos")
                 
                 # FILTRO 2: Buscar odds
                 odds_data = self.get_event_odds(match.event_id)
                 if not odds_data:
-                    logger.info(f"  ❌ Odds não encontradas")
+                    odds_stage.add("sem_odds")
+                    log_event(logger, self.log_sampler, "  ❌ Odds não encontradas: %s", match.event_id)
                     continue
                 
-                logger.info(f"  💰 Odds: {match.home} {odds_data.home_od:.2f} | {match.away} {odds_data.away_od:.2f}")
+                log_event(logger, self.log_sampler, "  💰 Odds: %s %.2f | %s %.2f",
+                          match.home, odds_data.home_od, match.away, odds_data.away_od)
                 
                 # FILTRO 3: Verificar se QUALQUER odd está na faixa definida (padrão: 4.00-6.00)
                 home_in_range = odd_min <= odds_data.home_od <= odd_max
                 away_in_range = odd_min <= odds_data.away_od <= odd_max
                 
                 if not (home_in_range or away_in_range):
-                    logger.info(f"  ⏭️ Odds fora da faixa {odd_min}-{odd_max}")
+                    odds_stage.add("fora_da_faixa")
                     continue
+                odds_stage.add("na_faixa")
                 
                 # CRIAR OPORTUNIDADES SIMPLES (sem EV ou probabilidades)
                 if home_in_range:
@@ -557,7 +667,7 @@ class PreLiveScanner:
                         p_market=0.5  # Não usado mais
                     )
                     opportunities.append(opp)
-                    logger.info(f"  🎯 OPORTUNIDADE: {match.home} @ {odds_data.home_od:.2f}")
+                    logger.info("🎯 OPORTUNIDADE: %s @ %.2f (%s)", match.home, odds_data.home_od, match.league)
                 
                 if away_in_range:
                     opp = Opportunity(
@@ -572,13 +682,17 @@ class PreLiveScanner:
                         p_market=0.5  # Não usado mais
                     )
                     opportunities.append(opp)
-                    logger.info(f"  🎯 OPORTUNIDADE: {match.away} @ {odds_data.away_od:.2f}")
+                    logger.info("🎯 OPORTUNIDADE: %s @ %.2f (%s)", match.away, odds_data.away_od, match.league)
                 
             except Exception as e:
-                logger.error(f"Erro ao processar {match.home} vs {match.away}: {e}")
+                result.add("erros")
+                logger.error("Erro ao processar %s vs %s: %s", match.home, match.away, e)
                 continue
         
-        logger.info(f"✅ Escaneamento concluído: {len(opportunities)} oportunidades encontradas")
+        classification.emit(logger, "🚺 Classificação")
+        odds_stage.emit(logger, "💰 Odds")
+        result.add("oportunidades", len(opportunities))
+        result.emit(logger, "✅ Escaneamento concluído", jogos=len(events))
         return opportunities
     
     def _is_female_match(self, match: MatchEvent) -> bool:
@@ -586,75 +700,14 @@ class PreLiveScanner:
         Detecta se o jogo é feminino APENAS pelo nome da liga/campeonato
         SEM filtros por nomes de jogadores para evitar falsos positivos
         """
-        league_lower = match.league.lower()
-        
-        logger.info(f"🔍 Analisando liga: {match.league}")
-        
-        # PRIMEIRO: Verificar indicadores masculinos na LIGA
-        male_league_indicators = [
-            "atp", " men ", "male", "masculino", "boys", "juniors men", 
-            " men's ", "mens ", "challenger", "futures",
-            # Indicadores ITF masculinos
-            "m25", "m15", "itf m25", "itf m15", "m25 ", "m15 ",
-            " m25", " m15", "m25 md", "m15 md",
-            # Outros formatos masculinos (cuidado com "men's doubles" vs "women's doubles")
-            "men's singles", "md", "ms"
-        ]
-        
-        for indicator in male_league_indicators:
-            if indicator in league_lower:
-                logger.info(f"❌ Liga masculina detectada por indicador: {indicator}")
-                return False
-        
-        # SEGUNDO: Verificar se liga indica claramente tênis feminino  
-        female_league_indicators = [
-            "wta", "women", "ladies", "female", "feminino", "fem",
-            "girls", "juniors women", "itf women", "qualifying women",
-            # Indicadores ITF femininos
-            "w100", "w75", "w50", "w35", "w25", "w15",
-            "itf w100", "itf w75", "itf w50", "itf w35", "itf w25", "itf w15",
-            # Indicadores específicos de duplas femininas
-            " wd", "wd ", "women doubles", "women's doubles",
-            # Torneios específicos femininos
-            "(w)", " women", "pro circuit"
-        ]
-
-        # Regra especial para UTR: só aceita se tiver women, w ou feminino
-        if "utr pro" in league_lower:
-            if ("women" in league_lower or
-                league_lower.strip().endswith(" w") or
-                league_lower.strip().endswith(" women") or
-                "feminino" in league_lower or
-                league_lower.strip().endswith(" feminino") or
-                league_lower.strip().endswith(" fem")):
-                logger.info(f"✅ Liga feminina detectada por UTR + women/w/feminino: {match.league}")
-                return True
-            else:
-                logger.info(f"❌ UTR Pro detectado sem indicador feminino: {match.league}")
-                return False
-
-        # Verifica se a liga indica tênis feminino
-        for indicator in female_league_indicators:
-            if indicator in league_lower:
-                logger.info(f"✅ Liga feminina detectada por indicador: {indicator}")
-                return True
-
-        # TERCEIRO: Se não encontrou indicadores claros na LIGA, rejeita por segurança
-        logger.info(f"❓ Liga indefinida - rejeitando por segurança: {match.league}")
-        return False
+        is_female, reason = classify_league(match.league)
+        log_event(logger, self.log_sampler, "🔍 Analisando liga: %s - %s", match.league, reason)
+        return is_female
 
     def _detect_surface(self, league_name: str) -> str:
         """Detecta o tipo de superfície baseado no nome do torneio"""
-        league_lower = league_name.lower()
-        
-        if any(term in league_lower for term in ["clay", "terre", "roland", "french"]):
-            return "clay"
-        elif any(term in league_lower for term in ["grass", "wimbledon"]):
-            return "grass"
-        elif any(term in league_lower for term in ["indoor", "masters", "atp finals"]):
-            return "indoor"
-        else:
-            return "hard"  # padrão
+        return detect_surface(league_name)
+    
     def _calculate_confidence_level(self, ev: float, p_model: float) -> str:
         """Calcula nível de confiança na oportunidade"""
         if ev >= 0.12 and 0.3 <= p_model <= 0.7:  # EV 12%+ = ALTA
@@ -688,6 +741,8 @@ class PreLiveScanner:
 
 def main():
     """Função principal para testes"""
+    setup_logging()
+    
     # Configuração (substitua pela sua config real)
     with open("config/config.json", "r") as f:
         config = json.load(f)
@@ -0,0 +1,57 @@
+"""
+Trava entre processos (flock) para eleger o único processo que roda scan e monitoramento
+Os demais workers HTTP apenas leem o SQLite; a trava é liberada pelo SO se o processo morrer
+"""
+
+import logging
+import os
+from pathlib import Path
+
+try:
+    import fcntl
+except ImportError:  # Windows: sem flock, assume processo único
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_LOCK_PATH = "storage/scheduler.lock"
+
+class ProcessLock:
+    """Trava exclusiva e não bloqueante sobre um arquivo"""
+
+    def __init__(self, path: str = DEFAULT_LOCK_PATH):
+        self.path = Path(path)
+        self._fd = None
+
+    @property
+    def held(self) -> bool:
+        return self._fd is not None
+
+    def acquire(self) -> bool:
+        """Tenta obter a trava; False se outro processo já a detém"""
+        if self._fd is not None:
+            return True
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+
+        if fcntl is not None:
+            try:
+                fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except OSError:
+                os.close(fd)
+                return False
+
+        os.ftruncate(fd, 0)
+        os.write(fd, str(os.getpid()).encode())
+        self._fd = fd
+        logger.info(f"🔒 Trava do scheduler obtida pelo processo {os.getpid()}")
+        return True
+
+    def release(self):
+        if self._fd is None:
+            return
+        if fcntl is not None:
+            fcntl.flock(self._fd, fcntl.LOCK_UN)
+        os.close(self._fd)
+        self._fd = None
@@ -0,0 +1,183 @@
+"""
+Profiler por amostragem (wall-clock) das threads do processo
+Lê sys._current_frames() em intervalo fixo; sem custo quando não há perfil em andamento
+Saída em pilhas colapsadas (flamegraph.pl / speedscope) ou no formato JSON do speedscope
+"""
+
+import sys
+import threading
+import time
+from collections import Counter
+from typing import Callable, Dict, List, Optional, Set, Tuple
+
+# Frame identificado por (função, arquivo, primeira linha)
+FrameKey = Tuple[str, str, int]
+Stack = Tuple[FrameKey, ...]
+
+DEFAULT_INTERVAL = 0.005  # 5ms entre amostras
+MAX_DEPTH = 128
+
+class SamplingProfiler:
+    """Amostra periodicamente as pilhas das threads alvo até stop()"""
+
+    def __init__(self, thread_ids: Dict[int, str] = None, interval: float = DEFAULT_INTERVAL,
+                 follow_new_threads: bool = False):
+        self.thread_ids = dict(thread_ids or {})  # ident -> nome exibido (vazio = todas)
+        self.interval = interval
+        # Com thread_ids: amostra também as threads criadas depois do start() (ex: pools do scan)
+        self.follow_new_threads = follow_new_threads
+        self._preexisting: Set[int] = set()
+        self.samples: Dict[str, Counter] = {}  # nome da thread -> {pilha: segundos}
+        self.sample_count = 0
+        self.started_at: Optional[float] = None
+        self.duration = 0.0
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> "SamplingProfiler":
+        self.started_at = time.perf_counter()
+        self._preexisting = {t.ident for t in threading.enumerate()}
+        self._thread = threading.Thread(target=self._run, name="sampling-profiler", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> "SamplingProfiler":
+        self._stop.set()
+        if self._thread:
+            self._thread.join()
+        self.duration = time.perf_counter() - self.started_at if self.started_at else 0.0
+        return self
+
+    def _run(self):
+        own = threading.get_ident()
+        last = time.perf_counter()
+        while not self._stop.wait(self.interval):
+            now = time.perf_counter()
+            elapsed, last = now - last, now
+            names = self.thread_ids or {t.ident: t.name for t in threading.enumerate()}
+            if self.thread_ids and self.follow_new_threads:
+                for t in threading.enumerate():
+                    if t.ident not in self._preexisting and t.ident not in names:
+                        names[t.ident] = self.thread_ids[t.ident] = t.name
+
+            for ident, frame in sys._current_frames().items():
+                if ident == own or ident not in names:
+                    continue
+                stack = self._stack(frame)
+                self.samples.setdefault(names[ident], Counter())[stack] += elapsed
+            self.sample_count += 1
+
+    @staticmethod
+    def _stack(frame) -> Stack:
+        """Pilha da raiz até a folha"""
+        frames: List[FrameKey] = []
+        while frame is not None and len(frames) < MAX_DEPTH:
+            code = frame.f_code
+            frames.append((code.co_name, code.co_filename, code.co_firstlineno))
+            frame = frame.f_back
+        return tuple(reversed(frames))
+
+    def collapsed(self) -> str:
+        """Formato 'thread;f1;f2;f3 N' com N em milissegundos"""
+        lines = []
+        for thread_name, stacks in sorted(self.samples.items()):
+            for stack, seconds in stacks.most_common():
+                names = ";".join(_frame_label(frame) for frame in stack)
+                lines.append(f"{thread_name};{names} {max(1, round(seconds * 1000))}")
+        return "\n".join(lines) + ("\n" if lines else "")
+
+    def speedscope(self, name: str = "TennisQ") -> Dict:
+        """Documento no formato de arquivo do speedscope (um perfil 'sampled' por thread)"""
+        frame_index: Dict[FrameKey, int] = {}
+        frames: List[Dict] = []
+        profiles = []
+
+        for thread_name, stacks in sorted(self.samples.items()):
+            samples, weights = [], []
+            for stack, seconds in stacks.items():
+                indexes = []
+                for frame in stack:
+                    if frame not in frame_index:
+                        frame_index[frame] = len(frames)
+                        frames.append({"name": frame[0], "file": frame[1], "line": frame[2]})
+                    indexes.append(frame_index[frame])
+                samples.append(indexes)
+                weights.append(round(seconds, 6))
+
+            profiles.append({
+                "type": "sampled",
+                "name": thread_name,
+                "unit": "seconds",
+                "startValue": 0,
+                "endValue": round(sum(weights), 6),
+                "samples": samples,
+                "weights": weights
+            })
+
+        return {
+            "$schema": "https://www.speedscope.app/file-format-schema.json",
+            "name": name,
+            "exporter": "tennisq-sampling-profiler",
+            "shared": {"frames": frames},
+            "profiles": profiles
+        }
+
+    def summary(self) -> Dict:
+        return {
+            "duration_s": round(self.duration, 3),
+            "samples": self.sample_count,
+            "interval_ms": self.interval * 1000,
+            "threads": sorted(self.samples)
+        }
+
+def _frame_label(frame: FrameKey) -> str:
+    name, filename, line = frame
+    short = filename.replace("\\", "/").rsplit("/", 2)
+    return f"{name} ({'/'.join(short[-2:])}:{line})"
+
+# Um perfil por vez no processo (evita amostradores concorrentes)
+_profile_lock = threading.Lock()
+
+def profile_for(seconds: float, thread_ids: Dict[int, str] = None,
+                interval: float = DEFAULT_INTERVAL) -> Optional[SamplingProfiler]:
+    """Amostra as threads por N segundos; None se já houver um perfil em andamento"""
+    if not _profile_lock.acquire(blocking=False):
+        return None
+    try:
+        profiler = SamplingProfiler(thread_ids, interval).start()
+        time.sleep(seconds)
+        return profiler.stop()
+    finally:
+        _profile_lock.release()
+
+def profile_call(fn: Callable[[], object], interval: float = DEFAULT_INTERVAL,
+                 thread_name: str = "call") -> Optional[Tuple[SamplingProfiler, object]]:
+    """
+    Executa fn numa thread própria e amostra ela e as threads criadas durante a chamada (pools de workers)
+    None se já houver um perfil em andamento
+    """
+    if not _profile_lock.acquire(blocking=False):
+        return None
+    try:
+        outcome: Dict[str, object] = {}
+        go = threading.Event()
+
+        def target():
+            go.wait()  # Só começa depois do amostrador, para não perder o início
+            try:
+                outcome["result"] = fn()
+            except Exception as e:
+                outcome["error"] = e
+
+        worker = threading.Thread(target=target, name=thread_name, daemon=True)
+        worker.start()
+        profiler = SamplingProfiler({worker.ident: thread_name}, interval, follow_new_threads=True).start()
+        go.set()
+        worker.join()
+        profiler.stop()
+
+        if "error" in outcome:
+            raise outcome["error"]
+        return profiler, outcome.get("result")
+    finally:
+        _profile_lock.release()
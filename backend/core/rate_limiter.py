@@ -0,0 +1,245 @@
+"""
+Limite de taxa da B365API por família de endpoints (token bucket), compartilhado entre threads
+Usado pelo PreLiveScanner (scan e monitoramento), ResultsIngestor e RealDataProvider
+Adapta-se a respostas 429 (Retry-After) e aos cabeçalhos X-RateLimit-* quando presentes
+
+Configuração: B365_RATE_LIMITS="events=2:5,odds=5:10,default=4:8" (família=req/s[:rajada]);
+B365_RATE_LIMITS=off desliga o limite (ex: stub local)
+Esperas acima de B365_RATE_LIMIT_MAX_WAIT segundos (padrão 60, ex: cota esgotada por horas) levantam
+TimeoutError e a chamada é pulada; interrupt() acorda as esperas em andamento na parada do serviço
+"""
+
+import logging
+import os
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from typing import Dict, Mapping, Optional, Tuple
+
+from .metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+# Prefixo do endpoint -> família (o prefixo mais longo vence)
+ENDPOINT_FAMILIES = {
+    "/v1/events": "events",
+    "/v3/events": "events",
+    "/v2/event/odds": "odds",
+    "/v2/tennis/player": "player",
+}
+
+# Família -> (req/s, rajada)
+DEFAULT_LIMITS = {
+    "events": (2.0, 5),
+    "odds": (5.0, 10),
+    "player": (4.0, 8),
+    "default": (4.0, 8),
+}
+
+MIN_RATE = 0.1  # Piso ao reduzir a taxa após 429
+RECOVERY = 1.05  # Crescimento da taxa a cada resposta OK até voltar à configurada
+MAX_BACKOFF = 300.0
+MAX_WAIT = float(os.getenv("B365_RATE_LIMIT_MAX_WAIT", 60))  # Espera máxima de um acquire (segundos)
+
+class TokenBucket:
+    """Balde de fichas: `rate` fichas/s até `burst`; acquire bloqueia até haver ficha"""
+
+    def __init__(self, rate: float, burst: int, max_wait: float = MAX_WAIT,
+                 interrupted: threading.Event = None):
+        self.configured_rate = rate
+        self.rate = rate
+        self.burst = max(1, burst)
+        self.tokens = float(self.burst)
+        self.paused_until = 0.0  # time.monotonic() até quando nada sai (429 / cota esgotada)
+        self.consecutive_429 = 0
+        self.max_wait = max_wait
+        self.interrupted = interrupted or threading.Event()  # Setado na parada: esperas terminam na hora
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float):
+        self.tokens = min(self.burst, self.tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def acquire(self, timeout: float = None) -> float:
+        """
+        Reserva uma ficha e espera até ela estar disponível; retorna os segundos esperados
+        TimeoutError se a espera passaria de timeout/max_wait ou se o limitador foi interrompido
+        """
+        limit = self.max_wait if timeout is None else min(timeout, self.max_wait)
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            self.tokens -= 1  # Reserva já: quem chega depois espera atrás
+            wait = max(self.paused_until - now, 0.0)
+            if self.tokens < 0:
+                wait = max(wait, -self.tokens / self.rate)
+
+        if self.interrupted.is_set():
+            self._release()
+            raise TimeoutError("Limite de taxa: limitador interrompido (serviço parando)")
+        if wait > limit:
+            self._release()
+            raise TimeoutError(f"Limite de taxa: espera de {wait:.1f}s excede {limit:.0f}s")
+        if wait > 0 and self.interrupted.wait(wait):
+            self._release()
+            raise TimeoutError("Limite de taxa: espera interrompida (serviço parando)")
+        return wait
+
+    def _release(self):
+        """Devolve a ficha reservada por um acquire que não vai chamar a API"""
+        with self._lock:
+            self.tokens += 1
+
+    def pause(self, seconds: float):
+        with self._lock:
+            self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+
+    def on_throttled(self, retry_after: Optional[float]) -> float:
+        """429: pausa (Retry-After ou backoff exponencial) e reduz a taxa à metade"""
+        with self._lock:
+            self.consecutive_429 += 1
+            backoff = retry_after if retry_after is not None else min(MAX_BACKOFF, 2.0 ** self.consecutive_429)
+            self.paused_until = max(self.paused_until, time.monotonic() + backoff)
+            self.rate = max(MIN_RATE, self.rate / 2)
+            self.tokens = min(self.tokens, 0.0)
+            return backoff
+
+    def on_success(self):
+        with self._lock:
+            self.consecutive_429 = 0
+            if self.rate < self.configured_rate:
+                self.rate = min(self.configured_rate, self.rate * RECOVERY)
+
+    def fit_quota(self, remaining: int, reset_in: float):
+        """Ajusta a taxa para distribuir as chamadas restantes até o reset da cota"""
+        with self._lock:
+            if remaining <= 0:
+                self.paused_until = max(self.paused_until, time.monotonic() + reset_in)
+                return
+            sustainable = remaining / max(reset_in, 1.0)
+            self.rate = max(MIN_RATE, min(self.configured_rate, sustainable))
+
+class RateLimiter:
+    """Um TokenBucket por família de endpoints"""
+
+    def __init__(self, limits: Mapping[str, Tuple[float, int]] = None,
+                 families: Mapping[str, str] = None, max_wait: float = MAX_WAIT):
+        self.limits = dict(DEFAULT_LIMITS, **(limits or {}))
+        self.families = dict(families or ENDPOINT_FAMILIES)
+        self.max_wait = max_wait
+        self._prefixes = sorted(self.families, key=len, reverse=True)
+        self._buckets: Dict[str, TokenBucket] = {}
+        self._lock = threading.Lock()
+        self._interrupted = threading.Event()  # Compartilhado por todos os baldes
+        self.enabled = True
+
+    @classmethod
+    def from_env(cls) -> "RateLimiter":
+        spec = os.getenv("B365_RATE_LIMITS", "")
+        if spec.strip().lower() == "off":
+            limiter = cls()
+            limiter.enabled = False
+            return limiter
+        return cls(parse_limits(spec))
+
+    def family_for(self, endpoint: str) -> str:
+        for prefix in self._prefixes:
+            if endpoint.startswith(prefix):
+                return self.families[prefix]
+        return "default"
+
+    def bucket(self, family: str) -> TokenBucket:
+        with self._lock:
+            if family not in self._buckets:
+                rate, burst = self.limits.get(family, self.limits["default"])
+                self._buckets[family] = TokenBucket(rate, burst, self.max_wait, self._interrupted)
+            return self._buckets[family]
+
+    def interrupt(self):
+        """Acorda as esperas em andamento e recusa as próximas (parada do serviço)"""
+        self._interrupted.set()
+
+    def resume(self):
+        """Volta a aceitar chamadas (serviço reiniciado)"""
+        self._interrupted.clear()
+
+    def acquire(self, endpoint: str, timeout: float = None) -> float:
+        """Espera a vez de chamar o endpoint; retorna os segundos esperados (TimeoutError = pular a chamada)"""
+        if not self.enabled:
+            return 0.0
+        family = self.family_for(endpoint)
+        waited = self.bucket(family).acquire(timeout)
+        if waited > 0:
+            metrics.stage_duration.observe(waited, stage=f"rate_limit_wait_{family}")
+        return waited
+
+    def observe(self, endpoint: str, response) -> None:
+        """Ajusta o balde da família conforme o status e os cabeçalhos da resposta"""
+        if response is None or not self.enabled:
+            return
+        family = self.family_for(endpoint)
+        bucket = self.bucket(family)
+        headers = getattr(response, "headers", None) or {}
+
+        if response.status_code == 429:
+            backoff = bucket.on_throttled(_retry_after(headers.get("Retry-After")))
+            logger.warning(f"⏳ 429 em {endpoint}: família '{family}' pausada por {backoff:.0f}s "
+                           f"(taxa agora {bucket.rate:.2f} req/s)")
+            return
+
+        if response.status_code < 400:
+            bucket.on_success()
+
+        remaining = _int_header(headers, "X-RateLimit-Remaining")
+        reset = _int_header(headers, "X-RateLimit-Reset")
+        if remaining is not None and reset is not None:
+            # Reset pode vir como epoch (segundos) ou como segundos restantes
+            reset_in = reset - time.time() if reset > 10 ** 9 else reset
+            bucket.fit_quota(remaining, max(reset_in, 0.0))
+
+    def status(self) -> Dict[str, Dict]:
+        with self._lock:
+            buckets = dict(self._buckets)
+        now = time.monotonic()
+        return {
+            family: {
+                "rate": round(bucket.rate, 3),
+                "configured_rate": bucket.configured_rate,
+                "burst": bucket.burst,
+                "paused_for": round(max(0.0, bucket.paused_until - now), 1)
+            } for family, bucket in buckets.items()
+        }
+
+def parse_limits(spec: str) -> Dict[str, Tuple[float, int]]:
+    """'events=2:5,odds=5' -> {'events': (2.0, 5), 'odds': (5.0, 5)}"""
+    limits = {}
+    for item in filter(None, (part.strip() for part in spec.split(","))):
+        try:
+            family, value = item.split("=", 1)
+            rate, _, burst = value.partition(":")
+            limits[family.strip()] = (float(rate), int(burst) if burst else max(1, int(float(rate))))
+        except ValueError:
+            logger.warning(f"⚠️ B365_RATE_LIMITS inválido, ignorando '{item}'")
+    return limits
+
+def _retry_after(value: Optional[str]) -> Optional[float]:
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        try:
+            return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+        except (TypeError, ValueError):
+            return None
+
+def _int_header(headers, name: str) -> Optional[int]:
+    try:
+        value = headers.get(name)
+        return int(float(value)) if value is not None else None
+    except (TypeError, ValueError):
+        return None
+
+# Limitador global do processo (todas as chamadas à B365API)
+rate_limiter = RateLimiter.from_env()
@@ -0,0 +1,124 @@
+"""
+Ratings incrementais dos jogadores (Elo por superfície + forma recente com média exponencial)
+Atualizados em O(1) por partida liquidada pela ingestão de resultados e persistidos no SQLite
+"""
+
+import logging
+from datetime import datetime
+from typing import Dict, Iterable, Optional
+
+from .database import PreLiveDatabase
+from .player_index import normalize_name
+
+logger = logging.getLogger(__name__)
+
+INITIAL_ELO = 1500.0
+INITIAL_FORM = 0.5
+FORM_ALPHA = 0.2  # Peso da partida mais recente na forma (média exponencial)
+OVERALL = "all"  # Superfície agregada (todas as partidas)
+SURFACES = ("hard", "clay", "grass", "indoor")
+MIN_RATED_MATCHES = 10  # Partidas liquidadas antes de o rating substituir o Elo calculado das partidas
+
+def k_factor(matches_played: int) -> float:
+    """K decrescente com a experiência (fórmula usada em Elo de tênis: 250 / (n + 5)^0.4)"""
+    return 250.0 / (matches_played + 5) ** 0.4
+
+def expected_score(elo_a: float, elo_b: float) -> float:
+    return 1.0 / (1.0 + 10 ** ((elo_b - elo_a) / 400.0))
+
+class RatingStore:
+    """Elo por (jogador, superfície) e forma por jogador nas tabelas player_ratings / player_form"""
+
+    def __init__(self, db: PreLiveDatabase):
+        self.db = db
+
+    def record_match(self, event_id: str, home: str, away: str, surface: str,
+                     winner: str, played_at: str = None) -> bool:
+        """Aplica uma partida encerrada (winner = HOME/AWAY); False se já aplicada"""
+        played_at = played_at or datetime.utcnow().isoformat()
+        home_key, away_key = normalize_name(home), normalize_name(away)
+        if not home_key or not away_key or winner not in ("HOME", "AWAY"):
+            return False
+        home_score = 1.0 if winner == "HOME" else 0.0
+
+        with self.db._connect() as conn:
+            cursor = conn.cursor()
+            cursor.execute("INSERT OR IGNORE INTO rated_events (event_id, rated_at) VALUES (?, ?)",
+                           (event_id, datetime.utcnow().isoformat()))
+            if cursor.rowcount == 0:
+                return False
+
+            for scope in {OVERALL, surface}:
+                home_elo, home_n = self._elo_row(cursor, home_key, scope)
+                away_elo, away_n = self._elo_row(cursor, away_key, scope)
+                expected = expected_score(home_elo, away_elo)
+                new_home = home_elo + k_factor(home_n) * (home_score - expected)
+                new_away = away_elo + k_factor(away_n) * ((1 - home_score) - (1 - expected))
+                self._save_elo(cursor, home_key, scope, new_home, home_n + 1, played_at)
+                self._save_elo(cursor, away_key, scope, new_away, away_n + 1, played_at)
+
+            self._update_form(cursor, home_key, home, home_score, played_at)
+            self._update_form(cursor, away_key, away, 1 - home_score, played_at)
+            conn.commit()
+        return True
+
+    def record_results(self, matches: Iterable[Dict]) -> int:
+        """Aplica várias partidas ({event_id, home, away, surface, winner, completed_at})"""
+        applied = 0
+        for match in matches:
+            try:
+                if self.record_match(match["event_id"], match["home"], match["away"],
+                                     match.get("surface") or "hard", match["winner"],
+                                     match.get("completed_at")):
+                    applied += 1
+            except Exception as e:
+                logger.warning(f"⚠️ Erro ao atualizar ratings do evento {match.get('event_id')}: {e}")
+        return applied
+
+    def get_player(self, name: str) -> Optional[Dict]:
+        """Ratings atuais do jogador (None se nunca teve partida liquidada)"""
+        key = normalize_name(name)
+        with self.db._connect() as conn:
+            form = conn.execute("SELECT form, matches, last_match_at FROM player_form WHERE player_key = ?",
+                                (key,)).fetchone()
+            if not form:
+                return None
+            rows = conn.execute("SELECT surface, elo, matches FROM player_ratings WHERE player_key = ?",
+                                (key,)).fetchall()
+
+        elo = {surface: elo for surface, elo, _ in rows}
+        overall = elo.pop(OVERALL, INITIAL_ELO)
+        return {
+            "elo": overall,
+            # Superfície sem partidas herda o Elo geral
+            "elo_surface": {surface: elo.get(surface, overall) for surface in SURFACES},
+            "surface_matches": {surface: n for surface, _, n in rows if surface != OVERALL},
+            "form": form[0],
+            "matches": form[1],
+            "last_match_at": form[2]
+        }
+
+    @staticmethod
+    def _elo_row(cursor, player_key: str, surface: str):
+        row = cursor.execute("SELECT elo, matches FROM player_ratings WHERE player_key = ? AND surface = ?",
+                             (player_key, surface)).fetchone()
+        return (row[0], row[1]) if row else (INITIAL_ELO, 0)
+
+    @staticmethod
+    def _save_elo(cursor, player_key: str, surface: str, elo: float, matches: int, played_at: str):
+        cursor.execute("""
+            INSERT INTO player_ratings (player_key, surface, elo, matches, updated_at) VALUES (?, ?, ?, ?, ?)
+            ON CONFLICT(player_key, surface) DO UPDATE SET
+                elo = excluded.elo, matches = excluded.matches, updated_at = excluded.updated_at
+        """, (player_key, surface, elo, matches, played_at))
+
+    @staticmethod
+    def _update_form(cursor, player_key: str, name: str, score: float, played_at: str):
+        row = cursor.execute("SELECT form, matches FROM player_form WHERE player_key = ?", (player_key,)).fetchone()
+        form, matches = row if row else (INITIAL_FORM, 0)
+        cursor.execute("""
+            INSERT INTO player_form (player_key, name, form, matches, last_match_at) VALUES (?, ?, ?, ?, ?)
+            ON CONFLICT(player_key) DO UPDATE SET
+                name = excluded.name, form = excluded.form, matches = excluded.matches,
+                last_match_at = excluded.last_match_at
+        """, (player_key, name, FORM_ALPHA * score + (1 - FORM_ALPHA) * form, matches + 1, played_at))
@@ -4,145 +4,138 @@ Sistema de atualização de dados reais de jogadores via B365API
 
 import requests
 import json
+import re
 import time
 from datetime import datetime, timedelta
 from typing import Dict, List, Optional
 import logging
-from .tennis_model import PlayerStats, PlayerDatabase
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from .tennis_model_simple import PlayerStats, PlayerDatabase
+from .player_index import player_index
+from .rate_limiter import rate_limiter
+from .http_cache import HttpCache
+from .metrics import metrics
+from .data_service import get_data_service
+from .ratings import MIN_RATED_MATCHES, SURFACES, RatingStore
 
 logger = logging.getLogger(__name__)
 
+# IDs no caminho viram {id} no label das métricas (uma série por endpoint, não por jogador)
+_PATH_ID = re.compile(r"/\d+(?=/|$)")
+
+def metric_endpoint(endpoint: str) -> str:
+    """'/v2/tennis/player/123/h2h/456' -> '/v2/tennis/player/{id}/h2h/{id}'"""
+    return _PATH_ID.sub("/{id}", endpoint)
+
 class RealDataProvider:
     """Busca dados reais de jogadores via B365API"""
     
-    def __init__(self, api_token: str, api_base: str):
+    def __init__(self, api_token: str, api_base: str, http_cache: HttpCache = None,
+                 ratings: RatingStore = None):
         self.api_token = api_token
         self.api_base = api_base
         self.session = requests.Session()
-        self.rate_limit_delay = 0.5  # Reduzido para 0.5 segundos entre requests
+        # Stats, partidas e H2H em cache no disco (TTL por endpoint, revalidação condicional)
+        self.http_cache = http_cache or HttpCache()
+        # Elo/forma mantidos pela ingestão de resultados
+        self.ratings = ratings or RatingStore(get_data_service())
+        self.player_index_refresh = 3600  # Segundos até o índice de jogadores ser considerado velho
+        self._index_lock = threading.Lock()
+        
+        # Rankings compartilhados entre chamadas (lista e mapa por ID)
+        self.rankings_ttl = 3600
+        self._rankings: List[Dict] = []
+        self._rankings_by_id: Dict[str, Dict] = {}
+        self._rankings_expires_at = 0.0
+        self._rankings_lock = threading.Lock()
         logger.info(f"RealDataProvider inicializado com base: {api_base}")
         
     def _make_request(self, endpoint: str, params: Dict = None) -> Optional[Dict]:
-        """Faz request para a API com rate limiting"""
+        """
+        Faz request para a API com rate limiting (token bucket compartilhado do processo)
+        Endpoints com TTL são servidos do cache em disco enquanto frescos e revalidados depois
+        """
+        ttl = self.http_cache.ttl_for(endpoint)
+        cached = None
+        if ttl:
+            key = self.http_cache.make_key(endpoint, params)
+            cached = self.http_cache.get(key)
+            metrics.record_cache("http", cached is not None and cached.fresh)
+            if cached is not None and cached.fresh:
+                return cached.data
+        
         try:
             url = f"{self.api_base}{endpoint}"
             default_params = {"token": self.api_token}
             if params:
                 default_params.update(params)
-                
-            response = self.session.get(url, params=default_params, timeout=5)  # Timeout reduzido
-            time.sleep(self.rate_limit_delay)  # Rate limiting reduzido
+            
+            rate_limiter.acquire(endpoint)
+            try:
+                response = self.session.get(url, params=default_params, timeout=5,  # Timeout reduzido
+                                            headers=cached.conditional_headers() if cached else None)
+            except Exception:
+                metrics.record_api_call(metric_endpoint(endpoint), None)
+                raise
+            metrics.record_api_call(metric_endpoint(endpoint), response.status_code)
+            rate_limiter.observe(endpoint, response)
+            
+            if response.status_code == 304 and cached is not None:
+                self.http_cache.refresh(cached.key, ttl)
+                return cached.data
             
             if response.status_code == 200:
-                return response.json()
+                data = response.json()
+                if ttl:
+                    self.http_cache.put(key, endpoint, data, ttl,
+                                        etag=response.headers.get("ETag"),
+                                        last_modified=response.headers.get("Last-Modified"))
+                return data
             else:
                 logger.warning(f"API request failed: {response.status_code} - {endpoint}")
-                return None
+                return cached.data if cached is not None else None
                 
         except Exception as e:
             logger.error(f"Error making API request to {endpoint}: {e}")
-            return None
+            # Resposta vencida é melhor que nenhuma quando a API falha
+            return cached.data if cached is not None else None
     
     def search_player_id(self, player_name: str) -> Optional[str]:
-        """Busca ID do jogador pelo nome usando eventos de tênis"""
+        """Busca ID do jogador pelo nome no índice de jogadores (sem chamadas à API se o índice está fresco)"""
         try:
-            # Busca em eventos de tênis (sport_id=13)
-            endpoints_to_try = [
-                "/v1/events/upcoming",
-                "/v1/events/inplay"
-            ]
+            self.refresh_player_index()
+            return player_index.lookup(player_name)
+        except Exception as e:
+            logger.warning(f"Error searching player {player_name}: {e}")
+            return None
+    
+    def refresh_player_index(self):
+        """Recarrega o índice a partir de eventos de tênis se ninguém o alimentou no intervalo"""
+        if not player_index.is_stale(self.player_index_refresh):
+            return
+        
+        with self._index_lock:
+            if not player_index.is_stale(self.player_index_refresh):
+                return
             
-            for endpoint in endpoints_to_try:
-                logger.debug(f"Buscando jogador {player_name} em {endpoint}")
+            # Busca em eventos de tênis (sport_id=13); o scanner também alimenta o índice a cada scan
+            for endpoint in ["/v1/events/upcoming", "/v1/events/inplay"]:
+                logger.debug(f"Atualizando índice de jogadores com {endpoint}")
                 data = self._make_request(endpoint, {"sport_id": 13})
-                
-                if data and data.get('success') == 1:
-                    events = data.get('results', [])
-                    
-                    # Procura o jogador nos eventos
-                    for event in events:
-                        if isinstance(event, dict):
-                            # Verifica home team
-                            home = event.get('home', {})
-                            if isinstance(home, dict):
-                                home_name = home.get('name', '')
-                                if home_name.lower() == player_name.lower():
-                                    return home.get('id')
-                            
-                            # Verifica away team  
-                            away = event.get('away', {})
-                            if isinstance(away, dict):
-                                away_name = away.get('name', '')
-                                if away_name.lower() == player_name.lower():
-                                    return away.get('id')
-                
-                # Se encontrou dados válidos, para de tentar outros endpoints
                 if data and data.get('success') == 1:
+                    player_index.add_events(data.get('results', []))
+                    logger.info(f"Índice de jogadores atualizado: {len(player_index)} jogadores")
                     break
-                    
-            return None
-            
-        except Exception as e:
-            logger.warning(f"Error searching player {player_name}: {e}")
-            return None
     
     def _search_in_rankings(self, player_name: str) -> Optional[str]:
         """Busca jogador nos rankings ATP/WTA como fallback"""
-        try:
-            # Busca no ATP
-            atp_rankings = self.get_atp_rankings()
-            for player in atp_rankings:
-                if isinstance(player, dict):
-                    name = player.get("name", player.get("player_name", ""))
-                    if name and name.lower() == player_name.lower():
-                        return player.get("id", player.get("player_id"))
-            
-            # Busca no WTA
-            wta_rankings = self.get_wta_rankings()
-            for player in wta_rankings:
-                if isinstance(player, dict):
-                    name = player.get("name", player.get("player_name", ""))
-                    if name and name.lower() == player_name.lower():
-                        return player.get("id", player.get("player_id"))
-                        
-            return None
-        except Exception as e:
-            logger.debug(f"Error searching in rankings for {player_name}: {e}")
-            return None
-            
-        except Exception as e:
-            logger.warning(f"Error searching player {player_name}: {e}")
-            return None
+        # Os "rankings" são os jogadores dos eventos atuais, os mesmos do índice
+        return self.search_player_id(player_name)
     
     def get_atp_rankings(self) -> List[Dict]:
-        """Busca rankings ATP usando eventos atuais de tênis"""
-        try:
-            # Usa eventos de tênis para extrair jogadores ranqueados
-            data = self._make_request("/v1/events/upcoming", {"sport_id": 13})
-            
-            if data and data.get('success') == 1:
-                events = data.get('results', [])
-                players = []
-                
-                for event in events:
-                    if isinstance(event, dict):
-                        # Extrai jogadores dos eventos
-                        for side in ['home', 'away']:
-                            team = event.get(side, {})
-                            if isinstance(team, dict) and team.get('name'):
-                                player = {
-                                    'id': team.get('id'),
-                                    'name': team.get('name'),
-                                    'league': event.get('league', {}).get('name', '')
-                                }
-                                players.append(player)
-                
-                return players[:100]  # Retorna até 100 jogadores
-            
-            return []
-        except Exception as e:
-            logger.debug(f"Error getting ATP rankings: {e}")
-            return []
+        """Busca rankings ATP usando eventos atuais de tênis (cache de rankings_ttl segundos)"""
+        return self._load_rankings()[:100]  # Retorna até 100 jogadores
     
     def get_wta_rankings(self) -> List[Dict]:
         """Busca rankings WTA usando eventos atuais de tênis"""
@@ -150,6 +143,51 @@ class RealDataProvider:
         # Idealmente filtaria por ligas femininas
         return self.get_atp_rankings()
     
+    def get_ranking(self, player_id: str) -> int:
+        """Posição do jogador no ranking em cache (999 se desconhecida)"""
+        self._load_rankings()
+        player = self._rankings_by_id.get(str(player_id))
+        return player.get("position", 999) if player else 999
+    
+    def _load_rankings(self) -> List[Dict]:
+        """Jogadores dos eventos atuais, baixados no máximo uma vez por rankings_ttl"""
+        with self._rankings_lock:
+            if time.monotonic() < self._rankings_expires_at:
+                return self._rankings
+            
+            try:
+                # Usa eventos de tênis para extrair jogadores ranqueados
+                data = self._make_request("/v1/events/upcoming", {"sport_id": 13})
+                
+                if data and data.get('success') == 1:
+                    events = data.get('results', [])
+                    player_index.add_events(events)
+                    players = []
+                    
+                    for event in events:
+                        if isinstance(event, dict):
+                            # Extrai jogadores dos eventos
+                            for side in ['home', 'away']:
+                                team = event.get(side, {})
+                                if isinstance(team, dict) and team.get('name'):
+                                    player = {
+                                        'id': team.get('id'),
+                                        'name': team.get('name'),
+                                        'league': event.get('league', {}).get('name', '')
+                                    }
+                                    players.append(player)
+                    
+                    self._rankings = players
+                    self._rankings_by_id = {str(p['id']): p for p in players if p.get('id')}
+                    self._rankings_expires_at = time.monotonic() + self.rankings_ttl
+                    return self._rankings
+            except Exception as e:
+                logger.debug(f"Error getting ATP rankings: {e}")
+            
+            # Falha: mantém o cache anterior e tenta de novo em 1 minuto
+            self._rankings_expires_at = time.monotonic() + 60
+            return self._rankings
+    
     def get_player_stats(self, player_id: str) -> Optional[Dict]:
         """Busca estatísticas detalhadas do jogador"""
         return self._make_request(f"/v2/tennis/player/{player_id}/stats")
@@ -237,64 +275,111 @@ class RealDataProvider:
             return self._create_fallback_player(player_name, player_db)
         
         try:
-            # Busca estatísticas
-            stats = self.get_player_stats(player_id)
-            matches = self.get_player_matches(player_id, days_back=90)
+            # Busca estatísticas e partidas em paralelo
+            with ThreadPoolExecutor(max_workers=2) as pool:
+                stats_future = pool.submit(self.get_player_stats, player_id)
+                matches_future = pool.submit(self.get_player_matches, player_id, 90)
+                stats_future.result()
+                matches = matches_future.result()
             
-            # Busca ranking (tenta ATP primeiro, depois WTA)
-            ranking = 999
-            atp_rankings = self.get_atp_rankings()
-            wta_rankings = self.get_wta_rankings()
-            
-            for player in atp_rankings + wta_rankings:
-                if player.get("id") == player_id:
-                    ranking = player.get("position", 999)
-                    break
-            
-            # Calcula métricas
-            recent_form = self.calculate_recent_form(matches)
-            matches_last_30d = len([m for m in matches if self._is_recent_match(m, 30)])
-            
-            # Calcula Elo por superfície
-            elo_surface = {
-                "hard": self.calculate_surface_elo(matches, "hard"),
-                "clay": self.calculate_surface_elo(matches, "clay"),
-                "grass": self.calculate_surface_elo(matches, "grass"),
-                "indoor": self.calculate_surface_elo(matches, "indoor")
-            }
-            
-            # Calcula win rate por superfície
-            win_rate_surface = {}
-            for surface in ["hard", "clay", "grass", "indoor"]:
-                surface_matches = [m for m in matches if m.get("surface", "").lower() == surface.lower()]
-                if surface_matches:
-                    wins = sum(1 for m in surface_matches if m.get("result") == "W")
-                    win_rate_surface[surface] = wins / len(surface_matches)
-                else:
-                    win_rate_surface[surface] = 0.5
-            
-            # Cria PlayerStats com dados reais
-            player_stats = PlayerStats(
-                name=player_name,
-                ranking=ranking,
-                elo_rating=sum(elo_surface.values()) / len(elo_surface),
-                elo_surface=elo_surface,
-                recent_form=recent_form,
-                matches_last_30d=matches_last_30d,
-                win_rate_surface=win_rate_surface,
-                last_updated=datetime.utcnow().isoformat()
-            )
-            
-            # Salva no banco
-            player_db.save_player(player_stats)
-            logger.info(f"Dados reais salvos para {player_name}: Ranking {ranking}, Form {recent_form:.2f}")
-            
-            return player_stats
+            return self._save_real_player(player_name, player_id, matches, player_db)
             
         except Exception as e:
             logger.error(f"Erro ao buscar dados reais para {player_name}: {e}")
             return self._create_fallback_player(player_name, player_db)
     
+    def update_players(self, player_names: List[str], player_db: PlayerDatabase,
+                       max_workers: int = 8) -> Dict[str, PlayerStats]:
+        """
+        Atualiza vários jogadores numa passada: índice e rankings carregados uma vez,
+        estatísticas e partidas de todos buscadas em paralelo; gravação no thread chamador
+        """
+        names = list(dict.fromkeys(player_names))
+        started = time.monotonic()
+        self.refresh_player_index()
+        self._load_rankings()
+        
+        player_ids = {name: self.search_player_id(name) for name in names}
+        results: Dict[str, PlayerStats] = {}
+        
+        with ThreadPoolExecutor(max_workers=max_workers) as pool:
+            futures = {
+                name: (pool.submit(self.get_player_stats, player_id),
+                       pool.submit(self.get_player_matches, player_id, 90))
+                for name, player_id in player_ids.items() if player_id
+            }
+            
+            for name in names:
+                if name not in futures:
+                    logger.warning(f"Player ID não encontrado para {name}")
+                    results[name] = self._create_fallback_player(name, player_db)
+                    continue
+                
+                stats_future, matches_future = futures[name]
+                try:
+                    stats_future.result()
+                    results[name] = self._save_real_player(name, player_ids[name], matches_future.result(), player_db)
+                except Exception as e:
+                    logger.error(f"Erro ao buscar dados reais para {name}: {e}")
+                    results[name] = self._create_fallback_player(name, player_db)
+        
+        logger.info(f"{len(futures)}/{len(names)} jogadores atualizados com dados reais em {time.monotonic() - started:.1f}s")
+        return results
+    
+    def _save_real_player(self, player_name: str, player_id: str, matches: List[Dict],
+                          player_db: PlayerDatabase) -> PlayerStats:
+        """Calcula as métricas a partir das partidas e grava o jogador"""
+        # Busca ranking (mapa por ID em cache)
+        ranking = self.get_ranking(player_id)
+        
+        # Partidas agrupadas por superfície numa única passada
+        by_surface: Dict[str, List[Dict]] = {surface: [] for surface in SURFACES}
+        for match in matches:
+            surface = match.get("surface", "").lower()
+            if surface in by_surface:
+                by_surface[surface].append(match)
+        
+        matches_last_30d = len([m for m in matches if self._is_recent_match(m, 30)])
+        
+        # Calcula win rate por superfície
+        win_rate_surface = {}
+        for surface, surface_matches in by_surface.items():
+            if surface_matches:
+                wins = sum(1 for m in surface_matches if m.get("result") == "W")
+                win_rate_surface[surface] = wins / len(surface_matches)
+            else:
+                win_rate_surface[surface] = 0.5
+        
+        # Elo e forma: ratings incrementais (resultados liquidados) se houver partidas suficientes,
+        # senão calculados das partidas (poucas partidas deixam o Elo perto do inicial)
+        rating = self.ratings.get_player(player_name)
+        if rating and rating["matches"] >= MIN_RATED_MATCHES:
+            elo_surface = rating["elo_surface"]
+            elo_rating = rating["elo"]
+            recent_form = rating["form"]
+        else:
+            elo_surface = {surface: self.calculate_surface_elo(by_surface[surface], surface) for surface in SURFACES}
+            elo_rating = sum(elo_surface.values()) / len(elo_surface)
+            recent_form = self.calculate_recent_form(matches)
+        
+        # Cria PlayerStats com dados reais
+        player_stats = PlayerStats(
+            name=player_name,
+            ranking=ranking,
+            elo_rating=elo_rating,
+            elo_surface=elo_surface,
+            recent_form=recent_form,
+            matches_last_30d=matches_last_30d,
+            win_rate_surface=win_rate_surface,
+            last_updated=datetime.utcnow().isoformat()
+        )
+        
+        # Salva no banco
+        player_db.save_player(player_stats)
+        logger.info(f"Dados reais salvos para {player_name}: Ranking {ranking}, Form {recent_form:.2f}")
+        
+        return player_stats
+    
     def _is_recent_match(self, match: Dict, days: int) -> bool:
         """Verifica se a partida é recente"""
         try:
@@ -0,0 +1,213 @@
+"""
+Ingestão incremental de resultados das partidas (tabela match_results)
+Busca eventos encerrados na B365API em lotes concorrentes e liquida as oportunidades
+"""
+
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Set
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from .database import PreLiveDatabase
+from .metrics import metrics
+from .rate_limiter import rate_limiter
+from .prelive_scanner import detect_surface
+from .ratings import RatingStore
+
+logger = logging.getLogger(__name__)
+
+# Chave do último start_utc já coberto pela ingestão
+STATE_KEY = "results_last_ingested"
+
+# time_status da B365API para partida encerrada
+TIME_STATUS_ENDED = "3"
+
+class ResultsIngestor:
+    """Preenche match_results a partir do endpoint de eventos encerrados"""
+
+    def __init__(self, db: PreLiveDatabase, api_token: str, api_base: str,
+                 max_workers: int = 4, grace_hours: float = 4,
+                 lookback_days: int = 7, session: requests.Session = None):
+        self.db = db
+        self.api_token = api_token
+        self.api_base = api_base
+        self.sport_id_tennis = 13
+        self.max_workers = max_workers
+        self.grace_hours = grace_hours  # Tempo após o início até considerar o jogo encerrado
+        self.lookback_days = lookback_days  # Janela máxima para aguardar um resultado
+        self.ratings = RatingStore(db)  # Elo/forma atualizados a cada partida liquidada
+
+        self.session = session or requests.Session()
+        adapter = HTTPAdapter(pool_connections=max_workers, pool_maxsize=max_workers)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+    def ingest(self) -> Dict:
+        """Executa uma rodada incremental de ingestão"""
+        now = datetime.utcnow()
+        until = now - timedelta(hours=self.grace_hours)
+        give_up = now - timedelta(days=self.lookback_days)
+
+        watermark = self.db.get_state(STATE_KEY) or give_up.isoformat()
+        pending = self.db.get_unsettled_events(since=watermark, until=until.isoformat())
+
+        if not pending:
+            logger.info("Ingestão de resultados: nenhum evento novo encerrado")
+            self.db.set_state(STATE_KEY, until.isoformat())
+            return {"pending": 0, "ingested": 0, "settled": 0}
+
+        logger.info(f"Ingestão de resultados: {len(pending)} eventos pendentes desde {watermark}")
+
+        # Agrupa por dia de início: o endpoint de encerrados é consultado por dia
+        days: Dict[str, Set[str]] = {}
+        for event_id, start_utc in pending.items():
+            day = self._parse_start(start_utc).strftime("%Y%m%d")
+            days.setdefault(day, set()).add(event_id)
+
+        results: List[Dict] = []
+        with metrics.timer("results_fetch"), ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            for day_results in executor.map(lambda item: self._fetch_day(*item), days.items()):
+                results.extend(day_results)
+
+        ingested = self.db.upsert_match_results(results)
+        settled = self.db.mark_events_settled([r["event_id"] for r in results])
+        rated = self._update_ratings(results)
+
+        # Avança a marca d'água até o primeiro evento ainda sem resultado (dentro da janela)
+        resolved = {r["event_id"] for r in results}
+        unresolved_starts = [
+            self._parse_start(start_utc) for event_id, start_utc in pending.items()
+            if event_id not in resolved and self._parse_start(start_utc) > give_up
+        ]
+        if unresolved_starts:
+            new_watermark = min(unresolved_starts) - timedelta(minutes=1)
+        else:
+            new_watermark = until
+        self.db.set_state(STATE_KEY, new_watermark.isoformat())
+
+        logger.info(f"Ingestão de resultados concluída: {ingested} resultados, "
+                    f"{settled} oportunidades liquidadas, {rated} ratings atualizados, "
+                    f"{len(unresolved_starts)} aguardando")
+
+        return {
+            "pending": len(pending),
+            "ingested": ingested,
+            "settled": settled,
+            "rated": rated,
+            "unresolved": len(unresolved_starts),
+            "watermark": new_watermark.isoformat()
+        }
+
+    def _update_ratings(self, results: List[Dict]) -> int:
+        """Aplica os resultados novos ao Elo/forma dos jogadores (idempotente por evento)"""
+        if not results:
+            return 0
+        
+        info = self.db.get_events_info([r["event_id"] for r in results])
+        matches = []
+        for result in results:
+            event = info.get(result["event_id"])
+            if not event or " vs " not in event["match_name"]:
+                continue
+            home, away = event["match_name"].split(" vs ", 1)
+            matches.append({
+                "event_id": result["event_id"],
+                "home": home,
+                "away": away,
+                "surface": detect_surface(event["league"]),
+                "winner": result["winner"],
+                "completed_at": event["start_utc"]
+            })
+        # Elo depende da ordem: aplica na ordem em que as partidas aconteceram
+        return self.ratings.record_results(sorted(matches, key=lambda m: m["completed_at"]))
+
+    def _fetch_day(self, day: str, wanted: Set[str]) -> List[Dict]:
+        """Percorre as páginas de encerrados de um dia e extrai os eventos desejados"""
+        url = f"{self.api_base}/v3/events/ended"
+        found: List[Dict] = []
+        remaining = set(wanted)
+        page = 1
+
+        while remaining:
+            params = {
+                "sport_id": self.sport_id_tennis,
+                "token": self.api_token,
+                "day": day,
+                "page": page
+            }
+
+            try:
+                rate_limiter.acquire("/v3/events/ended")
+                try:
+                    response = self.session.get(url, params=params, timeout=20)
+                except Exception:
+                    metrics.record_api_call("/v3/events/ended", None)
+                    raise
+                metrics.record_api_call("/v3/events/ended", response.status_code)
+                rate_limiter.observe("/v3/events/ended", response)
+                response.raise_for_status()
+                data = response.json()
+            except Exception as e:
+                logger.warning(f"Erro ao buscar encerrados do dia {day} (página {page}): {e}")
+                break
+
+            for event in data.get("results", []):
+                event_id = str(event.get("id", ""))
+                if event_id not in remaining:
+                    continue
+
+                result = self._parse_result(event)
+                if result:
+                    found.append(result)
+                    remaining.discard(event_id)
+
+            pager = data.get("pager", {})
+            per_page = int(pager.get("per_page", 0) or 0)
+            total = int(pager.get("total", 0) or 0)
+            if not per_page or page * per_page >= total:
+                break
+            page += 1
+
+        return found
+
+    def _parse_result(self, event: Dict) -> Optional[Dict]:
+        """Converte um evento encerrado da API em uma linha de match_results"""
+        if str(event.get("time_status", "")) != TIME_STATUS_ENDED:
+            return None
+
+        score = event.get("ss") or ""
+        try:
+            home_score, away_score = (part.strip() for part in score.split("-", 1))
+            home_sets, away_sets = int(home_score), int(away_score)
+        except ValueError:
+            return None
+
+        if home_sets == away_sets:
+            return None
+
+        return {
+            "event_id": str(event["id"]),
+            "winner": "HOME" if home_sets > away_sets else "AWAY",
+            "home_score": home_score,
+            "away_score": away_score,
+            "completed_at": self._event_time(event)
+        }
+
+    @staticmethod
+    def _event_time(event: Dict) -> Optional[str]:
+        """
+        Horário da partida segundo a API (campo time, unix UTC), e não o da ingestão (que fica em created_at)
+        O /v3/events/ended não traz horário de término: é o único horário do evento disponível
+        """
+        try:
+            return datetime.utcfromtimestamp(int(event["time"])).isoformat()
+        except (KeyError, TypeError, ValueError):
+            return None
+
+    @staticmethod
+    def _parse_start(start_utc: str) -> datetime:
+        """Converte start_utc ("%Y-%m-%d %H:%M" ou ISO) para datetime naive UTC"""
+        return datetime.fromisoformat(start_utc.replace('Z', '')).replace(tzinfo=None)
@@ -0,0 +1,87 @@
+"""
+Esperas orientadas a eventos para os loops de background
+Um worker dorme até o próximo prazo e acorda na hora certa, num sinal (trigger) ou na parada,
+sem acordar periodicamente só para conferir flags
+"""
+
+import threading
+import time
+from typing import Callable, Optional, Set
+
+# Motivos especiais devolvidos por Wakeup.wait_until
+STOPPED = "stop"
+RESCHEDULE = "reschedule"  # Recalcular o prazo sem executar o trabalho agora
+
+class Wakeup:
+    """Ponto de espera de um worker (threading.Condition)"""
+
+    def __init__(self, name: str):
+        self.name = name
+        self._cond = threading.Condition()
+        self._reasons: Set[str] = set()
+        self._stopped = False
+
+    @property
+    def stopped(self) -> bool:
+        return self._stopped
+
+    def trigger(self, reason: str = "trigger"):
+        """Acorda o worker agora; sinais pendentes se acumulam num único despertar"""
+        with self._cond:
+            self._reasons.add(reason)
+            self._cond.notify_all()
+
+    def stop(self):
+        with self._cond:
+            self._stopped = True
+            self._cond.notify_all()
+
+    def reset(self):
+        """Volta a aceitar esperas (ao reiniciar o serviço)"""
+        with self._cond:
+            self._stopped = False
+            self._reasons.clear()
+
+    def wait_until(self, deadline: float, heartbeat: Callable[[float], None] = None,
+                   heartbeat_interval: float = 0) -> Optional[str]:
+        """
+        Espera até deadline (time.monotonic())
+        Retorna None no prazo, STOPPED na parada ou o motivo do sinal (RESCHEDULE só se for o único)
+        heartbeat(segundos restantes) é chamado a cada heartbeat_interval durante esperas longas
+        """
+        next_beat = time.monotonic() + heartbeat_interval if heartbeat and heartbeat_interval > 0 else None
+
+        with self._cond:
+            while True:
+                if self._stopped:
+                    return STOPPED
+                if self._reasons:
+                    reasons = self._reasons - {RESCHEDULE}
+                    reason = min(reasons) if reasons else RESCHEDULE
+                    self._reasons.clear()
+                    return reason
+
+                now = time.monotonic()
+                if now >= deadline:
+                    return None
+                if next_beat is not None and now >= next_beat:
+                    heartbeat(deadline - now)
+                    next_beat += heartbeat_interval
+
+                wake_at = deadline if next_beat is None else min(deadline, next_beat)
+                self._cond.wait(wake_at - now)
+
+    def wait(self, seconds: float, heartbeat: Callable[[float], None] = None,
+             heartbeat_interval: float = 0) -> Optional[str]:
+        return self.wait_until(time.monotonic() + seconds, heartbeat, heartbeat_interval)
+
+    def pause(self, seconds: float) -> bool:
+        """Pausa curta que só a parada interrompe (sinais ficam para a próxima espera); True se parado"""
+        with self._cond:
+            return self._cond.wait_for(lambda: self._stopped, timeout=seconds)
+
+def remaining_label(seconds: float) -> str:
+    """'1h 20m' / '35m' para logs de heartbeat"""
+    remaining = int(seconds)
+    hours, minutes = remaining // 3600, (remaining % 3600) // 60
+    return f"{hours}h {minutes}m" if hours > 0 else f"{minutes}m"
@@ -4,7 +4,8 @@ Remove dependência de ranking, form, elo e dados de jogadores
 """
 
 import logging
-from typing import Tuple
+from dataclasses import dataclass, field
+from typing import Dict, Optional, Tuple
 
 logger = logging.getLogger(__name__)
 
@@ -47,9 +48,9 @@ class SophisticatedTennisModel:
             prob_home_normalized = prob_home_market / total_prob
             prob_away_normalized = prob_away_market / total_prob
             
-            logger.info(f"🎯 Probabilidades baseadas APENAS em odds:")
-            logger.info(f"   {player1}: {prob_home_normalized:.3f} (odds {home_odds:.2f})")
-            logger.info(f"   {player2}: {prob_away_normalized:.3f} (odds {away_odds:.2f})")
+            logger.debug("🎯 Probabilidades baseadas APENAS em odds: %s %.3f (odds %.2f) | %s %.3f (odds %.2f)",
+                         player1, prob_home_normalized, home_odds,
+                         player2, prob_away_normalized, away_odds)
             
             # Confidence sempre máxima pois usa dados reais do mercado
             confidence = 1.0
@@ -67,8 +68,26 @@ class SophisticatedTennisModel:
         """
         return 1.0
 
-# Classe de compatibilidade vazia
+@dataclass
+class PlayerStats:
+    """Dados de um jogador (compatibilidade com o RealDataProvider; o modelo não os usa)"""
+    name: str
+    ranking: int = 999
+    elo_rating: float = 1500.0
+    elo_surface: Dict[str, float] = field(default_factory=dict)
+    recent_form: float = 0.5
+    matches_last_30d: int = 0
+    win_rate_surface: Dict[str, float] = field(default_factory=dict)
+    last_updated: Optional[str] = None
+
+# Classe de compatibilidade: guarda os jogadores só em memória
 class PlayerDatabase:
-    """Classe vazia para compatibilidade"""
+    """Classe de compatibilidade (sem persistência)"""
     def __init__(self, *args, **kwargs):
-        pass
+        self.players: Dict[str, PlayerStats] = {}
+    
+    def save_player(self, player: PlayerStats):
+        self.players[player.name] = player
+    
+    def get_player(self, name: str) -> Optional[PlayerStats]:
+        return self.players.get(name)
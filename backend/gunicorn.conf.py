@@ -0,0 +1,43 @@
+"""
+Configuração do gunicorn para o TennisQ (Railway/Docker)
+Variáveis: PORT, WEB_CONCURRENCY (workers), GUNICORN_THREADS, GUNICORN_TIMEOUT
+"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+bind = f"0.0.0.0:{os.getenv('PORT', '8080')}"
+workers = int(os.getenv("WEB_CONCURRENCY", 2))
+worker_class = "gthread"
+threads = int(os.getenv("GUNICORN_THREADS", 4))
+
+# /debug/profile e consultas ao SQLite podem levar alguns segundos
+timeout = int(os.getenv("GUNICORN_TIMEOUT", 120))
+graceful_timeout = 30
+keepalive = 5
+
+# Cada worker importa a app após o fork: nenhuma thread de background é herdada do master
+preload_app = False
+
+accesslog = None
+errorlog = "-"
+loglevel = os.getenv("LOG_LEVEL", "info").lower()
+
+def post_worker_init(worker):
+    """Worker pronto: disputa a trava para rodar scan e monitoramento (só em wsgi:application)"""
+    tennisq = sys.modules.get("app")
+    if tennisq is not None and tennisq.app_instance is not None:
+        tennisq.app_instance.start_scheduler_election()
+
+def worker_exit(server, worker):
+    """Encerramento gracioso do worker (mesma rotina do signal_handler)"""
+    tennisq = sys.modules.get("app")
+    if tennisq is not None:
+        tennisq.shutdown()
+    
+    # Webhook: processa os updates já confirmados antes de sair
+    webhook = sys.modules.get("wsgi_webhook")
+    if webhook is not None:
+        webhook.handler.stop_workers()
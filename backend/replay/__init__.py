@@ -0,0 +1 @@
+# TennisQ Backend Replay Module
@@ -0,0 +1,295 @@
+"""
+Benchmarks dos caminhos críticos: scan, monitoramento, notificação e consultas do banco
+Roda contra o stub local da B365API e um SQLite temporário, guardando histórico em JSON
+"""
+
+import argparse
+import gc
+import itertools
+import json
+import logging
+import os
+import random
+import sqlite3
+import statistics
+import subprocess
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+from core.database import PreLiveDatabase
+from core.prelive_scanner import Opportunity, PreLiveScanner
+from core.rate_limiter import rate_limiter
+from replay.stub_server import FixtureStore, StubServer, SyntheticFixtures
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_HISTORY = "storage/benchmarks/history.json"
+
+# Regressão de p50 acima deste percentual é destacada no relatório
+REGRESSION_THRESHOLD = 0.20
+
+def _percentile(values: List[float], pct: float) -> float:
+    """Percentil por vizinho mais próximo (suficiente para poucas amostras)"""
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(pct * (len(ordered) - 1))))
+    return ordered[index]
+
+def measure(name: str, fn: Callable[[], object], iterations: int, items: int = 1,
+            setup: Callable[[], None] = None) -> Dict:
+    """
+    Mede latência (p50/p99), vazão (itens/s) e pico de memória de uma etapa
+    A memória é medida numa execução extra com tracemalloc para não distorcer os tempos
+    """
+    durations = []
+    for _ in range(iterations):
+        if setup:
+            setup()
+        gc.collect()
+        start = time.perf_counter()
+        fn()
+        durations.append(time.perf_counter() - start)
+
+    if setup:
+        setup()
+    tracemalloc.start()
+    fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    mean = statistics.mean(durations)
+    result = {
+        "stage": name,
+        "iterations": iterations,
+        "items": items,
+        "p50_ms": round(_percentile(durations, 0.50) * 1000, 3),
+        "p99_ms": round(_percentile(durations, 0.99) * 1000, 3),
+        "mean_ms": round(mean * 1000, 3),
+        "throughput_per_s": round(items / mean, 2) if mean else None,
+        "peak_memory_kb": round(peak / 1024, 1)
+    }
+    logger.info(f"{name}: p50 {result['p50_ms']}ms | p99 {result['p99_ms']}ms | "
+                f"{result['throughput_per_s']}/s | pico {result['peak_memory_kb']}KB")
+    return result
+
+def _make_opportunities(count: int, hours_ahead: float = 24) -> List[Opportunity]:
+    """Oportunidades sintéticas no formato gravado pelo scanner"""
+    start = (datetime.utcnow() + timedelta(hours=hours_ahead)).strftime("%Y-%m-%d %H:%M")
+    return [
+        Opportunity(
+            event_id=str(9000000 + i),
+            match=f"Player {2 * i} vs Player {2 * i + 1}",
+            start_utc=start,
+            league="ITF W35 Brasov",
+            side="HOME",
+            odd=4.50,
+            p_model=0.5,
+            ev=0.0,
+            p_market=0.5
+        )
+        for i in range(count)
+    ]
+
+def _fill_line_movements(db: PreLiveDatabase, rows: int, events: int, batch: int = 50000):
+    """Popula line_movements em lote (executemany) para os testes de consulta"""
+    rng = random.Random(7)
+    base = datetime.utcnow() - timedelta(days=30)
+    with sqlite3.connect(db.db_path) as conn:
+        for offset in range(0, rows, batch):
+            chunk = []
+            for i in range(offset, min(rows, offset + batch)):
+                ts = (base + timedelta(seconds=i * 5)).isoformat()
+                chunk.append((str(9000000 + i % events), round(rng.uniform(1.1, 7.0), 2),
+                              round(rng.uniform(1.1, 7.0), 2), ts, ts))
+            conn.executemany("""
+                INSERT INTO line_movements (event_id, home_od, away_od, timestamp, created_at)
+                VALUES (?, ?, ?, ?, ?)
+            """, chunk)
+        conn.commit()
+
+def bench_scan(stub: StubServer, n_events: int, iterations: int) -> Dict:
+    """scan_opportunities completo (descoberta + classificação + odds)"""
+    scanner = PreLiveScanner(api_token="bench", api_base=stub.url)
+    return measure(f"scan_opportunities[{n_events} eventos]",
+                   lambda: scanner.scan_opportunities(hours_ahead=72, odd_min=4.00, odd_max=6.00),
+                   iterations, items=n_events)
+
+def bench_monitor(service, n_events: int, iterations: int) -> Dict:
+    """Uma passada de _monitor_loop sobre N oportunidades ativas"""
+    service.db.save_opportunities(_make_opportunities(n_events))
+    try:
+        return measure(f"monitor_pass[{n_events} eventos]", service._monitor_pass,
+                       iterations, items=n_events)
+    finally:
+        with sqlite3.connect(service.db.db_path) as conn:
+            conn.execute("DELETE FROM opportunities")
+            conn.execute("DELETE FROM line_movements")
+
+def bench_notify(service, n_opportunities: int, iterations: int) -> Dict:
+    """_notify_best_opportunities com Telegram no stub (dedup zerado a cada iteração)"""
+    opportunities = _make_opportunities(n_opportunities)
+    return measure(f"notify[{n_opportunities} oportunidades]",
+                   lambda: service._notify_best_opportunities(opportunities),
+                   iterations, items=n_opportunities,
+                   setup=service.db.reset_sent_opportunities)
+
+def bench_database(workdir: Path, rows: int, events: int, iterations: int) -> List[Dict]:
+    """Consultas do PreLiveDatabase sobre uma tabela line_movements de N linhas"""
+    db = PreLiveDatabase(str(workdir / f"bench_{rows}.db"))
+    db.save_opportunities(_make_opportunities(min(events, 500)))
+    _fill_line_movements(db, rows, events)
+
+    rng = random.Random(11)
+    event_ids = [str(9000000 + rng.randrange(events)) for _ in range(iterations)]
+    label = f"{rows // 1000}k" if rows < 1_000_000 else f"{rows // 1_000_000}M"
+    ids = itertools.cycle(event_ids)
+
+    return [
+        measure(f"db.save_line_movement[{label}]",
+                lambda: db.save_line_movement(next(ids), 4.5, 1.2), iterations),
+        measure(f"db.get_line_movements[{label}]",
+                lambda: db.get_line_movements(next(ids)), iterations),
+        measure(f"db.calculate_clv[{label}]",
+                lambda: db.calculate_clv(next(ids), "HOME", 4.5), iterations),
+        measure(f"db.get_active_opportunities[{label}]",
+                db.get_active_opportunities, iterations),
+        measure(f"db.get_statistics[{label}]",
+                db.get_statistics, iterations),
+    ]
+
+def _make_service(workdir: Path, stub: StubServer):
+    """LineMonitoringService isolado num diretório temporário apontando para o stub"""
+    from services.monitoring_service import LineMonitoringService
+
+    config_path = workdir / "config.json"
+    with open(config_path, 'w') as f:
+        json.dump({
+            "api_key": "bench-token",
+            "api_base_url": stub.url,
+            "telegram_api_base": stub.url,
+            "telegram_token": "bench",
+            "chat_id": "1",
+            "monitor_request_delay": 0,
+            "notify_delay": 0
+        }, f)
+
+    return LineMonitoringService(config_path=str(config_path))
+
+def _git_revision() -> Optional[str]:
+    """Commit atual, para identificar cada execução no histórico"""
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"],
+                                       cwd=Path(__file__).resolve().parent,
+                                       stderr=subprocess.DEVNULL, text=True).strip()
+    except Exception:
+        return None
+
+def compare_with_previous(history: List[Dict], current: List[Dict]) -> List[str]:
+    """Lista etapas cujo p50 piorou além do limite em relação à execução anterior"""
+    if not history:
+        return []
+
+    previous = {r["stage"]: r for r in history[-1]["results"]}
+    regressions = []
+    for result in current:
+        before = previous.get(result["stage"])
+        if before and before["p50_ms"] and result["p50_ms"] > before["p50_ms"] * (1 + REGRESSION_THRESHOLD):
+            change = result["p50_ms"] / before["p50_ms"] - 1
+            regressions.append(f"{result['stage']}: p50 {before['p50_ms']}ms → {result['p50_ms']}ms (+{change:.0%})")
+    return regressions
+
+def run_suite(event_sizes: List[int], db_sizes: List[int], latency_ms: float,
+              history_path: str) -> Dict:
+    """Executa todas as etapas e grava o resultado no histórico"""
+    history_file = Path(history_path).resolve()
+    original_cwd = os.getcwd()
+    results: List[Dict] = []
+    
+    # O limite de taxa protege a cota da API real; contra o stub ele só mediria esperas
+    limiter_enabled, rate_limiter.enabled = rate_limiter.enabled, False
+
+    with tempfile.TemporaryDirectory(prefix="tennisq_bench_") as tmp:
+        workdir = Path(tmp)
+        # PreLiveDatabase e o contador usam caminhos relativos ao diretório atual
+        os.chdir(workdir)
+        try:
+            for n_events in event_sizes:
+                synthetic = SyntheticFixtures(n_events=n_events, per_page=max(50, n_events),
+                                              honor_limit=False)
+                stub = StubServer(fixtures=FixtureStore(str(workdir / "no_fixtures")),
+                                  synthetic=synthetic, latency_ms=latency_ms, seed=1).start()
+                try:
+                    iterations = 5 if n_events <= 100 else (3 if n_events <= 1000 else 1)
+                    results.append(bench_scan(stub, n_events, iterations))
+
+                    service = _make_service(workdir, stub)
+                    results.append(bench_monitor(service, n_events, iterations))
+                    results.append(bench_notify(service, min(n_events, 200), iterations))
+                finally:
+                    stub.stop()
+
+            for rows in db_sizes:
+                results.extend(bench_database(workdir, rows, events=max(1000, rows // 100),
+                                              iterations=200))
+        finally:
+            os.chdir(original_cwd)
+            rate_limiter.enabled = limiter_enabled
+
+    history: List[Dict] = []
+    if history_file.exists():
+        with open(history_file, 'r', encoding='utf-8') as f:
+            history = json.load(f)
+
+    regressions = compare_with_previous(history, results)
+
+    run = {
+        "timestamp": datetime.utcnow().isoformat(),
+        "revision": _git_revision(),
+        "latency_ms": latency_ms,
+        "results": results,
+        "regressions": regressions
+    }
+    history.append(run)
+
+    history_file.parent.mkdir(parents=True, exist_ok=True)
+    with open(history_file, 'w', encoding='utf-8') as f:
+        json.dump(history, f, indent=2, ensure_ascii=False)
+
+    return run
+
+def main():
+    """Linha de comando dos benchmarks"""
+    parser = argparse.ArgumentParser(description="Benchmarks dos caminhos críticos do TennisQ")
+    parser.add_argument("--events", nargs="+", type=int, default=[100, 1000, 10000])
+    parser.add_argument("--db-rows", nargs="+", type=int, default=[10_000, 1_000_000])
+    parser.add_argument("--latency-ms", type=float, default=0,
+                        help="Latência simulada por request no stub")
+    parser.add_argument("--history", default=DEFAULT_HISTORY)
+    parser.add_argument("--quick", action="store_true", help="Apenas 100 eventos e 10k linhas")
+    args = parser.parse_args()
+
+    # Os caminhos críticos logam por evento; o benchmark mede sem a saída de INFO
+    logging.basicConfig(level=logging.WARNING, format='%(message)s', force=True)
+    logger.setLevel(logging.INFO)
+
+    event_sizes = [100] if args.quick else args.events
+    db_sizes = [10_000] if args.quick else args.db_rows
+
+    run = run_suite(event_sizes, db_sizes, args.latency_ms, args.history)
+
+    print(f"\n=== BENCHMARK {run['timestamp']} ({run['revision']}) ===")
+    for result in run["results"]:
+        print(f"{result['stage']:<45} p50 {result['p50_ms']:>10}ms  p99 {result['p99_ms']:>10}ms  "
+              f"{result['throughput_per_s']:>10}/s  pico {result['peak_memory_kb']:>10}KB")
+
+    if run["regressions"]:
+        print("\n⚠️ REGRESSÕES (p50 > +20% vs execução anterior):")
+        for line in run["regressions"]:
+            print(f"   {line}")
+        raise SystemExit(1)
+
+if __name__ == "__main__":
+    main()
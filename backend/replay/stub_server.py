@@ -0,0 +1,398 @@
+"""
+Servidor local compatível com a B365API para replay offline
+Serve fixtures gravadas (ou sintéticas) com latência e falhas configuráveis
+"""
+
+import argparse
+import hashlib
+import json
+import logging
+import random
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Parâmetros que não fazem parte da chave da fixture
+IGNORED_PARAMS = {"token"}
+
+DEFAULT_FIXTURES_DIR = "storage/fixtures/b365"
+
+def fixture_key(path: str, params: Dict[str, str]) -> str:
+    """Chave canônica de uma requisição: caminho + parâmetros ordenados (sem token)"""
+    items = sorted((k, str(v)) for k, v in params.items() if k not in IGNORED_PARAMS)
+    return f"{path}?{urllib.parse.urlencode(items)}"
+
+class FixtureStore:
+    """Fixtures gravadas em arquivos .jsonl (uma resposta por linha)"""
+
+    def __init__(self, directory: str = DEFAULT_FIXTURES_DIR):
+        self.directory = Path(directory)
+        self.responses: Dict[str, Tuple[int, Dict]] = {}
+        self._lock = threading.Lock()
+        self.load()
+
+    def load(self):
+        """Carrega todas as fixtures do diretório"""
+        if not self.directory.exists():
+            return
+
+        for file in sorted(self.directory.glob("*.jsonl")):
+            with open(file, 'r', encoding='utf-8') as f:
+                for line in f:
+                    if not line.strip():
+                        continue
+                    record = json.loads(line)
+                    key = fixture_key(record["path"], record.get("params", {}))
+                    self.responses[key] = (record.get("status", 200), record["body"])
+
+        logger.info(f"{len(self.responses)} fixtures carregadas de {self.directory}")
+
+    def get(self, path: str, params: Dict[str, str]) -> Optional[Tuple[int, Dict]]:
+        """Busca a resposta gravada para a requisição"""
+        return self.responses.get(fixture_key(path, params))
+
+    def record(self, path: str, params: Dict[str, str], status: int, body: Dict,
+               filename: str = "recorded.jsonl"):
+        """Grava uma resposta real (sem o token) para replay posterior"""
+        clean_params = {k: v for k, v in params.items() if k not in IGNORED_PARAMS}
+        record = {"path": path, "params": clean_params, "status": status, "body": body}
+
+        with self._lock:
+            self.directory.mkdir(parents=True, exist_ok=True)
+            with open(self.directory / filename, 'a', encoding='utf-8') as f:
+                f.write(json.dumps(record, ensure_ascii=False) + "\n")
+            self.responses[fixture_key(path, params)] = (status, body)
+
+class SyntheticFixtures:
+    """Gera um calendário sintético de N jogos com odds, no formato da B365API"""
+
+    FEMALE_LEAGUES = ["ITF W35 Brasov", "ITF W50 Lima", "WTA Cluj", "ITF W15 Monastir", "WTA 125 Rome"]
+    MALE_LEAGUES = ["ATP Challenger Lima", "ITF M25 Monastir", "ATP Winston-Salem", "UTR Pro Tennis Series"]
+
+    def __init__(self, n_events: int = 100, female_ratio: float = 0.5,
+                 hours_ahead: int = 72, per_page: int = 50, honor_limit: bool = True,
+                 seed: int = 42):
+        self.per_page = per_page
+        self.honor_limit = honor_limit  # False = sempre responde per_page (ignora limit)
+        rng = random.Random(seed)
+        now = int(time.time())
+
+        self.events: List[Dict] = []
+        self.odds: Dict[str, Dict] = {}
+
+        for i in range(n_events):
+            event_id = str(9000000 + i)
+            female = rng.random() < female_ratio
+            league = rng.choice(self.FEMALE_LEAGUES if female else self.MALE_LEAGUES)
+            start = now + rng.randint(3600, hours_ahead * 3600)
+
+            self.events.append({
+                "id": event_id,
+                "sport_id": "13",
+                "time": str(start),
+                "time_status": "0",
+                "league": {"id": str(1000 + len(league)), "name": league},
+                "home": {"id": str(500000 + 2 * i), "name": f"Player {2 * i}"},
+                "away": {"id": str(500000 + 2 * i + 1), "name": f"Player {2 * i + 1}"},
+            })
+
+            favourite = round(rng.uniform(1.10, 1.90), 2)
+            underdog = round(rng.uniform(2.00, 7.00), 2)
+            home_od, away_od = (favourite, underdog) if rng.random() < 0.5 else (underdog, favourite)
+            self.odds[event_id] = {
+                "home_od": f"{home_od:.3f}",
+                "away_od": f"{away_od:.3f}",
+                "add_time": str(now)
+            }
+
+    def upcoming(self, params: Dict[str, str]) -> Dict:
+        """Simula /v3/events/upcoming com page, limit e day"""
+        events = self.events
+
+        day = params.get("day")
+        if day:
+            day = day.replace("-", "")
+            events = [
+                e for e in events
+                if datetime.utcfromtimestamp(int(e["time"])).strftime("%Y%m%d") == day
+            ]
+
+        # A API real ignora limit acima do per_page; mantém o mesmo comportamento
+        per_page = self.per_page
+        if self.honor_limit and params.get("limit"):
+            per_page = min(int(params["limit"]), self.per_page)
+        page = max(1, int(params.get("page", 1)))
+        start = (page - 1) * per_page
+
+        return {
+            "success": 1,
+            "pager": {"page": page, "per_page": per_page, "total": len(events)},
+            "results": events[start:start + per_page]
+        }
+
+    def event_odds(self, params: Dict[str, str]) -> Dict:
+        """Simula /v2/event/odds (mercado 13_1)"""
+        odds = self.odds.get(str(params.get("event_id", "")))
+        if not odds:
+            return {"success": 1, "results": {}}
+        return {"success": 1, "results": {"odds": {"13_1": [odds]}}}
+
+    def ended(self, params: Dict[str, str]) -> Dict:
+        """Simula /v3/events/ended marcando os jogos do dia como encerrados"""
+        data = self.upcoming({"page": params.get("page", 1), "day": params.get("day", "")})
+        data["results"] = [
+            dict(event, time_status="3", ss="2-0" if int(event["id"]) % 2 == 0 else "1-2")
+            for event in data["results"]
+        ]
+        return data
+
+    def player_stats(self, player_id: str) -> Dict:
+        """Simula /v2/tennis/player/<id>/stats (valores estáveis por jogador)"""
+        rng = random.Random(player_id)
+        return {"success": 1, "results": {
+            "id": player_id,
+            "aces_per_match": round(rng.uniform(1, 12), 1),
+            "first_serve_pct": round(rng.uniform(0.5, 0.75), 3),
+            "break_points_saved_pct": round(rng.uniform(0.4, 0.7), 3)
+        }}
+
+    def player_matches(self, player_id: str, params: Dict[str, str]) -> Dict:
+        """Simula /v2/tennis/player/<id>/matches com partidas dentro de `days`"""
+        rng = random.Random(player_id)
+        days = int(params.get("days", 30) or 30)
+        now = datetime.utcnow().timestamp()
+        matches = []
+        for _ in range(rng.randint(3, 15)):
+            played = datetime.utcfromtimestamp(now - rng.uniform(1, days) * 86400)
+            matches.append({
+                "date": played.replace(microsecond=0).isoformat(),
+                "surface": rng.choice(["hard", "clay", "grass", "indoor"]),
+                "result": "W" if rng.random() < 0.5 else "L",
+                "opponent_ranking": rng.randint(1, 400)
+            })
+        return {"success": 1, "results": sorted(matches, key=lambda m: m["date"], reverse=True)}
+
+    def head_to_head(self, player1_id: str, player2_id: str) -> Dict:
+        """Simula /v2/tennis/player/<id>/h2h/<id>"""
+        rng = random.Random(f"{player1_id}:{player2_id}")
+        return {"success": 1, "results": {"player1_wins": rng.randint(0, 4), "player2_wins": rng.randint(0, 4),
+                                          "matches": []}}
+
+    def handle(self, path: str, params: Dict[str, str]) -> Optional[Tuple[int, Dict]]:
+        """Roteia uma requisição para o gerador correspondente"""
+        if path in ("/v3/events/upcoming", "/v1/events/upcoming"):
+            return 200, self.upcoming(params)
+        if path == "/v1/events/inplay":
+            return 200, {"success": 1, "results": []}
+        if path == "/v2/event/odds":
+            return 200, self.event_odds(params)
+        if path == "/v3/events/ended":
+            return 200, self.ended(params)
+
+        parts = path.strip("/").split("/")  # v2/tennis/player/<id>/...
+        if parts[:3] == ["v2", "tennis", "player"] and len(parts) >= 5:
+            if parts[4] == "stats":
+                return 200, self.player_stats(parts[3])
+            if parts[4] == "matches":
+                return 200, self.player_matches(parts[3], params)
+            if parts[4] == "h2h" and len(parts) == 6:
+                return 200, self.head_to_head(parts[3], parts[5])
+        return None
+
+class StubServer:
+    """Servidor HTTP local que imita a B365API (e os métodos do bot do Telegram)"""
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0,
+                 fixtures: FixtureStore = None, synthetic: SyntheticFixtures = None,
+                 latency_ms: float = 0, jitter_ms: float = 0,
+                 error_rate: float = 0.0, error_status: int = 500,
+                 upstream: str = None, seed: int = None):
+        self.fixtures = fixtures or FixtureStore()
+        self.synthetic = synthetic
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.upstream = upstream  # Modo gravador: repassa para a API real e grava
+        self.rng = random.Random(seed)
+        self.request_count = 0
+        self.not_modified_count = 0  # Respostas 304 (If-None-Match igual ao ETag atual)
+        self._count_lock = threading.Lock()
+        
+        # Updates do bot entregues via getUpdates (long polling)
+        self.telegram_updates: List[Dict] = []
+        self._updates_cond = threading.Condition()
+
+        self.httpd = ThreadingHTTPServer((host, port), self._make_handler())
+        self.httpd.daemon_threads = True
+        self.thread = None
+
+    @property
+    def url(self) -> str:
+        """URL base para usar como api_base"""
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> "StubServer":
+        """Inicia o servidor em thread de background"""
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self.thread.start()
+        logger.info(f"Stub B365 ouvindo em {self.url}")
+        return self
+
+    def stop(self):
+        """Para o servidor"""
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def push_update(self, update: Dict):
+        """Enfileira um update do Telegram (ex: clique em botão) para o getUpdates"""
+        with self._updates_cond:
+            self.telegram_updates.append(update)
+            self._updates_cond.notify_all()
+    
+    def _get_updates(self, params: Dict[str, str]) -> Tuple[int, Dict]:
+        """Simula getUpdates com long polling (espera até timeout por updates >= offset)"""
+        offset = int(params.get("offset", 0) or 0)
+        limit = int(params.get("limit", 100) or 100)
+        timeout = float(params.get("timeout", 0) or 0)
+        
+        def pending():
+            return [u for u in self.telegram_updates if u["update_id"] >= offset][:limit]
+        
+        with self._updates_cond:
+            self._updates_cond.wait_for(lambda: pending(), timeout=timeout)
+            return 200, {"ok": True, "result": pending()}
+    
+    def resolve(self, path: str, params: Dict[str, str]) -> Tuple[int, Dict]:
+        """Decide a resposta: falha injetada, gravador, fixture ou sintético"""
+        with self._count_lock:
+            self.request_count += 1
+
+        delay = self.latency_ms + (self.rng.uniform(0, self.jitter_ms) if self.jitter_ms else 0)
+        if delay:
+            time.sleep(delay / 1000)
+
+        if self.error_rate and self.rng.random() < self.error_rate:
+            return self.error_status, {"success": 0, "error": "INJECTED_ERROR"}
+
+        if path.startswith("/bot"):
+            if path.endswith("/sendMessage"):
+                return 200, {"ok": True, "result": {"message_id": self.request_count}}
+            if path.endswith("/getUpdates"):
+                return self._get_updates(params)
+            return 200, {"ok": True, "result": True}  # answerCallbackQuery, setWebhook...
+
+        if self.upstream:
+            return self._record(path, params)
+
+        response = self.fixtures.get(path, params)
+        if response is None and self.synthetic:
+            response = self.synthetic.handle(path, params)
+        if response is None:
+            return 404, {"success": 0, "error": "FIXTURE_NOT_FOUND", "key": fixture_key(path, params)}
+        return response
+
+    def _record(self, path: str, params: Dict[str, str]) -> Tuple[int, Dict]:
+        """Repassa a requisição para a API real e grava a resposta"""
+        url = f"{self.upstream}{path}?{urllib.parse.urlencode(params)}"
+        try:
+            with urllib.request.urlopen(url, timeout=30) as response:
+                status, body = response.status, json.loads(response.read().decode('utf-8'))
+        except urllib.error.HTTPError as e:
+            status, body = e.code, {"success": 0, "error": str(e)}
+        except Exception as e:
+            return 502, {"success": 0, "error": f"UPSTREAM_ERROR: {e}"}
+
+        self.fixtures.record(path, params, status, body)
+        return status, body
+
+    def _make_handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def _respond(self):
+                parsed = urllib.parse.urlparse(self.path)
+                params = dict(urllib.parse.parse_qsl(parsed.query))
+
+                if self.command == "POST":
+                    length = int(self.headers.get("Content-Length", 0) or 0)
+                    params.update(urllib.parse.parse_qsl(self.rfile.read(length).decode('utf-8')))
+
+                status, body = server.resolve(parsed.path, params)
+                payload = json.dumps(body).encode('utf-8')
+
+                # ETag determinístico do corpo: permite testar revalidação condicional (304)
+                etag = f'"{hashlib.sha1(payload).hexdigest()[:16]}"'
+                if status == 200 and self.headers.get("If-None-Match") == etag:
+                    server.not_modified_count += 1
+                    self.send_response(304)
+                    self.send_header("ETag", etag)
+                    self.send_header("Content-Length", "0")
+                    self.end_headers()
+                    return
+
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                if status == 200:
+                    self.send_header("ETag", etag)
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def do_GET(self):
+                self._respond()
+
+            def do_POST(self):
+                self._respond()
+
+            def log_message(self, format, *args):
+                logger.debug("stub: " + format, *args)
+
+        return Handler
+
+def main():
+    """Linha de comando do servidor stub"""
+    parser = argparse.ArgumentParser(description="Stub local da B365API")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8365)
+    parser.add_argument("--fixtures", default=DEFAULT_FIXTURES_DIR)
+    parser.add_argument("--synthetic-events", type=int, default=0,
+                        help="Gera N jogos sintéticos quando não houver fixture")
+    parser.add_argument("--latency-ms", type=float, default=0)
+    parser.add_argument("--jitter-ms", type=float, default=0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--error-status", type=int, default=500)
+    parser.add_argument("--record", metavar="UPSTREAM", default=None,
+                        help="Modo gravador: repassa para a API real (ex: https://api.b365api.com)")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+
+    synthetic = SyntheticFixtures(n_events=args.synthetic_events) if args.synthetic_events else None
+    server = StubServer(
+        host=args.host, port=args.port,
+        fixtures=FixtureStore(args.fixtures), synthetic=synthetic,
+        latency_ms=args.latency_ms, jitter_ms=args.jitter_ms,
+        error_rate=args.error_rate, error_status=args.error_status,
+        upstream=args.record
+    )
+
+    print(f"Stub B365 em {server.url} (use como api_base_url)")
+    try:
+        server.httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.httpd.server_close()
+
+if __name__ == "__main__":
+    main()
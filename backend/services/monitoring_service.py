@@ -6,8 +6,8 @@ para acompanhar movimento de odds e atualizar oportunidades
 import time
 import json
 import logging
-from datetime import datetime, timedelta
-from typing import List, Dict
+from datetime import datetime, timedelta, timezone
+from typing import Callable, List, Dict, Optional, Tuple
 import threading
 from pathlib import Path
 
@@ -16,54 +16,108 @@ import os
 sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
 
 from core.prelive_scanner import PreLiveScanner
-from core.database import PreLiveDatabase
+from core.data_service import DataService, get_data_service
+from core.results_ingestion import ResultsIngestor
+from core.metrics import metrics
+from core.log_events import setup_logging
+from core.config import load_config
+from core.scheduler import RESCHEDULE, STOPPED, Wakeup, remaining_label
+from core.enrichment import OpportunityEnricher
+from core.maintenance import DataMaintenance
+from core.rate_limiter import rate_limiter
 
 logger = logging.getLogger(__name__)
 
-class LineMonitoringService:
-    def __init__(self, config_path: str = "backend/config/config.json"):
-        # Tentar carregar config de várias localizações
-        config_paths = [
-            config_path,
-            "../config/config.json", 
-            "config/config.json",
-            "backend/config/config.json"
-        ]
-        
-        config_loaded = False
-        for path in config_paths:
+# Parâmetros padrão do scan (jogos femininos, odds 4.00-6.00, próximas 72h)
+DEFAULT_SCAN_PARAMS = {"hours_ahead": 72, "odd_min": 4.00, "odd_max": 6.00}
+
+class _ScanFlight:
+    """Um scan em andamento (ou recém-concluído) compartilhado por quem pedir a mesma chave"""
+    
+    def __init__(self):
+        self.done = threading.Event()
+        self.opportunities: List = []
+        self.saved_count = 0
+        self.error: Optional[Exception] = None
+        self.finished_at = 0.0
+        self.listeners: List[Callable[[str, int, int], None]] = []
+    
+    def progress(self, stage: str, done: int, total: int):
+        for listener in list(self.listeners):
             try:
-                with open(path, 'r') as f:
-                    self.config = json.load(f)
-                logger.info(f"✅ Config carregada de: {path}")
-                config_loaded = True
-                break
-            except FileNotFoundError:
-                continue
-        
-        if not config_loaded:
-            # Usar variáveis de ambiente como fallback
-            logger.warning("⚠️ Config file não encontrado, usando variáveis de ambiente")
-            self.config = {
-                "api_key": os.environ.get("API_KEY", "226997-BVn3XP4cGLAUfL"),
-                "api_base_url": os.environ.get("API_BASE_URL", "https://api.b365api.com"),
-                "telegram_token": os.environ.get("TELEGRAM_TOKEN", ""),
-                "chat_id": os.environ.get("CHAT_ID", ""),
-                "channel_id": os.environ.get("CHANNEL_ID", "")
-            }
+                listener(stage, done, total)
+            except Exception:
+                pass
+
+class LineMonitoringService:
+    def __init__(self, config_path: str = "backend/config/config.json", db: DataService = None):
+        # config.json (várias localizações) ou variáveis de ambiente, lido uma vez por processo
+        self.config = load_config(config_path)
         
         logger.info(f"🔑 Usando API Key: {self.config['api_key'][:10]}...")
         
+        # Base da API do Telegram (configurável para apontar para o stub local)
+        self.telegram_api_base = self.config.get("telegram_api_base", "https://api.telegram.org")
+        
         self.scanner = PreLiveScanner(
             api_token=self.config["api_key"],
             api_base=self.config["api_base_url"]
         )
         
-        self.db = PreLiveDatabase()
+        # Camada de dados do processo (compartilhada com PreLiveManager e TennisQRailwayApp)
+        self.db = db or get_data_service()
+        
+        # Enriquecimento dos candidatos (stats, partidas e H2H) dentro de um orçamento por scan
+        self.enricher = None
+        if self.config.get("enrichment_enabled", True):
+            self.enricher = OpportunityEnricher.create(
+                api_token=self.config["api_key"],
+                api_base=self.config["api_base_url"],
+                max_workers=self.config.get("enrichment_workers", 8),
+                budget=self.config.get("enrichment_budget", 60)
+            )
+        
+        self.results_ingestor = ResultsIngestor(
+            db=self.db,
+            api_token=self.config["api_key"],
+            api_base=self.config["api_base_url"]
+        )
+        
+        # Manutenção do banco: expiração a cada scan, retenção/compactação/vacuum a cada maintenance_interval
+        self.maintenance = DataMaintenance(
+            self.db,
+            retention_days=self.config.get("retention_days", 7),
+            downsample_after_hours=self.config.get("downsample_after_hours", 24),
+            archive_after_days=self.config.get("archive_after_days", 7)
+        )
+        self.maintenance_interval = self.config.get("maintenance_interval", 6 * 3600)
+        self._last_maintenance = None
+        
         self.running = False
         self.scan_thread = None
         self.monitor_thread = None
         
+        # Pausas entre requests/mensagens (segundos) - zeradas nos benchmarks
+        self.monitor_request_delay = self.config.get("monitor_request_delay", 1)
+        self.notify_delay = self.config.get("notify_delay", 1)
+        
+        # Intervalos dos loops (segundos); o monitoramento também acorda antes do início dos jogos
+        self.scan_interval = self.config.get("scan_interval", 3600)
+        self.monitor_interval = self.config.get("monitor_interval", 30 * 60)
+        self.monitor_min_hours_ahead = 0.5  # Jogos a menos que isso do início saem do monitoramento
+        self.monitor_lead_seconds = self.config.get("monitor_lead_seconds", 60)
+        self._scan_wakeup = Wakeup("scan")
+        self._monitor_wakeup = Wakeup("monitor")
+        
+        # Odds lidas pelo monitoramento há menos que isso (segundos) dispensam nova consulta antes do envio
+        self.odds_cache_ttl = self.config.get("odds_cache_ttl", 60)
+        
+        # Single-flight dos scans: pedidos iguais esperam o scan em andamento e,
+        # por scan_result_ttl segundos após o término, reaproveitam o resultado
+        self.scan_result_ttl = self.config.get("scan_result_ttl", 300)
+        self._scan_flights: Dict[Tuple, _ScanFlight] = {}
+        self._scan_flights_lock = threading.Lock()
+        
         # Arquivo para manter contador contínuo de oportunidades
         self.counter_file = "storage/opportunity_counter.json"
         self._ensure_counter_file()
@@ -76,6 +130,9 @@ class LineMonitoringService:
             
         logger.info("🔄 LineMonitoringService: Iniciando serviço...")
         self.running = True
+        self._scan_wakeup.reset()
+        self._monitor_wakeup.reset()
+        rate_limiter.resume()
         
         # Thread para escanear novas oportunidades
         logger.info("🧵 LineMonitoringService: Criando thread de scan...")
@@ -91,12 +148,6 @@ class LineMonitoringService:
         
         logger.info("🎉 LineMonitoringService: Serviço de monitoramento completamente iniciado!")
     
-    def stop_service(self):
-        """Para o serviço de monitoramento"""
-        logger.info("⏹️ LineMonitoringService: Parando serviço...")
-        self.running = False
-        logger.info("✅ LineMonitoringService: Serviço de monitoramento parado")
-    
     def _ensure_counter_file(self):
         """Garante que o arquivo de contador existe"""
         try:
@@ -150,11 +201,22 @@ class LineMonitoringService:
             logger.warning(f"⚠️ Erro ao atualizar contador: {e}")
     
     def stop_service(self):
-        """Para o serviço de monitoramento"""
+        """Para o serviço de monitoramento (as threads acordam na hora)"""
         logger.info("⏹️ LineMonitoringService: Parando serviço...")
         self.running = False
+        self._scan_wakeup.stop()
+        self._monitor_wakeup.stop()
+        rate_limiter.interrupt()  # Chamadas esperando ficha (ou cota esgotada) desistem na hora
         logger.info("✅ LineMonitoringService: Serviço de monitoramento parado")
     
+    def request_scan(self, reason: str = "pedido"):
+        """Antecipa o próximo scan do loop"""
+        self._scan_wakeup.trigger(reason)
+    
+    def request_monitor(self, reason: str = "pedido"):
+        """Antecipa a próxima passada de monitoramento"""
+        self._monitor_wakeup.trigger(reason)
+    
     def _scan_loop(self):
         """Loop principal para escanear novas oportunidades"""
         while self.running:
@@ -165,82 +227,164 @@ class LineMonitoringService:
                 logger.info("🧹 Limpando oportunidades expiradas...")
                 self.db.cleanup_expired_sent_opportunities()
                 
+                # Ingestão incremental dos resultados de jogos encerrados
+                self._ingest_results()
+                
+                # Expiração das oportunidades iniciadas e, periodicamente, a manutenção completa
+                self._maintain()
+                
                 # Escaneia oportunidades SIMPLES - apenas odds 4.00-6.00 em jogos femininos
                 logger.info("📡 Fazendo scan SIMPLIFICADO da API...")
-                opportunities = self.scanner.scan_opportunities(
-                    hours_ahead=72,
-                    odd_min=4.00,  # Odds mínima 4.00
-                    odd_max=6.00   # Odds máxima 6.00
-                )
+                opportunities = self.run_scan()
                 
                 logger.info(f"📊 Encontradas {len(opportunities) if opportunities else 0} oportunidades")
                 
                 if opportunities:
-                    # Salva no banco
-                    saved_count = self.db.save_opportunities(opportunities)
-                    logger.info(f"💾 Salvas {saved_count} novas oportunidades")
-                    
                     # Envia notificação de TODAS as oportunidades
                     self._notify_best_opportunities(opportunities)
                 else:
                     logger.info("📭 Nenhuma oportunidade encontrada neste scan")
                 
-                # Aguarda 3 horas com logs intermediários
-                logger.info("😴 Aguardando 3 horas até próximo scan...")
-                self._sleep_with_heartbeat(1 * 3600, "⏰ Próximo scan em")  # 1 hora
+                # Aguarda o próximo scan (ou um pedido de scan) com logs intermediários
+                logger.info(f"😴 Aguardando {remaining_label(self.scan_interval)} até próximo scan...")
+                reason = self._scan_wakeup.wait(self.scan_interval, **self._heartbeat("⏰ Próximo scan em", self.scan_interval))
+                if reason not in (None, STOPPED):
+                    logger.info(f"⚡ Scan antecipado: {reason}")
                 
             except Exception as e:
                 logger.error(f"❌ Erro no loop de escaneamento: {e}")
                 import traceback
                 logger.error(f"Stack trace: {traceback.format_exc()}")
-                self._sleep_with_interrupt(300)  # 5 minutos em caso de erro
+                self._scan_wakeup.wait(300)  # 5 minutos em caso de erro
+    
+    def _ingest_results(self):
+        """Atualiza match_results sem interromper o scan em caso de falha"""
+        try:
+            logger.info("🏁 Ingerindo resultados de jogos encerrados...")
+            self.results_ingestor.ingest()
+        except Exception as e:
+            logger.warning(f"⚠️ Erro na ingestão de resultados: {e}")
+    
+    def _maintain(self):
+        """Manutenção do banco sem interromper o scan em caso de falha"""
+        try:
+            if self._last_maintenance is None or time.monotonic() - self._last_maintenance >= self.maintenance_interval:
+                self.cleanup_expired_opportunities()
+                self._last_maintenance = time.monotonic()
+            else:
+                self.maintenance.expire_opportunities()
+        except Exception as e:
+            logger.warning(f"⚠️ Erro na manutenção do banco: {e}")
     
     def _monitor_loop(self):
         """Loop para monitorar movimento de linha das oportunidades ativas"""
         while self.running:
             try:
-                logger.info("📈 Monitorando movimento de linha...")
-                
-                # Busca oportunidades ativas
-                active_opps = self.db.get_active_opportunities(min_hours_ahead=0.5)
+                self._monitor_pass()
+                last_pass = time.monotonic()
                 
-                events_to_monitor = set()
-                for opp in active_opps:
-                    events_to_monitor.add(opp["event_id"])
-                
-                logger.info(f"🎯 Monitorando {len(events_to_monitor)} eventos")
-                
-                # Monitora cada evento
-                monitored_count = 0
-                for event_id in events_to_monitor:
-                    try:
-                        odds_data = self.scanner.get_event_odds(event_id)
-                        if odds_data:
-                            # Salva movimento de linha
-                            self.db.save_line_movement(
-                                event_id=event_id,
-                                home_od=odds_data.home_od,
-                                away_od=odds_data.away_od,
-                                timestamp=odds_data.timestamp
-                            )
-                            monitored_count += 1
-                        
-                        # Pausa pequena entre requests
-                        time.sleep(1)
-                        
-                    except Exception as e:
-                        logger.warning(f"⚠️ Erro ao monitorar evento {event_id}: {e}")
-                
-                logger.info(f"✅ Monitoramento concluído: {monitored_count}/{len(events_to_monitor)} eventos atualizados")
-                
-                # Aguarda 30 minutos com logs intermediários
-                self._sleep_with_heartbeat(30 * 60, "📊 Próximo monitoramento em")  # 30 minutos
+                # Dorme até o próximo prazo; novas oportunidades só recalculam o prazo
+                while self.running:
+                    deadline = self._next_monitor_deadline(last_pass)
+                    wait = max(0, deadline - time.monotonic())
+                    reason = self._monitor_wakeup.wait_until(
+                        deadline, **self._heartbeat("📊 Próximo monitoramento em", wait))
+                    if reason != RESCHEDULE:
+                        if reason not in (None, STOPPED):
+                            logger.info(f"⚡ Monitoramento antecipado: {reason}")
+                        break
                 
             except Exception as e:
                 logger.error(f"❌ Erro no loop de monitoramento: {e}")
                 import traceback
                 logger.error(f"Stack trace: {traceback.format_exc()}")
-                self._sleep_with_interrupt(300)  # 5 minutos em caso de erro
+                self._monitor_wakeup.wait(300)  # 5 minutos em caso de erro
+    
+    def _next_monitor_deadline(self, last_pass: float) -> float:
+        """
+        Próxima passada (time.monotonic()): monitor_interval após a última ou, se antes,
+        logo antes de um jogo ativo sair da janela monitorada (última leitura de linha)
+        """
+        deadline = last_pass + self.monitor_interval
+        now_mono = time.monotonic()
+        now = datetime.now(timezone.utc)
+        
+        for opp in self.db.get_active_opportunities(min_hours_ahead=self.monitor_min_hours_ahead):
+            try:
+                start = datetime.fromisoformat(opp["start_utc"].replace('Z', '+00:00'))
+            except (KeyError, ValueError):
+                continue
+            if start.tzinfo is None:
+                start = start.replace(tzinfo=timezone.utc)
+            
+            last_call = start - timedelta(hours=self.monitor_min_hours_ahead, seconds=self.monitor_lead_seconds)
+            seconds = (last_call - now).total_seconds()
+            if seconds > 0:
+                deadline = min(deadline, now_mono + seconds)
+        
+        return deadline
+    
+    @staticmethod
+    def _heartbeat(message_prefix: str, seconds: float) -> Dict:
+        """Argumentos de heartbeat para Wakeup.wait: um log a cada 30 min ou 1/4 da espera"""
+        def beat(remaining: float):
+            logger.info(f"💓 {message_prefix} {remaining_label(remaining)}")
+        return {"heartbeat": beat, "heartbeat_interval": min(1800, seconds // 4)}
+    
+    def _monitor_pass(self) -> int:
+        """Executa uma passada de monitoramento de linha e retorna eventos atualizados"""
+        with metrics.timer("monitor_pass"):
+            return self._monitor_events()
+    
+    def _monitor_events(self) -> int:
+        """Atualiza o movimento de linha de cada evento ativo"""
+        logger.info("📈 Monitorando movimento de linha...")
+        
+        # Busca oportunidades ativas
+        active_opps = self.db.get_active_opportunities(min_hours_ahead=0.5)
+        
+        events_to_monitor = set()
+        for opp in active_opps:
+            events_to_monitor.add(opp["event_id"])
+        
+        logger.info(f"🎯 Monitorando {len(events_to_monitor)} eventos")
+        
+        # Monitora cada evento
+        monitored_count = 0
+        for i, event_id in enumerate(events_to_monitor, 1):
+            metrics.set_queue_depth("monitor_events", len(events_to_monitor) - i)
+            try:
+                odds_data = self.scanner.get_event_odds(event_id)
+                if odds_data:
+                    # Salva movimento de linha
+                    self.db.save_line_movement(
+                        event_id=event_id,
+                        home_od=odds_data.home_od,
+                        away_od=odds_data.away_od,
+                        timestamp=odds_data.timestamp
+                    )
+                    monitored_count += 1
+                
+                # Pausa pequena entre requests (interrompida na parada)
+                if self.monitor_request_delay and self._monitor_wakeup.pause(self.monitor_request_delay):
+                    break
+                
+            except Exception as e:
+                logger.warning(f"⚠️ Erro ao monitorar evento {event_id}: {e}")
+        
+        logger.info(f"✅ Monitoramento concluído: {monitored_count}/{len(events_to_monitor)} eventos atualizados")
+        return monitored_count
+    
+    def _current_odds(self, event_id: str):
+        """Odds atuais do evento: cache da camada de dados se recente, senão a API"""
+        cached = self.db.get_latest_odds(event_id, max_age=self.odds_cache_ttl)
+        if cached:
+            return cached
+        
+        odds = self.scanner.get_event_odds(event_id)
+        if odds:
+            self.db.remember_odds(event_id, odds.home_od, odds.away_od, odds.timestamp)
+        return odds
     
     def _notify_best_opportunities(self, opportunities: List):
         """Envia notificação das melhores oportunidades via Telegram - cada jogo separadamente"""
@@ -265,7 +409,7 @@ class LineMonitoringService:
                 except Exception as e:
                     logger.info(f"✅ Oportunidade aceita: {opp.match} (erro ao calcular tempo)")
             else:
-                logger.info(f"Oportunidade já enviada: {opp.match} - {opp.side}")
+                logger.debug("Oportunidade já enviada: %s - %s", opp.match, opp.side)
         
         if not new_opportunities:
             logger.info("Todas as oportunidades já foram enviadas anteriormente")
@@ -277,9 +421,10 @@ class LineMonitoringService:
             
             # Envia cada oportunidade como mensagem separada com numeração contínua
             for i, opp in enumerate(new_opportunities):
+                metrics.set_queue_depth("notify", len(new_opportunities) - i - 1)
                 opportunity_number = starting_counter + i + 1
                 # ⚠️ VALIDAÇÃO DE ODDS ANTES DE ENVIAR
-                current_odds = self.scanner.get_event_odds(opp.event_id)
+                current_odds = self._current_odds(opp.event_id)
                 if current_odds:
                     # Verifica se as odds mudaram significativamente (>10%)
                     odds_changed = False
@@ -294,7 +439,6 @@ class LineMonitoringService:
                 target_player = home_player if opp.side == "HOME" else away_player
                 
                 # Extrai data e hora do start_utc e converte para timezone brasileiro
-                from datetime import datetime, timezone, timedelta
                 start_dt = datetime.fromisoformat(opp.start_utc.replace('Z', '+00:00'))
                 
                 # Converte para horário brasileiro (UTC-3)
@@ -322,9 +466,9 @@ class LineMonitoringService:
                 # Marca como enviada para evitar duplicatas
                 self.db.mark_opportunity_as_sent(opp)
                 
-                # Pequena pausa entre mensagens para não spammar
-                import time
-                time.sleep(1)
+                # Pequena pausa entre mensagens para não spammar (encerrada na parada)
+                if self.notify_delay:
+                    self._scan_wakeup.pause(self.notify_delay)
                 
             # Atualiza o contador após enviar todas as oportunidades
             self._update_counter_batch(len(new_opportunities))
@@ -341,7 +485,7 @@ class LineMonitoringService:
         try:
             import requests
             
-            url = f"https://api.telegram.org/bot{self.config['telegram_token']}/sendMessage"
+            url = f"{self.telegram_api_base}/bot{self.config['telegram_token']}/sendMessage"
             
             # Usa o canal em vez do chat privado para oportunidades
             target_chat = self.config.get("channel_id") or self.config.get("chat_id")
@@ -351,7 +495,13 @@ class LineMonitoringService:
                 "text": message
             }
             
-            response = requests.post(url, data=data, timeout=10)
+            with metrics.timer("telegram_send"):
+                try:
+                    response = requests.post(url, data=data, timeout=10)
+                except Exception:
+                    metrics.record_api_call("telegram/sendMessage", None)
+                    raise
+            metrics.record_api_call("telegram/sendMessage", response.status_code)
             response.raise_for_status()
             
             logger.info(f"Notificação enviada via Telegram para {target_chat}")
@@ -382,41 +532,6 @@ class LineMonitoringService:
         except Exception as e:
             logger.error(f"Erro ao enviar notificação de início: {e}")
     
-    def _sleep_with_interrupt(self, seconds: int):
-        """Dorme por X segundos, mas pode ser interrompido"""
-        end_time = time.time() + seconds
-        while time.time() < end_time and self.running:
-            time.sleep(min(10, end_time - time.time()))
-    
-    def _sleep_with_heartbeat(self, seconds: int, message_prefix: str):
-        """Dorme por X segundos com logs de heartbeat regulares"""
-        start_time = time.time()
-        end_time = start_time + seconds
-        
-        # Log a cada 30 minutos durante sleeps longos
-        heartbeat_interval = min(1800, seconds // 4)  # 30 min ou 1/4 do tempo total
-        last_heartbeat = start_time
-        
-        while time.time() < end_time and self.running:
-            current_time = time.time()
-            
-            # Log de heartbeat
-            if current_time - last_heartbeat >= heartbeat_interval:
-                remaining = int(end_time - current_time)
-                hours = remaining // 3600
-                minutes = (remaining % 3600) // 60
-                
-                if hours > 0:
-                    time_str = f"{hours}h {minutes}m"
-                else:
-                    time_str = f"{minutes}m"
-                    
-                logger.info(f"💓 {message_prefix} {time_str}")
-                last_heartbeat = current_time
-            
-            # Sleep em chunks pequenos para permitir interrupção
-            time.sleep(min(10, end_time - current_time))
-    
     def get_service_status(self) -> Dict:
         """Retorna status do serviço"""
         return {
@@ -426,45 +541,91 @@ class LineMonitoringService:
             "database_stats": self.db.get_statistics()
         }
     
-    def force_scan(self) -> List:
+    def force_scan(self, progress: Callable[[str, int, int], None] = None, force: bool = False) -> List:
         """Força um escaneamento imediato"""
         logger.info("Executando escaneamento forçado...")
-        
-        opportunities = self.scanner.scan_opportunities(
-            hours_ahead=72,
-            odd_min=4.00,
-            odd_max=6.00
-        )
-        
-        if opportunities:
-            self.db.save_opportunities(opportunities)
-            
-        return opportunities
+        return self.run_scan(progress=progress, force=force)
     
-    def cleanup_expired_opportunities(self):
-        """Limpa oportunidades expiradas"""
-        logger.info("Limpando oportunidades expiradas...")
+    def run_scan(self, progress: Callable[[str, int, int], None] = None, force: bool = False, **params) -> List:
+        """
+        Executa scan + gravação com single-flight por parâmetros
+        Se o mesmo scan já está rodando, espera e compartilha o resultado;
+        se terminou há menos de scan_result_ttl segundos, reaproveita sem chamar a API
+        force=True sempre executa um scan novo (ex: profiling), que passa a ser o compartilhado
+        """
+        params = dict(DEFAULT_SCAN_PARAMS, **params)
+        key = tuple(sorted(params.items()))
         
-        # Marca como expiradas as oportunidades de jogos que já começaram
-        active_opps = self.db.get_active_opportunities(min_hours_ahead=-1)
-        now = datetime.utcnow()
+        with self._scan_flights_lock:
+            flight = None if force else self._scan_flights.get(key)
+            fresh = (flight is not None and flight.done.is_set() and flight.error is None
+                     and time.monotonic() - flight.finished_at < self.scan_result_ttl)
+            
+            if flight is not None and not flight.done.is_set():
+                leader = False
+                if progress:
+                    flight.listeners.append(progress)
+            elif fresh:
+                metrics.record_cache("scan_result", True)
+                logger.info(f"♻️ Reaproveitando scan concluído há {time.monotonic() - flight.finished_at:.0f}s")
+                return list(flight.opportunities)
+            else:
+                metrics.record_cache("scan_result", False)
+                flight = _ScanFlight()
+                if progress:
+                    flight.listeners.append(progress)
+                self._scan_flights[key] = flight
+                leader = True
         
-        for opp in active_opps:
-            start_time = datetime.fromisoformat(opp["start_utc"].replace('Z', '+00:00'))
-            if start_time <= now:
-                self.db.mark_opportunity_expired(opp["event_id"])
+        if not leader:
+            logger.info("⏳ Scan idêntico em andamento - aguardando o resultado compartilhado")
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return list(flight.opportunities)
         
-        # Remove dados antigos
-        self.db.cleanup_old_data(days_old=7)
+        try:
+            with metrics.timer("scan"):
+                flight.opportunities = self.scanner.scan_opportunities(progress=flight.progress, **params) or []
+            self._enrich(flight.opportunities, flight.progress)
+            if flight.opportunities:
+                # Gravação dentro do voo: um único save por scan, sem corrida entre chamadores
+                flight.saved_count = self.db.save_opportunities(flight.opportunities)
+                logger.info(f"💾 Salvas {flight.saved_count} novas oportunidades")
+                if flight.saved_count:
+                    # Jogos novos podem começar antes da próxima passada agendada
+                    self._monitor_wakeup.trigger(RESCHEDULE)
+        except Exception as e:
+            flight.error = e
+            raise
+        finally:
+            flight.finished_at = time.monotonic()
+            flight.done.set()
         
+        return list(flight.opportunities)
+    
+    def _enrich(self, opportunities: List, progress: Callable[[str, int, int], None] = None):
+        """Enriquece os candidatos sem deixar uma falha derrubar o scan"""
+        if not self.enricher or not opportunities:
+            return
+        try:
+            self.enricher.enrich(opportunities, progress=progress)
+        except Exception as e:
+            logger.warning(f"⚠️ Erro no enriquecimento das oportunidades: {e}")
+    
+    def cleanup_expired_opportunities(self) -> Dict:
+        """Limpa oportunidades expiradas e roda a manutenção completa do banco"""
+        logger.info("Limpando oportunidades expiradas...")
+        report = self.maintenance.run()
         logger.info("Limpeza concluída")
+        return report
 
 class PreLiveManager:
     """Classe principal para gerenciar o sistema pré-live"""
     
-    def __init__(self, config_path: str = "../config/config.json"):
-        self.monitoring_service = LineMonitoringService(config_path)
-        self.db = PreLiveDatabase()
+    def __init__(self, config_path: str = "../config/config.json", db: DataService = None):
+        self.db = db or get_data_service()
+        self.monitoring_service = LineMonitoringService(config_path, db=self.db)
     
     def start(self):
         """Inicia todo o sistema"""
@@ -490,29 +651,25 @@ class PreLiveManager:
         """Retorna dados para o dashboard"""
         return {
             "service_status": self.monitoring_service.get_service_status(),
-            "active_opportunities": self.db.get_active_opportunities()[:20],
+            "active_opportunities": self.db.query_opportunities(limit=20)[0],
             "statistics": self.db.get_statistics()
         }
     
-    def manual_scan(self) -> List:
+    def manual_scan(self, progress: Callable[[str, int, int], None] = None, force: bool = False) -> List:
         """Executa escaneamento manual"""
-        return self.monitoring_service.force_scan()
+        return self.monitoring_service.force_scan(progress=progress, force=force)
 
 def main():
     """Função principal para executar o serviço"""
-    logging.basicConfig(
-        level=logging.INFO,
-        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-    )
+    setup_logging()
     
     manager = PreLiveManager()
     
     try:
         manager.start()
         
-        # Mantém o serviço rodando
-        while True:
-            time.sleep(60)
+        # Mantém o serviço rodando até Ctrl+C (sem acordar periodicamente)
+        threading.Event().wait()
             
     except KeyboardInterrupt:
         logger.info("Interrompido pelo usuário")
@@ -0,0 +1,174 @@
+"""
+Jobs de scan manual em background
+POST /manual-scan cria (ou reaproveita) um job; GET consulta progresso e resultado
+Os jobs ficam no SQLite: qualquer worker HTTP enfileira/consulta e só o processo do scheduler executa
+"""
+
+import logging
+import threading
+import time
+import uuid
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Estados de um job
+QUEUED = "queued"
+RUNNING = "running"
+COMPLETED = "completed"
+FAILED = "failed"
+
+# Quantidade de jobs finalizados mantidos para consulta
+MAX_FINISHED_JOBS = 20
+
+@dataclass
+class ScanJob:
+    """Um scan manual e seu progresso"""
+    job_id: str
+    status: str = QUEUED
+    created_at: str = field(default_factory=lambda: datetime.utcnow().isoformat())
+    started_at: Optional[str] = None
+    finished_at: Optional[str] = None
+    stage: str = ""
+    done: int = 0
+    total: int = 0
+    requests: int = 1  # Quantas requisições foram agrupadas neste job
+    opportunities: List[Dict] = field(default_factory=list)
+    error: Optional[str] = None
+
+    @property
+    def active(self) -> bool:
+        return self.status in (QUEUED, RUNNING)
+
+    def to_dict(self) -> Dict:
+        return {
+            "job_id": self.job_id,
+            "status": self.status,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "progress": {"stage": self.stage, "done": self.done, "total": self.total},
+            "requests": self.requests,
+            "opportunities_found": len(self.opportunities),
+            "opportunities": self.opportunities,
+            "error": self.error
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> "ScanJob":
+        progress = data.get("progress") or {}
+        return cls(
+            job_id=data["job_id"],
+            status=data.get("status", QUEUED),
+            created_at=data.get("created_at") or datetime.utcnow().isoformat(),
+            started_at=data.get("started_at"),
+            finished_at=data.get("finished_at"),
+            stage=progress.get("stage", ""),
+            done=progress.get("done", 0),
+            total=progress.get("total", 0),
+            requests=data.get("requests", 1),
+            opportunities=data.get("opportunities") or [],
+            error=data.get("error")
+        )
+
+class ScanJobManager:
+    """
+    Fila de scans manuais no SQLite, agrupando pedidos simultâneos num único job
+    submit/get funcionam em qualquer processo; start_executor só no processo do scheduler
+    """
+
+    def __init__(self, db, poll_interval: float = 2.0, progress_interval: float = 1.0):
+        self.db = db
+        self.poll_interval = poll_interval  # Busca jobs enfileirados por outros workers
+        self.progress_interval = progress_interval  # Intervalo mínimo entre gravações de progresso
+        self.runner: Optional[Callable[[Callable[[str, int, int], None]], List]] = None
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def submit(self) -> Tuple[ScanJob, bool]:
+        """Inicia um scan ou junta-se ao que está em andamento; retorna (job, criado)"""
+        job = ScanJob(job_id=uuid.uuid4().hex[:12])
+        data, created = self.db.enqueue_scan_job(job.to_dict(), keep_finished=MAX_FINISHED_JOBS)
+        job = ScanJob.from_dict(data)
+
+        if created:
+            logger.info(f"🚀 Scan manual enfileirado: job {job.job_id}")
+            self._wake.set()
+        else:
+            logger.info(f"🔁 Scan manual agrupado ao job {job.job_id} ({job.requests} pedidos)")
+        return job, created
+
+    def get(self, job_id: str) -> Optional[ScanJob]:
+        data = self.db.get_scan_job(job_id)
+        return ScanJob.from_dict(data) if data else None
+
+    def latest(self) -> Optional[ScanJob]:
+        data = self.db.get_scan_job()
+        return ScanJob.from_dict(data) if data else None
+
+    def start_executor(self, runner: Callable[[Callable[[str, int, int], None]], List]):
+        """Passa a executar os jobs enfileirados (runner(progress) -> lista de Opportunity)"""
+        self.runner = runner
+        interrupted = self.db.fail_running_scan_jobs("Interrompido por reinício do processo")
+        if interrupted:
+            logger.warning(f"⚠️ {interrupted} job(s) de scan interrompidos marcados como falhos")
+
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._executor_loop, name="scan-jobs", daemon=True)
+        self._thread.start()
+
+    def stop_executor(self):
+        self._stop.set()
+        self._wake.set()
+
+    def _executor_loop(self):
+        while not self._stop.is_set():
+            self._wake.wait(self.poll_interval)
+            self._wake.clear()
+            try:
+                while not self._stop.is_set():
+                    data = self.db.claim_scan_job()
+                    if not data:
+                        break
+                    self._run(ScanJob.from_dict(data))
+            except Exception as e:
+                logger.error(f"❌ Erro na fila de scans manuais: {e}")
+
+    def _run(self, job: ScanJob):
+        logger.info(f"🔍 Executando job de scan {job.job_id}")
+        last_write = 0.0
+
+        def progress(stage: str, done: int, total: int):
+            nonlocal last_write
+            job.stage, job.done, job.total = stage, done, total
+            now = time.monotonic()
+            if now - last_write >= self.progress_interval or done == total:
+                last_write = now
+                self.db.save_scan_job(job.to_dict())
+
+        try:
+            opportunities = self.runner(progress) or []
+            job.opportunities = [
+                {
+                    "event_id": opp.event_id,
+                    "match": opp.match,
+                    "side": opp.side,
+                    "odd": opp.odd,
+                    "ev": opp.ev,
+                    "league": opp.league,
+                    "start_utc": opp.start_utc,
+                    "enrichment": getattr(opp, "enrichment", None)
+                } for opp in opportunities
+            ]
+            job.status = COMPLETED
+            logger.info(f"✅ Job {job.job_id} concluído: {len(job.opportunities)} oportunidades")
+        except Exception as e:
+            job.error = str(e)
+            job.status = FAILED
+            logger.error(f"❌ Job {job.job_id} falhou: {e}")
+
+        job.finished_at = datetime.utcnow().isoformat()
+        self.db.save_scan_job(job.to_dict())
@@ -4,19 +4,59 @@ sys.path.append('backend')
 
 import json
 import logging
+import queue
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
 from flask import Flask, request
 import threading
 import time
 
+import requests
+from requests.adapters import HTTPAdapter
+
+from core.data_service import get_data_service
+
 logger = logging.getLogger(__name__)
 
 class TelegramBotHandler:
     """Handler para processar callbacks do bot Telegram"""
     
-    def __init__(self, config):
+    def __init__(self, config, db=None, polling: bool = False):
         self.config = config
+        self.db = db or get_data_service()
         self.app = Flask(__name__)
+        self.telegram_api_base = config.get("telegram_api_base", "https://api.telegram.org")
+        
+        # Updates são confirmados na hora e processados por um pool de workers (fila limitada)
+        self.worker_count = config.get("webhook_workers", 4)
+        self.update_queue = queue.Queue(maxsize=config.get("webhook_queue_size", 1000))
+        self.workers = []
+        
+        # Cliente HTTP com pool de conexões para as respostas ao Telegram
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.worker_count + 1)  # +1: long polling
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        
+        # update_ids recentes (LRU) para ignorar reentregas do Telegram; a tabela telegram_updates
+        # cobre as reentregas que caem em outro worker do gunicorn
+        self.dedup_size = config.get("webhook_dedup_size", 10000)
+        self._seen_updates = OrderedDict()
+        self._seen_lock = threading.Lock()
+        self._claims_since_cleanup = 0
+        
+        # Long polling (getUpdates): alternativa ao webhook sem URL pública
+        self.polling_batch_size = config.get("polling_batch_size", 100)
+        self.polling_timeout = config.get("polling_timeout", 50)
+        self.offset_file = Path(config.get("polling_offset_file", "storage/telegram_offset.json"))
+        self._polling_stop = threading.Event()
+        self.polling_thread = None
+        
         self.setup_routes()
+        if not polling:
+            # Os workers só consomem a fila do webhook; o long polling usa o próprio pool
+            self.start_workers()
     
     def setup_routes(self):
         """Configura as rotas do webhook"""
@@ -27,8 +67,9 @@ class TelegramBotHandler:
             try:
                 update = request.get_json()
                 
-                if 'callback_query' in update:
-                    self.handle_callback_query(update['callback_query'])
+                if not self.enqueue_update(update):
+                    # Fila cheia: Telegram reenvia depois (o update_id não foi marcado como visto)
+                    return 'Busy', 503
                 
                 return 'OK', 200
                 
@@ -36,6 +77,55 @@ class TelegramBotHandler:
                 logger.error(f"Erro no webhook: {e}")
                 return 'Error', 500
     
+    def enqueue_update(self, update) -> bool:
+        """Coloca o update na fila (ignorando reentregas); False se a fila estiver cheia"""
+        update_id = update.get('update_id')
+        
+        if self._mark_seen(update_id):
+            logger.debug("Update %s repetido - ignorado", update_id)
+            return True
+        
+        try:
+            self.update_queue.put_nowait(update)
+        except queue.Full:
+            # Desmarca para a reentrega do Telegram ser aceita
+            self._forget(update_id)
+            logger.warning(f"⚠️ Fila de updates cheia ({self.update_queue.maxsize}) - pedindo reenvio")
+            return False
+        return True
+    
+    def start_workers(self):
+        """Inicia as threads que processam a fila de updates"""
+        for i in range(self.worker_count):
+            worker = threading.Thread(target=self._worker_loop, name=f"telegram-update-{i}", daemon=True)
+            worker.start()
+            self.workers.append(worker)
+    
+    def stop_workers(self, timeout: float = 10):
+        """Processa o que já está na fila e encerra os workers"""
+        for _ in self.workers:
+            self.update_queue.put(None)
+        for worker in self.workers:
+            worker.join(timeout)
+        self.workers = []
+    
+    def _worker_loop(self):
+        while True:
+            update = self.update_queue.get()
+            try:
+                if update is None:
+                    return
+                self.process_update(update)
+            except Exception as e:
+                logger.error(f"Erro ao processar update: {e}")
+            finally:
+                self.update_queue.task_done()
+    
+    def process_update(self, update):
+        """Despacha um update do Telegram"""
+        if 'callback_query' in update:
+            self.handle_callback_query(update['callback_query'])
+    
     def handle_callback_query(self, callback_query):
         """Processa clique nos botões inline"""
         try:
@@ -69,9 +159,7 @@ class TelegramBotHandler:
     def send_quick_feedback(self, chat_id, text):
         """Envia feedback rápido que desaparece"""
         try:
-            import requests
-            
-            url = f"https://api.telegram.org/bot{self.config['telegram_token']}/sendMessage"
+            url = f"{self.telegram_api_base}/bot{self.config['telegram_token']}/sendMessage"
             
             data = {
                 "chat_id": chat_id,
@@ -79,7 +167,7 @@ class TelegramBotHandler:
                 "parse_mode": "Markdown"
             }
             
-            response = requests.post(url, data=data, timeout=5)
+            response = self.session.post(url, data=data, timeout=5)
             response.raise_for_status()
             
         except Exception as e:
@@ -88,9 +176,7 @@ class TelegramBotHandler:
     def answer_callback_query(self, callback_query_id, text, show_alert=False):
         """Responde ao callback query"""
         try:
-            import requests
-            
-            url = f"https://api.telegram.org/bot{self.config['telegram_token']}/answerCallbackQuery"
+            url = f"{self.telegram_api_base}/bot{self.config['telegram_token']}/answerCallbackQuery"
             
             data = {
                 "callback_query_id": callback_query_id,
@@ -98,7 +184,7 @@ class TelegramBotHandler:
                 "show_alert": show_alert
             }
             
-            response = requests.post(url, data=data, timeout=5)
+            response = self.session.post(url, data=data, timeout=5)
             response.raise_for_status()
             
         except Exception as e:
@@ -107,12 +193,10 @@ class TelegramBotHandler:
     def add_click_feedback(self, chat_id, message_id, opp_number, player_name, user_name):
         """Adiciona feedback visual de que o botão foi clicado"""
         try:
-            import requests
-            
             # Cria mensagem de feedback
             feedback_text = f"✅ **{user_name}** copiou: **{player_name}** (Oportunidade #{opp_number})"
             
-            url = f"https://api.telegram.org/bot{self.config['telegram_token']}/sendMessage"
+            url = f"{self.telegram_api_base}/bot{self.config['telegram_token']}/sendMessage"
             
             data = {
                 "chat_id": chat_id,
@@ -121,7 +205,7 @@ class TelegramBotHandler:
                 "reply_to_message_id": message_id
             }
             
-            response = requests.post(url, data=data, timeout=5)
+            response = self.session.post(url, data=data, timeout=5)
             response.raise_for_status()
             
         except Exception as e:
@@ -130,16 +214,14 @@ class TelegramBotHandler:
     def setup_webhook(self, webhook_url):
         """Configura o webhook do Telegram"""
         try:
-            import requests
-            
-            url = f"https://api.telegram.org/bot{self.config['telegram_token']}/setWebhook"
+            url = f"{self.telegram_api_base}/bot{self.config['telegram_token']}/setWebhook"
             
             data = {
                 "url": webhook_url,
                 "allowed_updates": ["callback_query"]
             }
             
-            response = requests.post(url, data=data, timeout=10)
+            response = self.session.post(url, data=data, timeout=10)
             response.raise_for_status()
             
             result = response.json()
@@ -154,25 +236,162 @@ class TelegramBotHandler:
             logger.error(f"Erro ao configurar webhook: {e}")
             return False
     
+    def delete_webhook(self) -> bool:
+        """Remove o webhook (o Telegram não entrega getUpdates com webhook ativo)"""
+        try:
+            url = f"{self.telegram_api_base}/bot{self.config['telegram_token']}/deleteWebhook"
+            response = self.session.post(url, data={"drop_pending_updates": False}, timeout=10)
+            response.raise_for_status()
+            logger.info("Webhook removido - usando long polling")
+            return True
+        except Exception as e:
+            logger.error(f"Erro ao remover webhook: {e}")
+            return False
+    
+    def load_offset(self) -> int:
+        """Próximo update_id a pedir (persistido entre reinícios)"""
+        try:
+            with open(self.offset_file, 'r') as f:
+                return int(json.load(f).get("offset", 0))
+        except (FileNotFoundError, ValueError):
+            return 0
+    
+    def save_offset(self, offset: int):
+        """Grava o offset de forma atômica (arquivo temporário + rename)"""
+        self.offset_file.parent.mkdir(parents=True, exist_ok=True)
+        tmp_file = self.offset_file.with_suffix(".tmp")
+        with open(tmp_file, 'w') as f:
+            json.dump({"offset": offset, "updated_at": time.time()}, f)
+        os.replace(tmp_file, self.offset_file)
+    
+    def get_updates(self, offset: int):
+        """Uma chamada de getUpdates (bloqueia até polling_timeout segundos sem updates)"""
+        url = f"{self.telegram_api_base}/bot{self.config['telegram_token']}/getUpdates"
+        params = {
+            "offset": offset,
+            "limit": self.polling_batch_size,
+            "timeout": self.polling_timeout,
+            "allowed_updates": json.dumps(["callback_query"])
+        }
+        response = self.session.get(url, params=params, timeout=self.polling_timeout + 10)
+        if response.status_code == 409:
+            # Webhook ainda ativo: remove e tenta de novo no próximo ciclo
+            self.delete_webhook()
+            return []
+        response.raise_for_status()
+        
+        result = response.json()
+        if not result.get('ok'):
+            raise RuntimeError(f"getUpdates falhou: {result}")
+        return result.get('result', [])
+    
+    def run_polling(self):
+        """
+        Loop de long polling: busca lotes de updates, processa cada lote em paralelo
+        e só então avança o offset persistido. O offset é a única dedup (não usa telegram_updates):
+        um reinício antes de gravá-lo reprocessa o lote, mas nunca perde updates
+        """
+        offset = self.load_offset()
+        backoff = 1
+        logger.info(f"Long polling iniciado (offset {offset}, lote {self.polling_batch_size}, "
+                    f"timeout {self.polling_timeout}s)")
+        
+        with ThreadPoolExecutor(max_workers=self.worker_count, thread_name_prefix="telegram-poll") as executor:
+            while not self._polling_stop.is_set():
+                try:
+                    updates = self.get_updates(offset)
+                    backoff = 1
+                except Exception as e:
+                    logger.warning(f"⚠️ Erro no getUpdates: {e} - nova tentativa em {backoff}s")
+                    self._polling_stop.wait(backoff)
+                    backoff = min(backoff * 2, 60)
+                    continue
+                
+                if not updates:
+                    continue
+                
+                list(executor.map(self._process_update_safely, updates))
+                
+                offset = max(update['update_id'] for update in updates) + 1
+                self.save_offset(offset)
+        
+        logger.info("Long polling encerrado")
+    
+    def start_polling(self):
+        """Inicia o long polling em thread de background"""
+        self._polling_stop.clear()
+        self.polling_thread = threading.Thread(target=self.run_polling, name="telegram-polling", daemon=True)
+        self.polling_thread.start()
+        return self.polling_thread
+    
+    def stop_polling(self, timeout: float = None):
+        """Para o long polling após o lote atual"""
+        self._polling_stop.set()
+        if self.polling_thread:
+            self.polling_thread.join(timeout)
+    
+    def _mark_seen(self, update_id) -> bool:
+        """Registra o update_id (memória + banco compartilhado); True se já tinha sido visto"""
+        if update_id is None:
+            return False
+        with self._seen_lock:
+            if update_id in self._seen_updates:
+                self._seen_updates.move_to_end(update_id)
+                return True
+            self._seen_updates[update_id] = True
+            if len(self._seen_updates) > self.dedup_size:
+                self._seen_updates.popitem(last=False)
+            self._claims_since_cleanup += 1
+            cleanup = self._claims_since_cleanup >= self.dedup_size
+            if cleanup:
+                self._claims_since_cleanup = 0
+        
+        try:
+            if cleanup:
+                self.db.cleanup_telegram_updates()
+            # Reentrega recebida antes por outro worker
+            return not self.db.claim_telegram_update(update_id)
+        except Exception as e:
+            # Banco indisponível: fica só a dedup em memória
+            logger.error(f"Erro ao registrar update {update_id}: {e}")
+            return False
+    
+    def _forget(self, update_id):
+        """Desfaz o _mark_seen de um update que não foi aceito"""
+        if update_id is None:
+            return
+        with self._seen_lock:
+            self._seen_updates.pop(update_id, None)
+        try:
+            self.db.release_telegram_update(update_id)
+        except Exception as e:
+            logger.error(f"Erro ao liberar update {update_id}: {e}")
+    
+    def _process_update_safely(self, update):
+        try:
+            self.process_update(update)
+        except Exception as e:
+            logger.error(f"Erro ao processar update: {e}")
+    
     def run_server(self, host='0.0.0.0', port=8080):
-        """Inicia o servidor Flask"""
+        """Inicia o servidor Flask embutido (desenvolvimento; em produção use wsgi_webhook:application)"""
         logger.info(f"Iniciando servidor webhook em {host}:{port}")
         self.app.run(host=host, port=port, debug=False)
 
 # Função para integrar com o sistema existente
-def start_telegram_bot_handler():
+def start_telegram_bot_handler(polling: bool = False):
     """Inicia o handler do bot Telegram"""
     try:
         with open('backend/config/config.json', 'r') as f:
             config = json.load(f)
         
-        bot_handler = TelegramBotHandler(config)
+        bot_handler = TelegramBotHandler(config, polling=polling)
         
         # Em produção, configurar webhook com URL real
         # webhook_url = "https://seu-app.railway.app/webhook"
         # bot_handler.setup_webhook(webhook_url)
         
-        # Para desenvolvimento local, usar polling ou ngrok
+        # Sem URL pública: bot_handler.delete_webhook() + bot_handler.run_polling()
         logger.info("Handler do Telegram Bot criado")
         return bot_handler
         
@@ -184,9 +403,17 @@ if __name__ == "__main__":
     # Teste do sistema
     logging.basicConfig(level=logging.INFO)
     
-    handler = start_telegram_bot_handler()
-    if handler:
+    polling = "--polling" in sys.argv
+    handler = start_telegram_bot_handler(polling=polling)
+    if handler and polling:
+        # Modo long polling: não precisa de URL pública
+        handler.delete_webhook()
+        try:
+            handler.run_polling()
+        except KeyboardInterrupt:
+            pass
+    elif handler:
         print("Bot handler criado com sucesso!")
-        print("Para testar localmente, use ngrok ou configure webhook em produção")
+        print("Para testar localmente, use --polling (getUpdates) ou configure webhook em produção")
     else:
         print("Erro ao criar bot handler")
@@ -0,0 +1,24 @@
+"""
+Entrada WSGI do TennisQ para servidores multi-worker (gunicorn)
+
+    gunicorn --config backend/gunicorn.conf.py --pythonpath backend wsgi:application
+
+Cada worker serve HTTP; apenas um deles (eleito por trava em arquivo) roda scan e
+monitoramento e publica o snapshot do dashboard no SQLite para os demais
+"""
+
+import os
+import sys
+
+# Adiciona o path do backend
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import app as tennisq
+
+def create_app():
+    """Cria a aplicação do worker (o scheduler é iniciado pelo hook post_worker_init)"""
+    if tennisq.app_instance is None:
+        tennisq.app_instance = tennisq.TennisQRailwayApp()
+    return tennisq.app_instance
+
+application = create_app().flask_app
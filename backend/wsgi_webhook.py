@@ -0,0 +1,23 @@
+"""
+Entrada WSGI do webhook do bot do Telegram (TelegramBotHandler)
+
+    gunicorn --config backend/gunicorn.conf.py --pythonpath backend wsgi_webhook:application
+
+Não inicia scan nem monitoramento: apenas processa os callbacks dos botões
+"""
+
+import os
+import sys
+
+# Adiciona o path do backend
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from core.config import BACKEND_CONFIG_PATH, load_config
+from services.telegram_bot_handler import TelegramBotHandler
+
+def create_webhook_handler() -> TelegramBotHandler:
+    """TelegramBotHandler com a configuração do backend"""
+    return TelegramBotHandler(load_config(BACKEND_CONFIG_PATH))
+
+handler = create_webhook_handler()
+application = handler.app
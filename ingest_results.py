@@ -0,0 +1,26 @@
+#!/usr/bin/env python3
+# Ingestão manual dos resultados de jogos encerrados (match_results)
+
+import json
+import logging
+import os
+import sys
+
+# Adiciona path do backend
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'backend'))
+
+if __name__ == "__main__":
+    from core.database import PreLiveDatabase
+    from core.results_ingestion import ResultsIngestor
+
+    logging.basicConfig(level=logging.INFO)
+
+    with open(os.path.join(os.path.dirname(__file__), 'backend', 'config', 'config.json'), 'r') as f:
+        config = json.load(f)
+
+    ingestor = ResultsIngestor(
+        db=PreLiveDatabase(),
+        api_token=config["api_key"],
+        api_base=os.environ.get("API_BASE_URL", config["api_base_url"])
+    )
+    print(ingestor.ingest())
@@ -0,0 +1,12 @@
+#!/usr/bin/env python3
+# Backtest das oportunidades armazenadas no prelive.db
+
+import os
+import sys
+
+# Adiciona path do backend
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'backend'))
+
+if __name__ == "__main__":
+    from core.backtest import main
+    main()
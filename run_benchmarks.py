@@ -0,0 +1,12 @@
+#!/usr/bin/env python3
+# Benchmarks dos caminhos críticos (scan, monitor, notificação e banco)
+
+import os
+import sys
+
+# Adiciona path do backend
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'backend'))
+
+if __name__ == "__main__":
+    from replay.benchmark import main
+    main()
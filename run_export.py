@@ -0,0 +1,12 @@
+#!/usr/bin/env python3
+# Exportação em streaming do histórico (NDJSON/CSV, gzip opcional)
+
+import os
+import sys
+
+# Adiciona path do backend
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'backend'))
+
+if __name__ == "__main__":
+    from core.export import main
+    main()
@@ -0,0 +1,36 @@
+#!/usr/bin/env python3
+# Manutenção manual do prelive.db (expiração, compactação do movimento de linha, retenção e vacuum)
+
+import argparse
+import json
+import logging
+import os
+import sys
+
+# Adiciona path do backend
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'backend'))
+
+if __name__ == "__main__":
+    from core.database import PreLiveDatabase
+    from core.maintenance import DataMaintenance
+
+    parser = argparse.ArgumentParser(description="Manutenção do prelive.db")
+    parser.add_argument("--db", default="storage/database/prelive.db")
+    parser.add_argument("--retention-days", type=int, default=7)
+    parser.add_argument("--downsample-after-hours", type=float, default=24)
+    parser.add_argument("--archive-after-days", type=float, default=7)
+    parser.add_argument("--no-archive", action="store_true", help="Só retenção, sem arquivo mensal")
+    parser.add_argument("--batch-size", type=int, default=500)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+
+    maintenance = DataMaintenance(
+        PreLiveDatabase(args.db),
+        retention_days=args.retention_days,
+        downsample_after_hours=args.downsample_after_hours,
+        archive_after_days=None if args.no_archive else args.archive_after_days,
+        batch_size=args.batch_size,
+        allow_full_vacuum=True  # Conversão única para auto_vacuum incremental, se ainda pendente
+    )
+    print(json.dumps(maintenance.run(), indent=2))
@@ -0,0 +1,12 @@
+#!/usr/bin/env python3
+# Stub local da B365API para replay e benchmarks offline
+
+import os
+import sys
+
+# Adiciona path do backend
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'backend'))
+
+if __name__ == "__main__":
+    from replay.stub_server import main
+    main()
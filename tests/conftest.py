@@ -0,0 +1,53 @@
+"""
+Fixtures compartilhadas dos testes: banco temporário, diretório de trabalho isolado e stub da B365API
+Rodar da raiz do repositório: python -m pytest -q
+"""
+
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "backend"))
+
+from core.database import PreLiveDatabase  # noqa: E402
+
+@pytest.fixture(autouse=True)
+def workdir(tmp_path, monkeypatch):
+    """Cada teste roda num diretório próprio (caminhos relativos storage/... ficam isolados)"""
+    monkeypatch.chdir(tmp_path)
+    return tmp_path
+
+@pytest.fixture
+def db(tmp_path) -> PreLiveDatabase:
+    return PreLiveDatabase(str(tmp_path / "prelive.db"))
+
+@pytest.fixture
+def stub():
+    """Stub local da B365API com calendário sintético (sem fixtures gravadas)"""
+    from replay.stub_server import FixtureStore, StubServer, SyntheticFixtures
+
+    server = StubServer(fixtures=FixtureStore("fixtures-vazias"), synthetic=SyntheticFixtures(n_events=6)).start()
+    yield server
+    server.stop()
+
+@pytest.fixture
+def no_rate_limit(monkeypatch):
+    """Desliga o limitador global (o stub responde sem cota)"""
+    from core.rate_limiter import rate_limiter
+
+    monkeypatch.setattr(rate_limiter, "enabled", False)
+    return rate_limiter
+
+@pytest.fixture
+def provider(stub, db, tmp_path, no_rate_limit, monkeypatch):
+    """RealDataProvider apontado para o stub, com índice de jogadores, cache HTTP e ratings isolados"""
+    from core import real_data_provider
+    from core.http_cache import HttpCache
+    from core.player_index import PlayerIndex
+    from core.ratings import RatingStore
+
+    monkeypatch.setattr(real_data_provider, "player_index", PlayerIndex())
+    return real_data_provider.RealDataProvider("token-teste", stub.url,
+                                               http_cache=HttpCache(str(tmp_path / "http_cache.db")),
+                                               ratings=RatingStore(db))
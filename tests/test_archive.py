@@ -0,0 +1,59 @@
+from datetime import datetime, timedelta
+
+from core.archive import HistoryArchive, archive_path, iter_history_rows, list_archives
+from core.maintenance import DataMaintenance
+from core.prelive_scanner import Opportunity
+
+def _save(db, event_id: str, start: datetime, side: str = "HOME", status: str = None):
+    db.save_opportunities([Opportunity(event_id=event_id, match="A vs B", start_utc=start.strftime("%Y-%m-%d %H:%M"),
+                                       league="WTA Cluj", side=side, odd=2.0, p_model=0.5, ev=0.0, p_market=0.5)])
+    db.save_line_movement(event_id.replace("_away", ""), 1.9, 1.9)
+    if status:
+        with db._connect() as conn:
+            conn.execute("UPDATE opportunities SET status = ? WHERE event_id = ?", (status, event_id))
+
+def _count(conn, table: str) -> int:
+    return conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+
+def test_archive_moves_closed_events_by_start_month(db):
+    _save(db, "1", datetime(2025, 3, 10, 12), status="SETTLED")
+    _save(db, "1_away", datetime(2025, 3, 10, 12), side="AWAY", status="SETTLED")
+    _save(db, "2", datetime(2025, 4, 2, 9), status="EXPIRED")
+    _save(db, "3", datetime(2025, 4, 3, 9), status="ACTIVE")  # Ativo: fica no banco vivo
+    _save(db, "4", datetime.utcnow() + timedelta(days=1))
+
+    totals = HistoryArchive(db, pause=0).archive_before(datetime.utcnow().isoformat())
+
+    assert totals == {"months": 2, "events": 2, "opportunities": 3, "line_movements": 3}
+    assert [month for month, _ in list_archives(db.db_path)] == ["2025-03", "2025-04"]
+    assert archive_path(db.db_path, "2025-03").name == "prelive_2025_03.db"
+    with db._connect() as conn:
+        assert sorted(r[0] for r in conn.execute("SELECT event_id FROM opportunities")) == ["3", "4"]
+        assert _count(conn, "line_movements") == 2
+
+    # Idempotente: nada mais a arquivar
+    assert HistoryArchive(db, pause=0).archive_before(datetime.utcnow().isoformat())["events"] == 0
+
+def test_history_rows_read_archives_then_live(db):
+    _save(db, "1", datetime(2025, 3, 10, 12), status="SETTLED")
+    _save(db, "2", datetime(2025, 4, 2, 9), status="EXPIRED")
+    HistoryArchive(db, pause=0).archive_before(datetime.utcnow().isoformat())
+    _save(db, "5", datetime.utcnow() + timedelta(days=1))
+
+    query = "SELECT event_id FROM {schema}.opportunities ORDER BY id"
+    assert [r[0] for r in iter_history_rows(db.db_path, query, batch_size=1)] == ["1", "2", "5"]
+    assert [r[0] for r in iter_history_rows(db.db_path, query, include_archives=False)] == ["5"]
+
+def test_archive_runs_before_retention(db):
+    _save(db, "old", datetime.utcnow() - timedelta(days=20), status="SETTLED")
+    with db._connect() as conn:
+        old = (datetime.utcnow() - timedelta(days=20)).isoformat()
+        conn.execute("UPDATE opportunities SET created_at = ?", (old,))
+        conn.execute("UPDATE line_movements SET created_at = ?", (old,))
+
+    report = DataMaintenance(db, batch_pause=0).run()
+
+    assert report["archived"]["events"] == 1
+    assert sum(report["deleted"].values()) == 0  # Nada perdido: foi para o arquivo
+    stats = HistoryArchive(db).stats()
+    assert len(stats) == 1 and stats[0]["opportunities"] == 1
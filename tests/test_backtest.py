@@ -0,0 +1,68 @@
+import pytest
+
+from core.backtest import BacktestConfig, BacktestEngine, build_grid
+
+# (event_id, side, league, odd, ev, start_utc, created_at, vencedor, odd de fechamento)
+HISTORY = [
+    ("1", "HOME", "WTA Cluj", 4.5, 0.10, "2030-01-02 12:00", "2030-01-01T12:00:00", "HOME", 4.0),
+    ("1", "HOME", "WTA Cluj", 4.8, 0.12, "2030-01-02 12:00", "2030-01-01T18:00:00", "HOME", 4.0),  # Rescan
+    ("2_away", "AWAY", "ITF W35 Brasov", 5.0, 0.05, "2030-01-03 12:00", "2030-01-02T20:00:00", "HOME", 5.5),
+    ("3", "HOME", "ATP Challenger Lima", 4.2, 0.20, "2030-01-03 12:00", "2030-01-02T20:00:00", "HOME", None),
+    ("4", "HOME", "WTA Cluj", 2.5, 0.01, "2030-01-04 12:00", "2030-01-04T00:00:00", None, None),
+]
+
+@pytest.fixture
+def history_db(db):
+    with db._connect() as conn:
+        for event_id, side, league, odd, ev, start, created, winner, closing in HISTORY:
+            conn.execute("""
+                INSERT INTO opportunities (event_id, match_name, start_utc, league, side, odd, p_model, ev,
+                                           p_market, created_at, status)
+                VALUES (?, 'A vs B', ?, ?, ?, ?, 0.3, ?, 0.2, ?, 'SETTLED')
+            """, (event_id, start, league, side, odd, ev, created))
+            base_id = event_id.replace("_away", "")
+            if winner:
+                conn.execute("INSERT OR IGNORE INTO match_results (event_id, winner, created_at) VALUES (?, ?, ?)",
+                             (base_id, winner, created))
+            if closing:
+                home, away = (closing, 1.2) if side == "HOME" else (1.2, closing)
+                conn.execute("""
+                    INSERT INTO line_movements (event_id, home_od, away_od, timestamp, created_at)
+                    VALUES (?, ?, ?, ?, ?)
+                """, (base_id, home, away, start, start.replace(" ", "T")))
+    return db
+
+def test_build_grid_skips_invalid_ranges():
+    grid = build_grid([4.0, 5.0], [4.5, 6.0], [None, 0.1], [0.05], [0.0], [72.0], [None, ("wta",)])
+    # odd 5.0-4.5 inválida; ev_min 0.1 > ev_max 0.05 inválido
+    assert len(grid) == 3 * 1 * 2
+    assert all(c.odd_min <= c.odd_max and c.ev_min is None for c in grid)
+
+def test_default_filters_match_scanner(history_db):
+    (result,) = BacktestEngine(str(history_db.db_path), workers=1).run([BacktestConfig()])
+
+    # Evento 1 conta uma vez (primeiro scan, odd 4.5); 3 é masculino; 4 fora da faixa de odds
+    assert result["bets"] == 2 and result["settled"] == 2 and result["wins"] == 1
+    assert result["profit"] == pytest.approx(3.5 - 1.0)
+    assert result["roi"] == pytest.approx(1.25)
+    assert result["avg_clv"] == pytest.approx(((4.0 / 4.5 - 1) + (5.5 / 5.0 - 1)) / 2, abs=1e-4)
+    assert result["clv_positive_rate"] == 0.5
+
+def test_grid_in_parallel_matches_sequential(history_db):
+    grid = build_grid([2.0, 4.0], [6.0], [None, 0.08], [None], [0.0, 20.0], [72.0], [None, ("challenger",)])
+    sequential = BacktestEngine(str(history_db.db_path), workers=1).run(grid)
+    parallel = BacktestEngine(str(history_db.db_path), workers=3).run(grid)
+
+    assert len(parallel) == len(grid)
+    key = lambda r: repr(sorted(r["config"].items()))  # noqa: E731
+    assert sorted(parallel, key=key) == sorted(sequential, key=key)
+    # Ordenado por ROI (configurações sem apostas liquidadas por último)
+    rois = [r["roi"] for r in parallel if r["roi"] is not None]
+    assert rois == sorted(rois, reverse=True)
+
+def test_time_window_and_hours_filter(history_db):
+    engine = BacktestEngine(str(history_db.db_path), workers=1)
+    (late,) = engine.run([BacktestConfig(hours_min=20.0)], since="2030-01-02")
+    assert late["bets"] == 0
+    (window,) = engine.run([BacktestConfig(odd_min=2.0)], since="2030-01-03", until="2030-01-05")
+    assert window["bets"] == 1 and window["settled"] == 0 and window["roi"] is None
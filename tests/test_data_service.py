@@ -0,0 +1,37 @@
+from core import data_service
+from core.data_service import DataService
+from core.database import PreLiveDatabase
+from core.prelive_scanner import Opportunity
+
+def _opportunity(odd: float = 2.1) -> Opportunity:
+    return Opportunity(event_id="123", match="A vs B", start_utc="2030-01-01 12:00", league="WTA Cluj",
+                       side="HOME", odd=odd, p_model=0.5, ev=0.05, p_market=0.45)
+
+def test_sent_cache_checks_database_on_miss(tmp_path):
+    path = str(tmp_path / "prelive.db")
+    service = DataService(path)
+    assert not service.is_opportunity_already_sent(_opportunity())  # Carrega o cache vazio
+
+    # Outro processo envia depois da carga
+    PreLiveDatabase(path).mark_opportunity_as_sent(_opportunity())
+    assert service.is_opportunity_already_sent(_opportunity())
+    assert not service.is_opportunity_already_sent(_opportunity(odd=2.5))
+
+def test_sent_cache_reloads_after_ttl(tmp_path, monkeypatch):
+    path = str(tmp_path / "prelive.db")
+    service = DataService(path)
+    service.mark_opportunity_as_sent(_opportunity())
+    assert service.is_opportunity_already_sent(_opportunity())
+
+    # reset_sent_opportunities.py rodando em outro processo
+    PreLiveDatabase(path).reset_sent_opportunities()
+    assert service.is_opportunity_already_sent(_opportunity())  # Ainda dentro do TTL
+
+    monkeypatch.setattr(data_service, "SENT_CACHE_TTL", 0)
+    assert not service.is_opportunity_already_sent(_opportunity())
+
+def test_reset_clears_cache(tmp_path):
+    service = DataService(str(tmp_path / "prelive.db"))
+    service.mark_opportunity_as_sent(_opportunity())
+    assert service.reset_sent_opportunities() == 1
+    assert not service.is_opportunity_already_sent(_opportunity())
@@ -0,0 +1,41 @@
+from core.enrichment import OpportunityEnricher
+from core.prelive_scanner import Opportunity
+
+def _opportunity(event_index: int, side: str = "HOME") -> Opportunity:
+    home, away = f"Player {2 * event_index}", f"Player {2 * event_index + 1}"
+    return Opportunity(event_id=str(9000000 + event_index), match=f"{home} vs {away}",
+                       start_utc="2030-01-01 12:00", league="WTA Cluj", side=side,
+                       odd=2.5, p_model=0.45, ev=0.125, p_market=0.4)
+
+def test_create_loads_real_data_provider(stub):
+    enricher = OpportunityEnricher.create("token-teste", stub.url)
+    assert enricher is not None
+    assert enricher.provider.api_base == stub.url
+
+def test_enrich_against_replay_stub(provider, stub):
+    opportunities = [_opportunity(0), _opportunity(0, "AWAY"), _opportunity(1)]
+    enricher = OpportunityEnricher(provider, max_workers=4, budget=30)
+
+    assert enricher.enrich(opportunities) == 3
+
+    enrichment = opportunities[0].enrichment
+    assert enrichment["complete"] is True
+    assert enrichment["home"]["id"] == "500000"
+    assert enrichment["away"]["id"] == "500001"
+    assert enrichment["home"]["matches_90d"] > 0
+    assert 0.0 <= enrichment["home"]["recent_form"] <= 1.0
+    assert set(enrichment["h2h"]) == {"player1_wins", "player2_wins", "matches"}
+    # Mesmo par nos dois lados: H2H buscado uma única vez
+    assert opportunities[1].enrichment["h2h"] == enrichment["h2h"]
+
+def test_enrich_unknown_players_is_incomplete(provider):
+    opportunity = _opportunity(0)
+    opportunity.match = "Ninguém Conhecido vs Outro Desconhecido"
+    assert OpportunityEnricher(provider, budget=10).enrich([opportunity]) == 0
+    assert opportunity.enrichment == {"home": None, "away": None, "h2h": None, "complete": False}
+
+def test_enrich_respects_budget(provider, stub):
+    stub.latency_ms = 200  # Nenhuma busca termina dentro do orçamento
+    opportunity = _opportunity(2)
+    assert OpportunityEnricher(provider, budget=0).enrich([opportunity]) == 0
+    assert opportunity.enrichment["complete"] is False
@@ -0,0 +1,92 @@
+import csv
+import gzip
+import io
+import json
+from datetime import datetime, timedelta
+
+import pytest
+
+from core.archive import HistoryArchive
+from core.export import EXPORT_COLUMNS, ExportFilters, build_query, parse_statuses, prime, stream_export
+from core.prelive_scanner import Opportunity
+
+def _populate(db, n: int = 30):
+    start = datetime.utcnow() + timedelta(hours=5)
+    db.save_opportunities([
+        Opportunity(event_id=str(i), match=f"P{i} vs Q{i}", start_utc=start.strftime("%Y-%m-%d %H:%M"),
+                    league="WTA Cluj" if i % 2 else "ITF M25 Monastir", side="HOME", odd=2.0,
+                    p_model=0.5, ev=0.0, p_market=0.5)
+        for i in range(n)
+    ])
+    for i in range(n):
+        db.save_line_movement(str(i), 1.9, 1.95)
+
+def _body(chunks) -> bytes:
+    return b"".join(chunks)
+
+def test_ndjson_and_csv(db):
+    _populate(db)
+    lines = _body(stream_export(db.db_path, "opportunities")).decode().splitlines()
+    assert len(lines) == 30
+    assert list(json.loads(lines[0])) == list(EXPORT_COLUMNS["opportunities"])
+
+    rows = list(csv.reader(io.StringIO(_body(stream_export(db.db_path, "line_movements", "csv")).decode())))
+    assert rows[0] == list(EXPORT_COLUMNS["line_movements"]) and len(rows) == 31
+
+def test_gzip_and_filters(db):
+    _populate(db)
+    filters = ExportFilters(league="wta", statuses=parse_statuses("active, expired"))
+    data = gzip.decompress(_body(stream_export(db.db_path, "line_movements", compress=True, filters=filters)))
+    assert len(data.decode().splitlines()) == 15
+
+    assert _body(stream_export(db.db_path, "opportunities", filters=ExportFilters(statuses=("SETTLED",)))) == b""
+    assert parse_statuses("expired,settled") == ("EXPIRED", "SETTLED")
+
+def test_export_includes_archives(db):
+    _populate(db, 4)
+    with db._connect() as conn:
+        conn.execute("UPDATE opportunities SET status = 'SETTLED', start_utc = '2025-03-01 10:00' WHERE event_id = '0'")
+    HistoryArchive(db, pause=0).archive_before(datetime.utcnow().isoformat())
+
+    ids = [json.loads(line)["event_id"] for line in _body(stream_export(db.db_path, "opportunities")).splitlines()]
+    assert ids == ["0", "1", "2", "3"]
+    live = _body(stream_export(db.db_path, "opportunities", include_archives=False)).splitlines()
+    assert len(live) == 3
+
+def test_invalid_arguments_fail_before_streaming(db):
+    with pytest.raises(ValueError):
+        stream_export(db.db_path, "players")
+    with pytest.raises(ValueError):
+        stream_export(db.db_path, "opportunities", fmt="xml")
+    with pytest.raises(ValueError):
+        build_query("sent_opportunities", ExportFilters())
+
+def test_prime_surfaces_database_errors(tmp_path):
+    with pytest.raises(Exception):
+        prime(stream_export(tmp_path / "nao-existe.db", "opportunities"))
+    assert list(prime(iter(()))) == []
+
+@pytest.fixture
+def client(workdir):
+    pytest.importorskip("flask")
+    from app import TennisQRailwayApp
+
+    tennis_app = TennisQRailwayApp()
+    _populate(tennis_app.db, 5)
+    return tennis_app, tennis_app.flask_app.test_client()
+
+def test_export_route_streams_file(client):
+    _, http = client
+    response = http.get("/export/opportunities?format=csv&gzip=1")
+    assert response.status_code == 200
+    assert response.headers["Content-Disposition"] == "attachment; filename=opportunities.csv.gz"
+    assert len(gzip.decompress(response.data).decode().splitlines()) == 6
+
+def test_export_route_errors_are_not_200(client, tmp_path):
+    tennis_app, http = client
+    assert http.get("/export/players").status_code == 400
+
+    tennis_app.db.db_path = tmp_path / "sumiu" / "prelive.db"  # Banco ilegível: falha antes do 200
+    response = http.get("/export/opportunities")
+    assert response.status_code == 500
+    assert "error" in response.get_json()
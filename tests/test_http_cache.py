@@ -0,0 +1,64 @@
+import time
+
+from core.http_cache import HttpCache
+
+STATS = "/v2/tennis/player/500000/stats"
+
+def test_ttl_and_key():
+    cache = HttpCache("cache.db")
+    assert cache.ttl_for(STATS) == 24 * 3600
+    assert cache.ttl_for("/v2/tennis/player/1/h2h/2") == 24 * 3600
+    assert cache.ttl_for("/v3/events/upcoming") == 0
+    assert cache.make_key(STATS, {"token": "a", "days": 90}) == cache.make_key(STATS, {"days": "90", "token": "b"})
+
+def test_put_get_refresh():
+    cache = HttpCache("cache.db")
+    cache.put("k", STATS, {"results": 1}, ttl=60, etag='"abc"')
+
+    cached = cache.get("k")
+    assert cached.fresh and cached.data == {"results": 1}
+    assert cached.conditional_headers() == {"If-None-Match": '"abc"'}
+
+    cache.put("k", STATS, {"results": 1}, ttl=-1, etag='"abc"')
+    assert not cache.get("k").fresh
+    cache.refresh("k", 60)
+    assert cache.get("k").fresh
+
+def test_lru_eviction():
+    cache = HttpCache("cache.db", max_bytes=1000)
+    for i in range(5):  # ~165 bytes cada, abaixo do limite
+        cache.put(f"k{i}", STATS, {"payload": "x" * 150}, ttl=60)
+        time.sleep(0.001)
+    cache.get("k0")  # Acesso recente protege a entrada mais antiga
+    cache.put("k5", STATS, {"payload": "x" * 150}, ttl=60)
+    cache.put("k6", STATS, {"payload": "x" * 150}, ttl=60)
+
+    stats = cache.stats()
+    assert stats["bytes"] <= 1000
+    assert cache.get("k0") is not None
+    assert cache.get("k1") is None
+
+def test_provider_serves_fresh_then_revalidates_with_304(provider, stub):
+    first = provider.get_player_stats("500000")
+    assert first["results"]["id"] == "500000"
+    assert stub.request_count == 1
+
+    # Fresca: não chama a API
+    assert provider.get_player_stats("500000") == first
+    assert stub.request_count == 1
+
+    # Vencida: requisição condicional, 304 e novo TTL
+    key = provider.http_cache.make_key(STATS)
+    provider.http_cache.put(key, STATS, first, ttl=-1, etag=provider.http_cache.get(key).etag)
+    assert provider.get_player_stats("500000") == first
+    assert stub.request_count == 2
+    assert stub.not_modified_count == 1
+    assert provider.http_cache.get(key).fresh
+
+def test_provider_falls_back_to_stale_response_on_error(provider, stub):
+    first = provider.get_player_stats("500000")
+    key = provider.http_cache.make_key(STATS)
+    provider.http_cache.put(key, STATS, first, ttl=-1)
+
+    stub.error_rate = 1.0
+    assert provider.get_player_stats("500000") == first
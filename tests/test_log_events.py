@@ -0,0 +1,93 @@
+import json
+import logging
+import sys
+
+import pytest
+
+from core.log_events import EventSampler, JsonFormatter, StageSummary, log_event
+
+@pytest.fixture
+def records():
+    """Logger isolado capturando os registros emitidos"""
+    captured = []
+
+    class Capture(logging.Handler):
+        def emit(self, record):
+            captured.append(record)
+
+    logger = logging.getLogger("tests.log_events")
+    logger.propagate = False
+    handler = Capture()
+    logger.addHandler(handler)
+    yield logger, captured
+    logger.removeHandler(handler)
+
+def test_sampler_rate_is_clamped(monkeypatch):
+    assert EventSampler(rate=-1).rate == 0.0
+    assert EventSampler(rate=5).rate == 1.0
+    monkeypatch.setenv("LOG_EVENT_SAMPLE_RATE", "nada")
+    assert EventSampler().rate == 0.0
+    monkeypatch.setenv("LOG_EVENT_SAMPLE_RATE", "0.25")
+    assert EventSampler().rate == 0.25
+
+def test_sampler_emits_about_rate_fraction():
+    assert not any(EventSampler(rate=0).sample() for _ in range(1000))
+    assert all(EventSampler(rate=1).sample() for _ in range(1000))
+    sampler = EventSampler(rate=0.1, seed=7)
+    sampled = sum(sampler.sample() for _ in range(10000))
+    assert 800 < sampled < 1200
+
+def test_log_event_is_debug_or_sampled_info(records):
+    logger, captured = records
+
+    logger.setLevel(logging.INFO)
+    log_event(logger, EventSampler(rate=0), "evento %s", 1)
+    assert captured == []
+    log_event(logger, EventSampler(rate=1), "evento %s", 2)
+    assert captured[-1].levelno == logging.INFO and captured[-1].getMessage() == "[amostra] evento 2"
+
+    logger.setLevel(logging.DEBUG)
+    log_event(logger, EventSampler(rate=0), "evento %s", 3)
+    assert captured[-1].levelno == logging.DEBUG and captured[-1].getMessage() == "evento 3"
+
+def test_log_event_does_not_format_when_dropped(records):
+    logger, _ = records
+    logger.setLevel(logging.WARNING)
+
+    class Expensive:
+        def __str__(self):
+            raise AssertionError("formatado sem necessidade")
+
+    log_event(logger, EventSampler(rate=1), "evento %s", Expensive())
+
+def test_stage_summary_emits_one_structured_record(records):
+    logger, captured = records
+    logger.setLevel(logging.INFO)
+
+    summary = StageSummary("classification")
+    for outcome in ("female", "female", "male"):
+        summary.add(outcome)
+    summary.add("no_odds", 3)
+    summary.emit(logger, "Classificação", duration=1.5)
+
+    (record,) = captured
+    assert record.getMessage() == "Classificação: female=2 | male=1 | no_odds=3 | duration=1.5"
+    assert record.event == "classification"
+    assert record.fields == {"female": 2, "male": 1, "no_odds": 3, "duration": 1.5}
+
+    payload = json.loads(JsonFormatter().format(record))
+    assert payload["event"] == "classification" and payload["female"] == 2 and payload["level"] == "INFO"
+
+def test_stage_summary_skips_disabled_level(records):
+    logger, captured = records
+    logger.setLevel(logging.WARNING)
+    StageSummary("scan").emit(logger, "Scan")
+    assert captured == []
+
+def test_json_formatter_includes_exception():
+    try:
+        raise ValueError("falhou")
+    except ValueError:
+        record = logging.LogRecord("x", logging.ERROR, __file__, 1, "erro %s", ("a",), sys.exc_info())
+    payload = json.loads(JsonFormatter().format(record))
+    assert payload["msg"] == "erro a" and "ValueError: falhou" in payload["exc"]
@@ -0,0 +1,77 @@
+import sqlite3
+from datetime import datetime, timedelta
+
+from core.database import PreLiveDatabase
+from core.maintenance import AUTO_VACUUM_INCREMENTAL, DataMaintenance
+
+def _iso(**delta) -> str:
+    return (datetime.utcnow() - timedelta(**delta)).isoformat()
+
+def _insert_movements(db, event_id: str, created_at):
+    with db._connect() as conn:
+        conn.executemany("""
+            INSERT INTO line_movements (event_id, home_od, away_od, timestamp, created_at) VALUES (?, 1.8, 2.0, ?, ?)
+        """, [(event_id, ts, ts) for ts in created_at])
+
+def _count(db, table: str, where: str = "1", params=()) -> int:
+    with db._connect() as conn:
+        return conn.execute(f"SELECT COUNT(*) FROM {table} WHERE {where}", params).fetchone()[0]
+
+def test_downsample_keeps_open_hourly_last_and_close(db):
+    base = datetime.utcnow().replace(minute=0, second=0, microsecond=0) - timedelta(days=3)
+    readings = [(base + timedelta(hours=h, minutes=m)).isoformat() for h in range(3) for m in (0, 20, 40)]
+    _insert_movements(db, "ended", readings)
+    _insert_movements(db, "recent", [_iso(minutes=m) for m in (30, 20, 10)])
+
+    report = DataMaintenance(db, batch_pause=0).downsample_line_movements()
+
+    assert report == {"events": 1, "deleted": 5}
+    with db._connect() as conn:
+        kept = [row[0] for row in conn.execute(
+            "SELECT created_at FROM line_movements WHERE event_id = 'ended' ORDER BY created_at")]
+    # Abertura + última leitura de cada hora (a da última hora é o fechamento)
+    assert kept == [readings[0], readings[2], readings[5], readings[8]]
+    assert _count(db, "line_movements", "event_id = 'recent'") == 3
+
+    # Já compactado: não volta a ser processado
+    assert DataMaintenance(db, batch_pause=0).downsample_line_movements() == {"events": 0, "deleted": 0}
+
+def test_retention_defaults_to_seven_days(db):
+    _insert_movements(db, "1", [_iso(days=8), _iso(days=6)])
+    report = DataMaintenance(db, archive_after_days=None, batch_pause=0).run()
+    assert report["deleted"]["line_movements"] == 1
+    assert _count(db, "line_movements") == 1
+
+def _legacy_db(tmp_path) -> PreLiveDatabase:
+    """Banco criado antes do auto_vacuum incremental (tabela já existente antes do PRAGMA)"""
+    path = tmp_path / "legacy.db"
+    with sqlite3.connect(path) as conn:
+        conn.execute("CREATE TABLE legado (x)")
+    return PreLiveDatabase(str(path))
+
+def test_loop_never_runs_full_vacuum(tmp_path):
+    db = _legacy_db(tmp_path)
+    report = DataMaintenance(db, batch_pause=0).reclaim_space()
+
+    assert report["conversion_pending"] is True
+    with db._connect() as conn:
+        assert conn.execute("PRAGMA auto_vacuum").fetchone()[0] != AUTO_VACUUM_INCREMENTAL
+
+def test_manual_run_converts_to_incremental(tmp_path):
+    db = _legacy_db(tmp_path)
+    report = DataMaintenance(db, batch_pause=0, allow_full_vacuum=True).reclaim_space()
+
+    assert "conversion_pending" not in report
+    with db._connect() as conn:
+        assert conn.execute("PRAGMA auto_vacuum").fetchone()[0] == AUTO_VACUUM_INCREMENTAL
+
+def test_incremental_vacuum_frees_pages(db):
+    _insert_movements(db, "big", [_iso(days=40, seconds=i) for i in range(20000)])
+    report = DataMaintenance(db, archive_after_days=None, batch_size=5000, batch_pause=0).run()
+
+    assert _count(db, "line_movements") == 0
+    assert report["vacuum"]["pages_freed"] > 0
+    assert report["reclaimed_bytes"] > 0
+    assert DataMaintenance(db).last_report() == report
+    with db._connect() as conn:
+        assert conn.execute("PRAGMA freelist_count").fetchone()[0] == 0
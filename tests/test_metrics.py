@@ -0,0 +1,80 @@
+import json
+
+import pytest
+
+from core.metrics import Counter, Histogram, MetricsRegistry, metrics
+
+def test_counter_renders_prometheus_text():
+    counter = Counter("tennisq_test_total", "Teste", ["endpoint", "status"])
+    counter.inc(endpoint="/v3/events/ended", status="200")
+    counter.inc(2, endpoint="/v3/events/ended", status="200")
+    counter.inc(endpoint='a"b\\c', status="error")
+
+    assert counter.render() == [
+        "# HELP tennisq_test_total Teste",
+        "# TYPE tennisq_test_total counter",
+        'tennisq_test_total{endpoint="/v3/events/ended",status="200"} 3.0',
+        'tennisq_test_total{endpoint="a\\"b\\\\c",status="error"} 1.0',
+    ]
+
+def test_histogram_buckets_are_cumulative():
+    histogram = Histogram("tennisq_test_seconds", "Teste", ["stage"], buckets=(0.1, 1.0))
+    for value in (0.05, 0.1, 0.5, 2.0):
+        histogram.observe(value, stage="scan")
+
+    assert histogram.render()[2:] == [
+        'tennisq_test_seconds_bucket{stage="scan",le="0.1"} 2',
+        'tennisq_test_seconds_bucket{stage="scan",le="1.0"} 3',
+        'tennisq_test_seconds_bucket{stage="scan",le="+Inf"} 4',
+        'tennisq_test_seconds_sum{stage="scan"} 2.65',
+        'tennisq_test_seconds_count{stage="scan"} 4',
+    ]
+    assert histogram.count(stage="scan") == 4
+
+def test_registry_reuses_metrics_and_times_stages():
+    registry = MetricsRegistry()
+    assert registry.counter("tennisq_api_requests_total", "outra") is registry.api_requests
+
+    with registry.timer("scan"):
+        pass
+    with pytest.raises(RuntimeError):
+        with registry.timer("scan"):
+            raise RuntimeError("falhou")
+    assert registry.stage_duration.count(stage="scan") == 2
+
+def test_render_sums_snapshots_across_workers():
+    scheduler, web = MetricsRegistry(), MetricsRegistry()
+    scheduler.record_api_call("/v3/events/upcoming", 200)
+    scheduler.stage_duration.observe(3.0, stage="scan")
+    scheduler.set_queue_depth("webhook", 2)
+    web.record_api_call("/v3/events/upcoming", 200)
+    web.record_api_call("/v3/events/upcoming", None)
+    web.stage_duration.observe(0.02, stage="scan")
+    web.set_queue_depth("webhook", 3)
+
+    # Snapshot publicado em JSON no banco e lido pelo worker que atende /metrics
+    peer = json.loads(json.dumps(web.snapshot()))
+    text = scheduler.render(peers=[peer])
+
+    assert 'tennisq_api_requests_total{endpoint="/v3/events/upcoming",status="200"} 2.0' in text
+    assert 'tennisq_api_requests_total{endpoint="/v3/events/upcoming",status="error"} 1.0' in text
+    assert 'tennisq_stage_duration_seconds_count{stage="scan"} 2' in text
+    assert 'tennisq_queue_depth{queue="webhook"} 5.0' in text
+    # Somar não altera o estado local
+    assert scheduler.api_requests.value(endpoint="/v3/events/upcoming", status="200") == 1
+
+def test_histogram_merge_ignores_other_buckets():
+    histogram = Histogram("h", "Teste", buckets=(1.0,))
+    histogram.merge([[[], [[1, 0, 0], 0.5, 1]]])  # Três contagens para dois buckets
+    assert histogram.count() == 0
+
+def test_provider_records_api_calls(provider, stub):
+    before = {status: metrics.api_requests.value(endpoint="/v2/tennis/player/{id}/stats", status=status)
+              for status in ("200", "error")}
+
+    assert provider.get_player_stats("500000")
+    assert metrics.api_requests.value(endpoint="/v2/tennis/player/{id}/stats", status="200") == before["200"] + 1
+
+    stub.stop()  # Conexão recusada (jogador sem cache: a chamada acontece)
+    provider.get_player_stats("500002")
+    assert metrics.api_requests.value(endpoint="/v2/tennis/player/{id}/stats", status="error") == before["error"] + 1
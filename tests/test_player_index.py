@@ -0,0 +1,36 @@
+from core.player_index import PlayerIndex, normalize_name
+
+EVENTS = [
+    {"id": "1", "league": {"name": "WTA Cluj"},
+     "home": {"id": 101, "name": "Iga Świątek"}, "away": {"id": 102, "name": "Coco Gauff"}},
+    {"id": "2", "league": "sem dict", "home": {"id": 103, "name": "Jeļena Ostapenko"}, "away": {"name": "Sem ID"}},
+    "evento inválido",
+]
+
+def test_normalize_name_ignores_accents_case_and_punctuation():
+    assert normalize_name("Iga Świątek") == "iga swiatek"
+    assert normalize_name("  IGA   SWIATEK ") == "iga swiatek"
+    assert normalize_name("O'Connell, C.") == "o connell c"
+    assert normalize_name(None) == ""
+
+def test_add_events_and_lookup():
+    index = PlayerIndex()
+    assert index.is_stale(3600)
+
+    assert index.add_events(EVENTS) == 3
+    assert len(index) == 3
+    assert not index.is_stale(3600)
+    assert index.lookup("iga swiatek") == "101"
+    assert index.lookup("JELENA OSTAPENKO") == "103"
+    assert index.get("Coco Gauff") == {"id": "102", "name": "Coco Gauff", "league": "WTA Cluj"}
+    assert index.get("Jeļena Ostapenko")["league"] == ""
+    assert index.lookup("Sem ID") is None
+    assert index.lookup("Desconhecida") is None
+
+def test_provider_lookup_uses_index_without_api_calls(provider, stub):
+    assert provider.search_player_id("player 3") == "500003"  # Primeira busca carrega o índice
+    requests_after_refresh = stub.request_count
+
+    assert provider.search_player_id("PLAYER 4") == "500004"
+    assert provider.search_player_id("Ninguém") is None
+    assert stub.request_count == requests_after_refresh
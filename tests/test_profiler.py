@@ -0,0 +1,79 @@
+import threading
+import time
+
+from core.profiler import SamplingProfiler, profile_call, profile_for
+
+def _busy(seconds):
+    deadline = time.perf_counter() + seconds
+    total = 0
+    while time.perf_counter() < deadline:
+        total += 1
+    return total
+
+def scan_target():
+    return _busy(0.15)
+
+def spawning_target():
+    worker = threading.Thread(target=_busy, args=(0.15,), name="enrichment_0")
+    worker.start()
+    worker.join()
+    return "ok"
+
+def _functions(profiler, thread_name):
+    return {frame[0] for stack in profiler.samples.get(thread_name, {}) for frame in stack}
+
+def test_profile_call_reports_target_frames():
+    profiler, result = profile_call(scan_target, interval=0.002, thread_name="manual_scan")
+
+    assert result > 0
+    assert profiler.sample_count > 0 and profiler.summary()["threads"] == ["manual_scan"]
+    assert {"scan_target", "_busy"} <= _functions(profiler, "manual_scan")
+    assert any(line.startswith("manual_scan;") and "scan_target (tests/test_profiler.py:" in line
+               for line in profiler.collapsed().splitlines())
+
+def test_profile_call_samples_threads_started_by_the_call():
+    profiler, result = profile_call(spawning_target, interval=0.002, thread_name="manual_scan")
+
+    assert result == "ok"
+    assert "_busy" in _functions(profiler, "enrichment_0")
+    # Threads que já existiam antes da chamada ficam de fora
+    assert set(profiler.samples) <= {"manual_scan", "enrichment_0"}
+
+def test_profile_call_propagates_errors():
+    def failing():
+        raise ValueError("falhou")
+
+    try:
+        profile_call(failing, interval=0.002)
+    except ValueError as e:
+        assert str(e) == "falhou"
+    else:
+        raise AssertionError("erro não propagado")
+
+def test_only_one_profile_at_a_time():
+    started = threading.Event()
+
+    def slow():
+        started.set()
+        return _busy(0.2)
+
+    runner = threading.Thread(target=profile_call, args=(slow,))
+    runner.start()
+    started.wait(5)
+    assert profile_for(0.01) is None
+    assert profile_call(scan_target) is None
+    runner.join()
+    assert profile_for(0.01) is not None
+
+def test_speedscope_document():
+    profiler = SamplingProfiler({threading.get_ident(): "main"}, interval=0.002).start()
+    _busy(0.05)
+    document = profiler.stop().speedscope(name="teste")
+
+    assert document["name"] == "teste"
+    (profile,) = document["profiles"]
+    assert profile["type"] == "sampled" and profile["name"] == "main"
+    assert len(profile["samples"]) == len(profile["weights"])
+    frames = document["shared"]["frames"]
+    assert all(0 <= index < len(frames) for sample in profile["samples"] for index in sample)
+    assert "_busy" in {frame["name"] for frame in frames}
@@ -0,0 +1,66 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from core.database import START_UTC_FORMAT, decode_cursor, encode_cursor
+from core.prelive_scanner import Opportunity
+
+def _opp(i: int, start: datetime, league: str = "WTA Cluj", side: str = "HOME") -> Opportunity:
+    return Opportunity(event_id=str(i), match=f"P{i} vs Q{i}", start_utc=start.strftime(START_UTC_FORMAT),
+                       league=league, side=side, odd=round(1.5 + (i % 7) * 0.25, 2), p_model=0.5, ev=0.0,
+                       p_market=0.5)
+
+def _all_pages(db, **kwargs):
+    pages, cursor = [], None
+    while True:
+        rows, cursor = db.query_opportunities(cursor=cursor, **kwargs)
+        pages.append(rows)
+        if cursor is None:
+            return pages
+
+def test_same_day_games_pass_the_cutoff(db):
+    # Jogo hoje, 3h à frente: texto '2030-01-01 15:00' contra corte '... 13:00' (não ISO com 'T')
+    db.save_opportunities([_opp(1, datetime.utcnow() + timedelta(hours=3))])
+    rows, _ = db.query_opportunities()
+    assert [r["event_id"] for r in rows] == ["1"]
+    assert len(db.get_active_opportunities(min_hours_ahead=1)) == 1
+    assert db.get_statistics()["active_opportunities"] == 1
+
+    assert db.query_opportunities(min_hours_ahead=4)[0] == []
+
+def test_default_sort_is_next_start_first(db):
+    now = datetime.utcnow()
+    db.save_opportunities([_opp(i, now + timedelta(hours=48 - i)) for i in range(10)])
+    rows, _ = db.query_opportunities(limit=3)
+    assert [r["event_id"] for r in rows] == ["9", "8", "7"]
+
+def test_keyset_pages_cover_everything_once(db):
+    now = datetime.utcnow()
+    db.save_opportunities([_opp(i, now + timedelta(hours=2 + i % 5), side="HOME" if i % 2 else "AWAY")
+                           for i in range(53)])
+
+    for sort in ("start", "ev", "odd", "created"):
+        pages = _all_pages(db, limit=10, sort=sort)
+        ids = [r["id"] for page in pages for r in page]
+        assert len(pages) == 6 and len(ids) == 53 and len(set(ids)) == 53
+
+    odds = [r["odd"] for page in _all_pages(db, limit=7, sort="odd", order="asc") for r in page]
+    assert odds == sorted(odds)
+
+    away = [r for page in _all_pages(db, limit=10, side="away", odd_min=2.0) for r in page]
+    assert away and all(r["side"] == "AWAY" and r["odd"] >= 2.0 for r in away)
+
+def test_invalid_sort_and_foreign_cursor(db):
+    db.save_opportunities([_opp(i, datetime.utcnow() + timedelta(hours=5)) for i in range(3)])
+    with pytest.raises(ValueError):
+        db.query_opportunities(sort="nome")
+    with pytest.raises(ValueError):
+        db.query_opportunities(order="sideways")
+
+    _, cursor = db.query_opportunities(limit=1, sort="odd")
+    with pytest.raises(ValueError):
+        db.query_opportunities(cursor=cursor, sort="start")
+
+def test_cursor_roundtrip():
+    cursor = encode_cursor("start", "ASC", "2030-01-01 12:00", 42)
+    assert decode_cursor(cursor) == ("start", "ASC", "2030-01-01 12:00", 42)
@@ -0,0 +1,86 @@
+import threading
+import time
+
+import pytest
+
+from core.rate_limiter import RateLimiter, TokenBucket, parse_limits
+
+class _Response:
+    def __init__(self, status_code: int, headers=None):
+        self.status_code = status_code
+        self.headers = headers or {}
+
+def test_burst_then_rate():
+    bucket = TokenBucket(rate=20.0, burst=3)
+    assert [bucket.acquire() for _ in range(3)] == [0.0, 0.0, 0.0]
+
+    started = time.monotonic()
+    waited = bucket.acquire()
+    assert 0.0 < waited <= 0.06
+    assert time.monotonic() - started >= waited * 0.9
+
+def test_timeout_returns_reserved_token():
+    bucket = TokenBucket(rate=1.0, burst=1)
+    bucket.acquire()
+    with pytest.raises(TimeoutError):
+        bucket.acquire(timeout=0.1)
+    assert bucket.tokens > -1.0  # A ficha reservada foi devolvida
+
+def test_exhausted_quota_is_capped_by_max_wait():
+    bucket = TokenBucket(rate=5.0, burst=5, max_wait=1.0)
+    bucket.fit_quota(remaining=0, reset_in=3 * 3600)
+
+    started = time.monotonic()
+    with pytest.raises(TimeoutError):
+        bucket.acquire()
+    assert time.monotonic() - started < 0.5  # Pula a chamada em vez de dormir por horas
+
+def test_interrupt_wakes_waiting_acquire():
+    limiter = RateLimiter({"player": (0.5, 1)}, max_wait=30)
+    limiter.acquire("/v2/tennis/player/1/stats")
+    errors = []
+
+    def blocked():
+        try:
+            limiter.acquire("/v2/tennis/player/2/stats")
+        except TimeoutError as e:
+            errors.append(e)
+
+    thread = threading.Thread(target=blocked)
+    thread.start()
+    time.sleep(0.1)
+    started = time.monotonic()
+    limiter.interrupt()
+    thread.join(2)
+
+    assert not thread.is_alive() and len(errors) == 1
+    assert time.monotonic() - started < 1.0
+    with pytest.raises(TimeoutError):
+        limiter.acquire("/v3/events/upcoming")  # Parado: recusa as próximas
+
+    limiter.resume()
+    assert limiter.acquire("/v3/events/upcoming") == 0.0
+
+def test_throttling_and_quota_headers():
+    limiter = RateLimiter({"events": (4.0, 4)})
+    bucket = limiter.bucket("events")
+
+    limiter.observe("/v3/events/upcoming", _Response(429, {"Retry-After": "2"}))
+    assert bucket.rate == 2.0
+    assert limiter.status()["events"]["paused_for"] > 1.0
+
+    limiter.observe("/v3/events/upcoming", _Response(200, {"X-RateLimit-Remaining": "10",
+                                                          "X-RateLimit-Reset": "100"}))
+    assert bucket.rate == pytest.approx(0.1)
+
+def test_family_and_parse_limits():
+    limiter = RateLimiter()
+    assert limiter.family_for("/v2/tennis/player/1/h2h/2") == "player"
+    assert limiter.family_for("/v2/event/odds") == "odds"
+    assert limiter.family_for("/v1/bet365/result") == "default"
+    assert parse_limits("events=2:5, odds=5,ruim") == {"events": (2.0, 5), "odds": (5.0, 5)}
+
+def test_disabled_limiter_never_waits():
+    limiter = RateLimiter({"events": (0.1, 1)})
+    limiter.enabled = False
+    assert [limiter.acquire("/v3/events/upcoming") for _ in range(5)] == [0.0] * 5
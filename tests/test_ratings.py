@@ -0,0 +1,65 @@
+import pytest
+
+from core.prelive_scanner import Opportunity
+from core.ratings import INITIAL_ELO, MIN_RATED_MATCHES, RatingStore, expected_score, k_factor
+from core.tennis_model_simple import PlayerDatabase
+
+def test_elo_update_is_zero_sum_for_new_players(db):
+    ratings = RatingStore(db)
+    assert ratings.record_match("1", "Iga Świątek", "Coco Gauff", "clay", "HOME", "2030-01-01T10:00:00")
+
+    winner, loser = ratings.get_player("iga swiatek"), ratings.get_player("Coco Gauff")
+    gain = k_factor(0) * (1 - expected_score(INITIAL_ELO, INITIAL_ELO))
+    assert winner["elo"] == pytest.approx(INITIAL_ELO + gain)
+    assert loser["elo"] == pytest.approx(INITIAL_ELO - gain)
+    assert winner["elo_surface"]["clay"] == pytest.approx(INITIAL_ELO + gain)
+    assert winner["elo_surface"]["hard"] == winner["elo"]  # Sem partidas na superfície: herda o geral
+    assert winner["surface_matches"] == {"clay": 1}
+    assert winner["form"] > 0.5 > loser["form"]
+    assert winner["matches"] == 1 and winner["last_match_at"] == "2030-01-01T10:00:00"
+
+def test_record_match_is_idempotent_and_validates(db):
+    ratings = RatingStore(db)
+    assert ratings.record_match("1", "A", "B", "hard", "AWAY")
+    assert not ratings.record_match("1", "A", "B", "hard", "AWAY")  # Mesmo evento
+    assert not ratings.record_match("2", "A", "B", "hard", "DRAW")
+    assert not ratings.record_match("3", "", "B", "hard", "HOME")
+    assert ratings.get_player("B")["matches"] == 1
+    assert ratings.get_player("Nunca Jogou") is None
+
+def test_record_results_counts_applied(db):
+    matches = [{"event_id": str(i), "home": "A", "away": "B", "surface": None, "winner": "HOME"} for i in range(3)]
+    matches.append({"event_id": "x", "home": "A"})  # Incompleto: ignorado
+    assert RatingStore(db).record_results(matches + matches[:1]) == 3
+    # K decrescente: a terceira vitória rende menos que a primeira
+    assert k_factor(2) < k_factor(0)
+
+def test_provider_prefers_ratings_only_with_enough_matches(provider):
+    ratings = provider.ratings
+    for i in range(MIN_RATED_MATCHES - 1):
+        ratings.record_match(str(i), "Player 0", "Rival", "hard", "HOME")
+
+    computed = provider.update_player_with_real_data("Player 0", PlayerDatabase())
+    assert computed.elo_rating != pytest.approx(ratings.get_player("Player 0")["elo"])
+
+    ratings.record_match("last", "Player 0", "Rival", "hard", "HOME")
+    rated = provider.update_player_with_real_data("Player 0", PlayerDatabase())
+    assert rated.elo_rating == pytest.approx(ratings.get_player("Player 0")["elo"])
+    assert rated.recent_form == pytest.approx(ratings.get_player("Player 0")["form"])
+
+def test_get_events_info_strips_away_suffix(db):
+    def opp(event_id, side):
+        return Opportunity(event_id=event_id, match="A vs B", start_utc="2030-01-01 12:00", league="WTA Cluj",
+                           side=side, odd=2.0, p_model=0.5, ev=0.0, p_market=0.5)
+
+    db.save_opportunities([opp("100_away", "AWAY"), opp("200", "HOME"), opp("200_away", "AWAY"), opp("300", "HOME")])
+    info = db.get_events_info(["100", "200", "999"] + [str(i) for i in range(1000, 1500)])
+
+    assert set(info) == {"100", "200"}
+    assert info["100"] == {"match_name": "A vs B", "league": "WTA Cluj", "start_utc": "2030-01-01 12:00"}
+
+def test_get_events_info_uses_event_id_index(db):
+    with db._connect() as conn:
+        plan = conn.execute("EXPLAIN QUERY PLAN SELECT event_id FROM opportunities WHERE event_id IN (?, ?)",
+                            ("1", "1_away")).fetchall()
+    assert any("idx_opportunities_event_id" in row[-1] for row in plan)
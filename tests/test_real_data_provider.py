@@ -0,0 +1,46 @@
+from core.tennis_model_simple import PlayerDatabase
+
+def test_rankings_are_downloaded_once_per_ttl(provider, stub):
+    rankings = provider.get_atp_rankings()
+    assert len(rankings) == 12  # 6 eventos sintéticos, 2 jogadores cada
+    requests_after_load = stub.request_count
+
+    assert provider.get_wta_rankings() == rankings
+    assert provider.get_ranking("500001") == 999  # Sem posição no payload de eventos
+    assert stub.request_count == requests_after_load
+
+    provider._rankings_expires_at = 0.0  # TTL vencido: recarrega
+    provider.get_atp_rankings()
+    assert stub.request_count == requests_after_load + 1
+
+def test_rankings_keep_previous_cache_on_failure(provider, stub):
+    rankings = provider.get_atp_rankings()
+    provider._rankings_expires_at = 0.0
+    stub.error_rate = 1.0
+
+    assert provider.get_atp_rankings() == rankings
+
+def test_update_players_fetches_each_player_once(provider, stub):
+    player_db = PlayerDatabase()
+    names = ["Player 0", "Player 1", "Player 0", "Desconhecido"]
+
+    results = provider.update_players(names, player_db, max_workers=4)
+
+    assert list(results) == ["Player 0", "Player 1", "Desconhecido"]
+    assert player_db.get_player("Player 1") is results["Player 1"]
+    real = results["Player 0"]
+    assert real.ranking == 999
+    assert set(real.elo_surface) == {"hard", "clay", "grass", "indoor"}
+    assert real.elo_rating == sum(real.elo_surface.values()) / 4
+    assert 0.0 <= real.recent_form <= 1.0
+    assert real.last_updated is not None
+    # Desconhecido: jogador sintético (sem last_updated)
+    assert results["Desconhecido"].last_updated is None
+
+    # Índice + rankings (1 chamada cada no máximo) + stats e partidas dos 2 jogadores conhecidos
+    assert stub.request_count <= 2 + 4
+
+def test_update_player_with_real_data(provider):
+    player = provider.update_player_with_real_data("Player 5", PlayerDatabase())
+    assert player.name == "Player 5"
+    assert player.matches_last_30d <= 15
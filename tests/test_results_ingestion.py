@@ -0,0 +1,72 @@
+from datetime import datetime, timedelta
+
+from core.results_ingestion import STATE_KEY, ResultsIngestor
+
+def _opportunity(db, event_id, start, league="WTA Cluj", match="Player A vs Player B"):
+    with db._connect() as conn:
+        conn.execute("""
+            INSERT INTO opportunities (event_id, match_name, start_utc, league, side, odd, p_model, ev,
+                                       p_market, created_at)
+            VALUES (?, ?, ?, ?, ?, 4.5, 0.3, 0.1, 0.2, ?)
+        """, (event_id, match, start.strftime("%Y-%m-%d %H:%M"), league,
+              "AWAY" if event_id.endswith("_away") else "HOME", datetime.utcnow().isoformat()))
+
+def _statuses(db):
+    with db._connect() as conn:
+        return dict(conn.execute("SELECT event_id, status FROM opportunities").fetchall())
+
+def test_ingest_settles_and_holds_watermark_at_first_unresolved(db, stub, no_rate_limit):
+    now = datetime.utcnow().replace(second=0, microsecond=0)
+    finished = now - timedelta(hours=10)
+    missing = now - timedelta(hours=20)  # Ainda sem resultado na API
+    for event in stub.synthetic.events[:2]:
+        event["time"] = str(int((finished - datetime(1970, 1, 1)).total_seconds()))
+
+    _opportunity(db, "9000000", finished)  # Par: 2-0 (HOME)
+    _opportunity(db, "9000001_away", finished)  # Ímpar: 1-2 (AWAY)
+    _opportunity(db, "8999999", missing)
+    _opportunity(db, "9000002", now - timedelta(hours=1))  # Dentro da carência (grace_hours)
+
+    ingestor = ResultsIngestor(db, "token-teste", stub.url, max_workers=2)
+    report = ingestor.ingest()
+
+    assert report["pending"] == 3 and report["ingested"] == 2 and report["unresolved"] == 1
+    assert report["rated"] == 2
+    assert _statuses(db) == {"9000000": "SETTLED", "9000001_away": "SETTLED",
+                             "8999999": "ACTIVE", "9000002": "ACTIVE"}
+    with db._connect() as conn:
+        rows = conn.execute("SELECT event_id, winner, completed_at FROM match_results ORDER BY event_id").fetchall()
+    # Horário da partida vindo da API, não o da ingestão
+    assert rows == [("9000000", "HOME", finished.isoformat()), ("9000001", "AWAY", finished.isoformat())]
+
+    # Marca d'água fica logo antes do evento sem resultado: ele volta na próxima rodada
+    watermark = db.get_state(STATE_KEY)
+    assert watermark == (missing - timedelta(minutes=1)).isoformat()
+    again = ingestor.ingest()
+    assert again["pending"] == 1 and again["ingested"] == 0
+    assert db.get_state(STATE_KEY) == watermark
+
+def test_ingest_without_pending_advances_to_grace_cutoff(db, stub, no_rate_limit):
+    ingestor = ResultsIngestor(db, "token-teste", stub.url, grace_hours=4)
+    before = datetime.utcnow() - timedelta(hours=4)
+
+    assert ingestor.ingest() == {"pending": 0, "ingested": 0, "settled": 0}
+    watermark = datetime.fromisoformat(db.get_state(STATE_KEY))
+    assert before <= watermark <= datetime.utcnow() - timedelta(hours=4)
+    assert stub.request_count == 0
+
+def test_events_past_lookback_stop_holding_the_watermark(db, stub, no_rate_limit):
+    now = datetime.utcnow()
+    ingestor = ResultsIngestor(db, "token-teste", stub.url, lookback_days=7)
+    db.set_state(STATE_KEY, (now - timedelta(days=30)).isoformat())
+    _opportunity(db, "8999998", now - timedelta(days=10))  # Nunca terá resultado
+
+    report = ingestor.ingest()
+
+    assert report["pending"] == 1 and report["unresolved"] == 0
+    assert datetime.fromisoformat(report["watermark"]) > now - timedelta(hours=5)
+
+def test_result_without_event_time_has_no_completed_at(db):
+    ingestor = ResultsIngestor(db, "token-teste", "http://127.0.0.1:9")
+    result = ingestor._parse_result({"id": "1", "time_status": "3", "ss": "2-1"})
+    assert result["winner"] == "HOME" and result["completed_at"] is None
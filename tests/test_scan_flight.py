@@ -0,0 +1,129 @@
+import json
+import threading
+import time
+
+import pytest
+
+from core.data_service import DataService
+
+@pytest.fixture
+def service(stub, tmp_path, no_rate_limit):
+    """LineMonitoringService com config própria apontando para o stub (sem enriquecimento)"""
+    from services.monitoring_service import LineMonitoringService
+
+    config_path = tmp_path / "config.json"
+    config_path.write_text(json.dumps({"api_key": "token-teste", "api_base_url": stub.url,
+                                       "enrichment_enabled": False, "scan_result_ttl": 300}))
+    return LineMonitoringService(str(config_path), db=DataService(str(tmp_path / "prelive.db")))
+
+@pytest.fixture
+def gated_scans(service, monkeypatch):
+    """Conta os scans reais e os segura até o teste liberar"""
+    scan = service.scanner.scan_opportunities
+    state = {"calls": 0, "started": threading.Event(), "release": threading.Event(), "error": None}
+
+    def gated(**params):
+        state["calls"] += 1
+        state["started"].set()
+        state["release"].wait(5)
+        if state["error"]:
+            raise state["error"]
+        return scan(**params)
+
+    monkeypatch.setattr(service.scanner, "scan_opportunities", gated)
+    return state
+
+def _run_concurrently(service, count, **params):
+    results, errors, progress = [], [], []
+    listener = lambda stage, done, total: progress.append(stage)  # noqa: E731
+
+    def call():
+        try:
+            results.append(service.run_scan(progress=listener, **params))
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=call) for _ in range(count)]
+    for thread in threads:
+        thread.start()
+    return threads, results, errors, progress
+
+def _wait_followers(service, count):
+    flight = next(iter(service._scan_flights.values()))
+    for _ in range(250):
+        if len(flight.listeners) == count:
+            return
+        time.sleep(0.02)
+    raise AssertionError("pedidos não se juntaram ao scan em andamento")
+
+def test_concurrent_identical_scans_share_one_flight(service, gated_scans, stub):
+    threads, results, errors, progress = _run_concurrently(service, 4)
+    assert gated_scans["started"].wait(5)
+    _wait_followers(service, 4)
+    gated_scans["release"].set()
+    for thread in threads:
+        thread.join(5)
+
+    assert gated_scans["calls"] == 1 and not errors
+    assert len(results) == 4 and all(r == results[0] for r in results)
+    assert results[0]  # O calendário sintético tem jogos femininos na faixa de odds
+    # Todos os chamadores recebem o progresso do scan compartilhado
+    assert len(progress) % 4 == 0 and progress
+    # Gravado uma única vez
+    assert service.db.get_statistics()["total_opportunities"] == len(results[0])
+
+    # Dentro de scan_result_ttl o resultado é reaproveitado sem chamar a API
+    requests_before = stub.request_count
+    assert service.force_scan() == results[0]
+    assert gated_scans["calls"] == 1 and stub.request_count == requests_before
+
+def test_different_params_do_not_share(service, gated_scans):
+    gated_scans["release"].set()
+    service.run_scan(odd_min=4.0)
+    service.run_scan(odd_min=3.0)
+    assert gated_scans["calls"] == 2
+
+def test_expired_result_runs_a_new_scan(service, gated_scans):
+    gated_scans["release"].set()
+    service.scan_result_ttl = 0
+    service.force_scan()
+    service.force_scan()
+    assert gated_scans["calls"] == 2
+
+def test_error_reaches_followers_and_is_not_reused(service, gated_scans):
+    gated_scans["error"] = RuntimeError("B365 fora do ar")
+    threads, results, errors, _ = _run_concurrently(service, 3)
+    assert gated_scans["started"].wait(5)
+    _wait_followers(service, 3)
+    gated_scans["release"].set()
+    for thread in threads:
+        thread.join(5)
+
+    assert gated_scans["calls"] == 1 and not results
+    assert len(errors) == 3 and all(str(e) == "B365 fora do ar" for e in errors)
+
+    gated_scans["error"] = None
+    assert isinstance(service.force_scan(), list)
+    assert gated_scans["calls"] == 2
+
+def test_force_runs_a_private_scan_past_reuse_and_in_flight(service, gated_scans):
+    gated_scans["release"].set()
+    service.force_scan()
+    service.force_scan(force=True)  # Ignora o resultado recente
+    assert gated_scans["calls"] == 2
+
+    service.scan_result_ttl = 0
+    gated_scans["release"].clear()
+    threads, results, errors, _ = _run_concurrently(service, 1)
+    _wait_followers(service, 1)
+    forced = threading.Thread(target=lambda: results.append(service.force_scan(force=True)))
+    forced.start()
+    for _ in range(250):
+        if gated_scans["calls"] == 4:
+            break
+        time.sleep(0.02)
+    gated_scans["release"].set()
+    for thread in threads + [forced]:
+        thread.join(5)
+    # O forçado não esperou o scan em andamento: chamou a API de novo
+    assert gated_scans["calls"] == 4 and len(results) == 2 and not errors
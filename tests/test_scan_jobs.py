@@ -0,0 +1,100 @@
+import threading
+import time
+
+from core.database import PreLiveDatabase
+from core.prelive_scanner import Opportunity
+from services.scan_jobs import COMPLETED, FAILED, QUEUED, RUNNING, ScanJobManager
+
+def _wait_finished(manager, job_id, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        job = manager.get(job_id)
+        if not job.active:
+            return job
+        time.sleep(0.02)
+    raise AssertionError(f"job {job_id} não terminou")
+
+def test_submits_from_workers_join_the_active_job(db):
+    # Cada worker HTTP tem a sua instância; a fila é o SQLite
+    workers = [ScanJobManager(PreLiveDatabase(str(db.db_path))) for _ in range(4)]
+    results = []
+    threads = [threading.Thread(target=lambda m=m: results.append(m.submit())) for m in workers for _ in range(3)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert sum(created for _, created in results) == 1
+    assert len({job.job_id for job, _ in results}) == 1
+    latest = workers[0].latest()
+    assert latest.status == QUEUED and latest.requests == 12
+
+def test_executor_runs_job_with_progress_and_results(db):
+    manager = ScanJobManager(db, poll_interval=0.05, progress_interval=0)
+    job, created = manager.submit()
+    seen = []
+
+    def runner(progress):
+        for done in range(3):
+            progress("odds", done, 2)
+            seen.append(manager.get(job.job_id).to_dict()["progress"])
+        return [Opportunity("1", "A vs B", "2030-01-01 12:00", "WTA Cluj", "HOME", 4.5, 0.3, 0.1, 0.2)]
+
+    manager.start_executor(runner)
+    try:
+        finished = _wait_finished(manager, job.job_id)
+    finally:
+        manager.stop_executor()
+
+    assert created and finished.status == COMPLETED
+    assert seen[-1] == {"stage": "odds", "done": 2, "total": 2}
+    assert finished.started_at and finished.finished_at
+    assert finished.to_dict()["opportunities_found"] == 1
+    assert finished.opportunities[0]["event_id"] == "1"
+
+    # Job concluído: o próximo pedido cria um job novo
+    _, created_again = manager.submit()
+    assert created_again
+
+def test_runner_error_marks_job_failed(db):
+    manager = ScanJobManager(db, poll_interval=0.05)
+    job, _ = manager.submit()
+
+    def runner(progress):
+        raise RuntimeError("API fora do ar")
+
+    manager.start_executor(runner)
+    try:
+        finished = _wait_finished(manager, job.job_id)
+    finally:
+        manager.stop_executor()
+    assert finished.status == FAILED and finished.error == "API fora do ar"
+
+def test_restart_fails_jobs_left_running(db):
+    manager = ScanJobManager(db)
+    job, _ = manager.submit()
+    assert db.claim_scan_job()["status"] == RUNNING
+    assert db.claim_scan_job() is None  # Nenhum outro enfileirado
+
+    assert db.fail_running_scan_jobs("Interrompido por reinício do processo") == 1
+    failed = manager.get(job.job_id)
+    assert failed.status == FAILED and failed.error == "Interrompido por reinício do processo"
+
+def test_save_keeps_requests_joined_while_running(db):
+    manager = ScanJobManager(db)
+    job, _ = manager.submit()
+    running = db.claim_scan_job()
+    manager.submit()  # Agrupado durante a execução
+    running.update(status=COMPLETED)
+    db.save_scan_job(running)
+    assert manager.get(job.job_id).requests == 2
+
+def test_finished_jobs_are_pruned(db):
+    manager = ScanJobManager(db)
+    for _ in range(5):
+        manager.submit()
+        db.save_scan_job(dict(db.claim_scan_job(), status=COMPLETED))
+    db.enqueue_scan_job({"job_id": "novo", "status": QUEUED}, keep_finished=2)
+    with db._connect() as conn:
+        statuses = [row[0] for row in conn.execute("SELECT status FROM scan_jobs")]
+    assert sorted(statuses) == [COMPLETED, COMPLETED, QUEUED]
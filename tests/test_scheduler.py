@@ -0,0 +1,64 @@
+import threading
+import time
+
+from core.scheduler import RESCHEDULE, STOPPED, Wakeup, remaining_label
+
+def _in_thread(fn):
+    result = {}
+    thread = threading.Thread(target=lambda: result.setdefault("value", fn()))
+    thread.start()
+    return thread, result
+
+def test_wait_returns_none_at_deadline():
+    started = time.monotonic()
+    assert Wakeup("t").wait(0.05) is None
+    assert time.monotonic() - started >= 0.05
+
+def test_trigger_wakes_before_deadline():
+    wakeup = Wakeup("t")
+    thread, result = _in_thread(lambda: wakeup.wait(30))
+    time.sleep(0.05)
+    started = time.monotonic()
+    wakeup.trigger("manual")
+    thread.join(2)
+    assert result["value"] == "manual"
+    assert time.monotonic() - started < 1
+
+def test_pending_signals_coalesce_and_reschedule_loses_to_real_reasons():
+    wakeup = Wakeup("t")
+    wakeup.trigger(RESCHEDULE)
+    wakeup.trigger("b")
+    wakeup.trigger("a")
+    assert wakeup.wait(1) == "a"  # Um único despertar para todos os sinais
+    assert wakeup.wait(0.01) is None
+
+    wakeup.trigger(RESCHEDULE)
+    assert wakeup.wait(1) == RESCHEDULE
+
+def test_stop_wins_and_reset_rearms():
+    wakeup = Wakeup("t")
+    thread, result = _in_thread(lambda: wakeup.wait(30))
+    time.sleep(0.05)
+    wakeup.stop()
+    thread.join(2)
+    assert result["value"] == STOPPED and wakeup.stopped
+    assert wakeup.pause(30) is True
+
+    wakeup.reset()
+    assert not wakeup.stopped
+    assert wakeup.pause(0.01) is False
+
+def test_pause_ignores_triggers():
+    wakeup = Wakeup("t")
+    wakeup.trigger("scan")
+    assert wakeup.pause(0.02) is False
+    assert wakeup.wait(0) == "scan"  # O sinal fica para a próxima espera
+
+def test_heartbeat_during_long_wait():
+    beats = []
+    assert Wakeup("t").wait(0.25, heartbeat=beats.append, heartbeat_interval=0.1) is None
+    assert len(beats) == 2 and beats[0] > beats[1] > 0
+
+def test_remaining_label():
+    assert remaining_label(4800) == "1h 20m"
+    assert remaining_label(2100) == "35m"
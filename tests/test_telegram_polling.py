@@ -0,0 +1,70 @@
+import json
+
+import pytest
+
+pytest.importorskip("flask")
+
+from services.telegram_bot_handler import TelegramBotHandler
+
+def _handler(stub, db, tmp_path, stop_after=None):
+    """Handler em modo polling contra o stub, registrando os update_ids processados"""
+    handler = TelegramBotHandler({"telegram_token": "TOKEN", "telegram_api_base": stub.url, "polling_timeout": 1,
+                                  "polling_offset_file": str(tmp_path / "offset.json")}, db=db, polling=True)
+    handler.processed = []
+
+    def record(update):
+        handler.processed.append(update["update_id"])
+        if stop_after and len(handler.processed) >= stop_after:
+            handler._polling_stop.set()
+
+    handler.process_update = record
+    return handler
+
+def _push(stub, *update_ids):
+    for update_id in update_ids:
+        stub.push_update({"update_id": update_id, "callback_query": {"id": str(update_id)}})
+
+def test_offset_round_trip(db, stub, tmp_path):
+    handler = _handler(stub, db, tmp_path)
+    assert handler.load_offset() == 0
+    handler.save_offset(42)
+    assert handler.load_offset() == 42
+    assert json.loads((tmp_path / "offset.json").read_text())["offset"] == 42
+    assert not (tmp_path / "offset.tmp").exists()
+
+    (tmp_path / "offset.json").write_text("{corrompido")
+    assert handler.load_offset() == 0
+
+def test_polling_mode_has_no_webhook_workers(db, stub, tmp_path):
+    assert _handler(stub, db, tmp_path).workers == []
+
+def test_restart_resumes_from_saved_offset(db, stub, tmp_path):
+    _push(stub, 1, 2, 3)
+    first = _handler(stub, db, tmp_path, stop_after=3)
+    first.run_polling()
+    assert sorted(first.processed) == [1, 2, 3]
+    assert first.load_offset() == 4
+
+    _push(stub, 4)
+    second = _handler(stub, db, tmp_path, stop_after=1)
+    second.run_polling()
+    assert second.processed == [4]
+
+def test_crash_before_save_offset_reprocesses_batch(db, stub, tmp_path):
+    _push(stub, 1, 2)
+    crashed = _handler(stub, db, tmp_path)
+
+    def crash(offset):
+        raise RuntimeError("processo encerrado")
+
+    crashed.save_offset = crash
+    with pytest.raises(RuntimeError):
+        crashed.run_polling()
+    assert sorted(crashed.processed) == [1, 2]
+
+    # O lote volta no reinício e é processado de novo (nada fica registrado como visto no banco)
+    restarted = _handler(stub, db, tmp_path, stop_after=2)
+    restarted.run_polling()
+    assert sorted(restarted.processed) == [1, 2]
+    assert restarted.load_offset() == 3
+    assert db.claim_telegram_update(1)
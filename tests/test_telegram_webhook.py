@@ -0,0 +1,43 @@
+import pytest
+
+pytest.importorskip("flask")
+
+from services.telegram_bot_handler import TelegramBotHandler
+
+CONFIG = {"telegram_token": "TOKEN", "telegram_api_base": "http://127.0.0.1:9", "webhook_queue_size": 2}
+
+@pytest.fixture
+def handlers(db):
+    """Dois workers do gunicorn: processos distintos, mesmo prelive.db"""
+    created = [TelegramBotHandler(dict(CONFIG), db=db) for _ in range(2)]
+    for handler in created:
+        handler.stop_workers()  # Sem consumidores: a fila só enche
+    return created
+
+def test_redelivery_to_other_worker_is_ignored(handlers):
+    first, second = handlers
+    assert first.enqueue_update({"update_id": 10})
+    assert second.enqueue_update({"update_id": 10})  # Reentrega no outro worker: 200 sem processar
+    assert first.update_queue.qsize() == 1
+    assert second.update_queue.qsize() == 0
+
+def test_full_queue_releases_update_for_redelivery(handlers):
+    first, second = handlers
+    assert first.enqueue_update({"update_id": 1})
+    assert first.enqueue_update({"update_id": 2})
+    assert not first.enqueue_update({"update_id": 3})  # Fila cheia: 503
+
+    assert second.enqueue_update({"update_id": 3})
+    assert second.update_queue.qsize() == 1
+
+def test_update_without_id_is_always_accepted(handlers):
+    first, _ = handlers
+    assert first.enqueue_update({"callback_query": {}})
+    assert first.enqueue_update({"callback_query": {}})
+    assert first.update_queue.qsize() == 2
+
+def test_cleanup_telegram_updates(db):
+    assert db.claim_telegram_update(7)
+    assert not db.claim_telegram_update(7)
+    assert db.cleanup_telegram_updates(max_age_hours=0) == 1
+    assert db.claim_telegram_update(7)